@@ -0,0 +1,41 @@
+"""
+Compares ``EarleyRecognizer`` with the recognizer modules generated by
+``parsers.earley.codegen`` for the benchmark workloads. Reports the time
+to generate and import a module once and the recognition time of both
+for sentences of increasing length.
+
+Run with 'python -m benchmarks.codegen [n ...]' from the project's root.
+"""
+import sys
+import time
+
+from benchmarks.timing import best_time
+from benchmarks.workloads import WORKLOADS, SentenceSampler, inline_grammar
+from parsers.earley import codegen
+from parsers.earley.earley_recognizer import EarleyRecognizer
+
+LENGTHS = [8, 32, 128]
+
+
+def main(lengths):
+    print('{:>16} {:>10} {:>6} {:>12} {:>12} {:>8}'.format('workload', 'generate', 'n', 'interpreted', 'specialized',
+                                                         'speedup'))
+    for workload in WORKLOADS:
+        start = time.perf_counter()
+        module = codegen.specialize(workload.grammar, workload.lexicon)
+        generated = time.perf_counter() - start
+        recognizer = EarleyRecognizer(workload.grammar, workload.lexicon)
+        sampler = SentenceSampler(inline_grammar(workload))
+        for n in lengths:
+            tokens = sampler.sample(n)
+            if tokens is None:
+                continue
+            assert recognizer.recognize(tokens) == module.recognize(tokens)
+            interpreted = best_time(lambda: recognizer.recognize(tokens))
+            specialized = best_time(lambda: module.recognize(tokens))
+            print('{:>16} {:>9.3f}s {:>6} {:>11.4f}s {:>11.4f}s {:>7.1f}x'.format(
+                workload.name, generated, n, interpreted, specialized, interpreted / specialized))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
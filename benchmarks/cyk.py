@@ -0,0 +1,41 @@
+"""
+Compares the Scott 2008 parser with the vectorized CYK parser, both
+building the SPPF, on dense, highly ambiguous grammars: S -> S S | a and
+a grammar in which every nonterminal rewrites to every pair of
+nonterminals.
+
+Run with 'python -m benchmarks.cyk [n ...]' from the project's root.
+"""
+import sys
+
+from benchmarks.timing import best_time
+from parsers import cyk
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley import scott_2008
+from parsers.shared import Rule
+
+LENGTHS = [5, 10, 20]
+
+
+def dense_grammar(size=4):
+    symbols = ['S'] + ['N{}'.format(k) for k in range(1, size)]
+    return {lhs: [Rule(lhs, (left, right)) for left in symbols for right in symbols] + [Rule(lhs, ('a',))]
+            for lhs in symbols}
+
+
+def main(lengths):
+    grammars = [('S -> S S | a', {'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}),
+                ('dense', dense_grammar())]
+    print('{:>14} {:>6} {:>12} {:>12} {:>8}'.format('grammar', 'n', 'scott_2008', 'cyk', 'speedup'))
+    for name, grammar in grammars:
+        compiled, table = CompiledGrammar(grammar), cyk.CYKGrammar(grammar)
+        for n in lengths:
+            tokens = ['a'] * n
+            earley = best_time(lambda: scott_2008.parse(compiled, tokens))
+            vectorized = best_time(lambda: cyk.parse(table, tokens))
+            print('{:>14} {:>6} {:>11.3f}s {:>11.3f}s {:>7.1f}x'.format(name, n, earley, vectorized,
+                                                                    earley / vectorized))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
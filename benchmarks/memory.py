@@ -0,0 +1,66 @@
+"""
+Measures the memory used per chart item of the Earley recognizer and per
+node of the Scott 2008 parser's SPPF. Everything allocated while building
+the chart is divided by the number of items or nodes, so the figures
+include the sets, dicts and indexes that hold them.
+
+Run with 'python -m benchmarks.memory' from the project's root.
+"""
+import sys
+import tracemalloc
+
+from benchmarks.workloads import WORKLOADS, SentenceSampler, inline_grammar
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley.scott_2008 import build_chart
+
+LENGTHS = [16, 64]
+
+
+def allocated(function):
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        result = function()
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return after - before, result
+
+
+def recognizer_bytes(workload, tokens):
+    parser = EarleyRecognizer(workload.grammar, workload.lexicon)
+    size, _ = allocated(lambda: parser.recognize(tokens))
+    return size, len(parser.states)
+
+
+def sppf_bytes(grammar, tokens):
+    def run():
+        chart = build_chart(grammar, tokens)
+        chart.expand(chart.find_root())
+        return chart
+
+    size, chart = allocated(run)
+    return size, len(chart.nodes), sum(len(items) for items in chart.chart)
+
+
+def main(lengths):
+    print('{:>16} {:>5} {:>10} {:>12} {:>10} {:>12} {:>12}'.format(
+        'workload', 'n', 'states', 'B/state', 'nodes', 'B/node', 'B/item'))
+    for workload in WORKLOADS:
+        grammar = inline_grammar(workload)
+        compiled = CompiledGrammar(grammar)
+        sampler = SentenceSampler(grammar)
+        for n in lengths:
+            tokens = sampler.sample(n)
+            if tokens is None:
+                continue
+            state_size, states = recognizer_bytes(workload, tokens)
+            sppf_size, nodes, items = sppf_bytes(compiled, tokens)
+            print('{:>16} {:>5} {:>10} {:>12.1f} {:>10} {:>12.1f} {:>12.1f}'.format(
+                workload.name, n, states, state_size / max(states, 1),
+                nodes, sppf_size / max(nodes, 1), sppf_size / max(items, 1)))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
@@ -0,0 +1,51 @@
+"""
+Compares the Scott 2008 chart construction and the sharded recognizer of
+``parsers.earley.parallel`` in the calling process with the recognizer on
+1, 2, 4 and all cores. Long inputs are sampled from the wide expression
+grammar of ``benchmarks.practical``, short ones from the ambiguous grammar
+S -> S S | a, where every Earley set has constituents from all earlier
+sets to complete.
+
+Run with 'python -m benchmarks.parallel [n ...]' from the project's root;
+the lengths apply to the expression grammar.
+"""
+import os
+import sys
+
+from benchmarks.practical import sentence, wide_grammar
+from benchmarks.timing import best_time
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.parallel import ParallelRecognizer
+from parsers.earley.scott_2008 import build_chart
+from parsers.shared import Rule
+
+LENGTHS = [1000, 4000]
+AMBIGUOUS_LENGTHS = [100, 200]
+
+
+def main(lengths):
+    counts = sorted({1, 2, 4, os.cpu_count() or 1})
+    print('cores: {}'.format(os.cpu_count()))
+    print('{:>10} {:>6} {:>11} {:>11}'.format('grammar', 'n', 'scott_2008', 'in-process')
+          + ''.join('{:>15}'.format('{} proc'.format(p)) for p in counts))
+    cases = [('wide', CompiledGrammar(wide_grammar()), [sentence(n) for n in lengths]),
+             ('ambiguous', CompiledGrammar({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}),
+              [['a'] * n for n in AMBIGUOUS_LENGTHS])]
+    for name, grammar, sentences in cases:
+        recognizers = {p: ParallelRecognizer(grammar, processes=p) for p in [0] + counts}
+        try:
+            for tokens in sentences:
+                scott = best_time(lambda: build_chart(grammar, tokens))
+                single = best_time(lambda: recognizers[0].recognize(tokens))
+                line = '{:>10} {:>6} {:>10.3f}s {:>10.3f}s'.format(name, len(tokens), scott, single)
+                for p in counts:
+                    seconds = best_time(lambda: recognizers[p].recognize(tokens))
+                    line += '{:>9.3f}s {:>4.2f}x'.format(seconds, single / seconds)
+                print(line)
+        finally:
+            for recognizer in recognizers.values():
+                recognizer.close()
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
@@ -0,0 +1,55 @@
+"""
+Compares the Scott 2008 chart with the Earley sets over LR(0) states of
+``parsers.earley.practical`` on a wide expression grammar, where every
+level has many operators whose rules share a prefix and so move in
+lockstep. Reports the chart items of both and the recognition time.
+
+Run with 'python -m benchmarks.practical [n ...]' from the project's root.
+"""
+import sys
+
+from benchmarks.timing import best_time
+from parsers.earley import practical
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.scott_2008 import build_chart
+from parsers.shared import Rule
+
+LENGTHS = [25, 50, 100, 200]
+
+
+def wide_grammar(levels=4, operators=12):
+    grammar = {'S': [Rule('S', ('E0',))]}
+    for level in range(levels):
+        lhs, operand = 'E{}'.format(level), 'E{}'.format(level + 1) if level + 1 < levels else 'F'
+        grammar[lhs] = [Rule(lhs, (operand,))]
+        grammar[lhs].extend(Rule(lhs, (operand, 'op{}_{}'.format(level, k), lhs)) for k in range(operators))
+    grammar['F'] = [Rule('F', ('x',)), Rule('F', ('(', 'E0', ')'))]
+    return grammar
+
+
+def sentence(n):
+    tokens = ['x']
+    while len(tokens) < n:
+        level = len(tokens) % 4
+        tokens.extend(['op{}_{}'.format(level, len(tokens) % 12), 'x'])
+    return tokens
+
+
+def main(lengths):
+    grammar = wide_grammar()
+    compiled, automaton = CompiledGrammar(grammar), practical.LR0Automaton(grammar)
+    print('{:>6} {:>12} {:>12} {:>12} {:>12} {:>8}'.format('n', 'dotted', 'states', 'scott_2008', 'practical',
+                                                          'speedup'))
+    for n in lengths:
+        tokens = sentence(n)
+        chart = practical.build_chart(automaton, tokens)
+        dotted = sum(len(starts) for i in range(len(tokens) + 1) for starts in chart.dotted(i).values())
+        states = sum(len(items) for items in chart.chart)
+        earley = best_time(lambda: build_chart(compiled, tokens))
+        lr0 = best_time(lambda: practical.build_chart(automaton, tokens))
+        print('{:>6} {:>12} {:>12} {:>11.3f}s {:>11.3f}s {:>7.1f}x'.format(len(tokens), dotted, states, earley, lr0,
+                                                                         earley / lr0))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
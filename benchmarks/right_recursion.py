@@ -0,0 +1,50 @@
+"""
+Compares the Earley engines with and without Leo's optimization on deeply
+right-recursive input. Without it the number of completions (and the run
+time) grows quadratically with the input length, with it linearly.
+
+Run with 'python -m benchmarks.right_recursion' from the project's root.
+"""
+import sys
+import time
+
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley.scott_2008 import Rule, parse
+from parsers.shared import read_grammar, read_lexicon
+
+LENGTHS = [250, 500, 1000, 2000]
+
+
+def time_recognizer(grammar, lexicon, tokens, leo):
+    parser = EarleyRecognizer(grammar, lexicon, leo=leo)
+    start = time.perf_counter()
+    assert parser.recognize(tokens)
+    return time.perf_counter() - start, len(parser.states)
+
+
+def time_parser(grammar, tokens, leo):
+    start = time.perf_counter()
+    assert parse(grammar, tokens, leo=leo) is not None
+    return time.perf_counter() - start
+
+
+def main(lengths):
+    lexicon = read_lexicon('data/simple_lexicon.txt')
+    grammar = read_grammar('data/right-recursive_grammar.txt')
+    terminal_grammar = {'S': [Rule('S', ('a', 'S')), Rule('S', ('a',))]}
+    print('{:>6} {:>14} {:>10} {:>12} {:>10} {:>12} {:>10}'.format(
+        'n', 'engine', 'items', 'items/leo', 'time [s]', 'time/leo', 'speedup'))
+    for n in lengths:
+        tokens = ['a'] * n
+        t_plain, items_plain = time_recognizer(grammar, lexicon, tokens, False)
+        t_leo, items_leo = time_recognizer(grammar, lexicon, tokens, True)
+        print('{:>6} {:>14} {:>10} {:>12} {:>10.3f} {:>12.3f} {:>10.1f}'.format(
+            n, 'recognizer', items_plain, items_leo, t_plain, t_leo, t_plain / t_leo))
+        t_plain = time_parser(terminal_grammar, tokens, False)
+        t_leo = time_parser(terminal_grammar, tokens, True)
+        print('{:>6} {:>14} {:>10} {:>12} {:>10.3f} {:>12.3f} {:>10.1f}'.format(
+            n, 'scott_2008', '', '', t_plain, t_leo, t_plain / t_leo))
+
+
+if __name__ == '__main__':
+    main([int(arg) for arg in sys.argv[1:]] or LENGTHS)
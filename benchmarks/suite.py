@@ -0,0 +1,190 @@
+"""
+Benchmark suite running every parser over inputs of increasing length.
+
+For each engine, workload and input length it records the wall time (best
+of ``--repeat`` runs), the peak memory allocated during one extra run
+under tracemalloc, and size counters such as chart items and SPPF nodes.
+Results are written as JSON so runs from different commits can be compared:
+
+    python -m benchmarks.suite --output before.json
+    python -m benchmarks.suite --output after.json
+    python -m benchmarks.suite --compare before.json after.json
+
+Run from the project's root.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+from benchmarks.workloads import WORKLOADS, SentenceSampler, inline_grammar
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley.scott_2008 import build_chart
+from parsers.earley.utils import count_derivations, iter_derivations
+from parsers.graph_search import bfs_search_all, bfs_search_first, dfs_search_all, dfs_search_first
+from parsers.top_down import TopDownParser
+
+LENGTHS = [4, 8, 16, 32, 64, 128]
+TREE_LIMIT = 100
+
+
+def recognizer(**options):
+    def run(workload, grammar, tokens):
+        parser = EarleyRecognizer(workload.grammar, workload.lexicon, **options)
+        accepted = parser.recognize(tokens)
+        return {'accepted': accepted, 'chart_items': len(parser.states)}
+
+    return run
+
+
+def scott_2008(**options):
+    def run(workload, grammar, tokens):
+        chart = build_chart(grammar, tokens, **options)
+        root = chart.find_root()
+        chart.expand(root)
+        return {'accepted': root is not None,
+                'chart_items': sum(len(items) for items in chart.chart),
+                'sppf_nodes': len(chart.nodes)}
+
+    return run
+
+
+def derivations(workload, grammar, tokens):
+    chart = build_chart(grammar, tokens)
+    root = chart.find_root()
+    trees = sum(1 for _ in iter_derivations(root, limit=TREE_LIMIT)) if root else 0
+    return {'accepted': root is not None, 'trees': trees,
+            'derivations': str(count_derivations(root)) if root else '0'}
+
+
+def top_down(search):
+    def run(workload, grammar, tokens):
+        result = TopDownParser(grammar).parse(tokens, search)
+        found = len(result) if isinstance(result, list) else int(result is not None)
+        return {'accepted': found > 0, 'configs_found': found}
+
+    run.top_down = True
+    return run
+
+
+ENGINES = {
+    'earley_recognizer': recognizer(),
+    'earley_recognizer_leo_lookahead': recognizer(leo=True, lookahead=True),
+    'scott_2008': scott_2008(),
+    'scott_2008_leo_lookahead': scott_2008(leo=True, lookahead=True),
+    'collect_derivations': derivations,
+    'top_down_bfs_first': top_down(bfs_search_first),
+    'top_down_dfs_first': top_down(dfs_search_first),
+    'top_down_bfs_all': top_down(bfs_search_all),
+    'top_down_dfs_all': top_down(dfs_search_all),
+}
+
+
+def measure(engine, workload, grammar, tokens, repeat):
+    seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        counters = engine(workload, grammar, tokens)
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    tracemalloc.start()
+    try:
+        engine(workload, grammar, tokens)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    result = {'seconds': seconds, 'peak_bytes': peak}
+    result.update(counters)
+    return result
+
+
+def run_suite(engines, workloads, lengths, repeat, max_seconds, seed):
+    results = []
+    for workload in workloads:
+        grammar = inline_grammar(workload)
+        compiled = CompiledGrammar(grammar)
+        sampler = SentenceSampler(grammar, seed=seed)
+        sentences = [(n, sampler.sample(n)) for n in lengths]
+        for name in engines:
+            engine = ENGINES[name]
+            if getattr(engine, 'top_down', False) and workload.left_recursive:
+                continue
+            engine_grammar = grammar if getattr(engine, 'top_down', False) else compiled
+            for n, tokens in sentences:
+                if tokens is None:
+                    continue
+                result = {'engine': name, 'workload': workload.name, 'n': n}
+                result.update(measure(engine, workload, engine_grammar, tokens, repeat))
+                results.append(result)
+                print('{engine:>32} {workload:>16} {n:>5} {seconds:>10.4f}s {peak_bytes:>12}B'.format(**result),
+                      file=sys.stderr)
+                if result['seconds'] > max_seconds:
+                    break
+    return results
+
+
+def metadata(seed, repeat):
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {'commit': commit, 'python': platform.python_version(), 'platform': platform.platform(),
+            'seed': seed, 'repeat': repeat, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+
+def compare(before_path, after_path, threshold):
+    """Prints the time ratio after/before per case and returns the number of regressions."""
+    with open(before_path) as fin:
+        before = {(r['engine'], r['workload'], r['n']): r for r in json.load(fin)['results']}
+    with open(after_path) as fin:
+        after = json.load(fin)['results']
+    regressions = 0
+    for result in after:
+        old = before.get((result['engine'], result['workload'], result['n']))
+        if not old or not old['seconds']:
+            continue
+        ratio = result['seconds'] / old['seconds']
+        flag = ''
+        if ratio > threshold:
+            flag = 'REGRESSION'
+            regressions += 1
+        print('{:>32} {:>16} {:>5} {:>8.2f}x {:>8.2f}x mem {}'.format(
+            result['engine'], result['workload'], result['n'], ratio,
+            result['peak_bytes'] / max(old['peak_bytes'], 1), flag))
+    return regressions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument('--engines', nargs='+', default=list(ENGINES), choices=list(ENGINES))
+    arg_parser.add_argument('--workloads', nargs='+', default=[w.name for w in WORKLOADS],
+                            choices=[w.name for w in WORKLOADS])
+    arg_parser.add_argument('--lengths', nargs='+', type=int, default=LENGTHS)
+    arg_parser.add_argument('--repeat', type=int, default=3, help='timed runs per case, the best is kept')
+    arg_parser.add_argument('--max-seconds', type=float, default=2.0,
+                            help='skip longer inputs of an engine/workload once a run takes longer')
+    arg_parser.add_argument('--seed', type=int, default=0, help='seed for sampling the sentences')
+    arg_parser.add_argument('--output', help='JSON file for the results (default: stdout)')
+    arg_parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                            help='compare two result files instead of running')
+    arg_parser.add_argument('--threshold', type=float, default=1.2, help='time ratio reported as regression')
+    args = arg_parser.parse_args()
+
+    if args.compare:
+        sys.exit(1 if compare(args.compare[0], args.compare[1], args.threshold) else 0)
+    workloads = [w for w in WORKLOADS if w.name in args.workloads]
+    results = run_suite(args.engines, workloads, args.lengths, args.repeat, args.max_seconds, args.seed)
+    report = json.dumps({'meta': metadata(args.seed, args.repeat), 'results': results}, indent=2)
+    if args.output:
+        with open(args.output, 'w') as fout:
+            fout.write(report)
+    else:
+        print(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,14 @@
+"""
+Timing helper shared by the benchmarks.
+"""
+import time
+
+
+def best_time(function, repeat=3):
+    seconds = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        seconds = elapsed if seconds is None else min(seconds, elapsed)
+    return seconds
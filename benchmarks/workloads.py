@@ -0,0 +1,109 @@
+"""
+Benchmark grammars and sentences of a given length sampled from them.
+"""
+import collections
+import random
+
+from parsers.shared import Rule, read_grammar, read_lexicon
+
+Workload = collections.namedtuple('Workload', ['name', 'grammar', 'lexicon', 'left_recursive'])
+
+
+def from_files(name, grammar_path, lexicon_path=None, left_recursive=False):
+    grammar = read_grammar(grammar_path)
+    lexicon = read_lexicon(lexicon_path) if lexicon_path else terminal_lexicon(grammar)
+    return Workload(name, grammar, lexicon, left_recursive)
+
+
+def from_rules(name, lines, left_recursive=False):
+    grammar = {}
+    for line in lines:
+        rule = Rule.from_str(line)
+        grammar.setdefault(rule.lhs, []).append(rule)
+    return Workload(name, grammar, terminal_lexicon(grammar), left_recursive)
+
+
+def terminal_lexicon(grammar):
+    """Lexicon in which every terminal of the grammar is its own category."""
+    return {symbol: [symbol] for rules in grammar.values() for rule in rules
+            for symbol in rule.rhs if symbol not in grammar}
+
+
+def inline_grammar(workload):
+    """The grammar with the lexicon entries as rules, so terminals are words."""
+    grammar = {lhs: list(rules) for lhs, rules in workload.grammar.items()}
+    for category, words in workload.lexicon.items():
+        if category in grammar or words == [category]:
+            continue
+        grammar[category] = [Rule(category, (word,)) for word in words]
+    return grammar
+
+
+WORKLOADS = [
+    from_files('espresso', 'data/grammar-espresso.txt', 'data/lexicon-espresso.txt'),
+    from_files('greibach', 'data/greibach_normal_form_grammar.txt'),
+    from_files('grune_jacobs', 'data/grune_jacobs_2008.txt'),
+    from_files('left_recursive', 'data/left-recursive_grammar.txt', 'data/simple_lexicon.txt',
+               left_recursive=True),
+    from_rules('ambiguous', ['S -> S S', 'S -> a'], left_recursive=True),
+    from_rules('right_recursion', ['S -> a S', 'S -> a']),
+    from_rules('left_recursion', ['S -> S a', 'S -> a'], left_recursive=True),
+]
+
+
+class SentenceSampler:
+    """
+    Samples sentences of exactly n tokens uniformly among the derivations
+    of that length. Requires a grammar without empty rules and unit cycles.
+    """
+
+    def __init__(self, grammar, start='S', seed=0):
+        self.grammar = grammar
+        self.start = start
+        self.random = random.Random(seed)
+        self.counts = {}
+
+    def sample(self, n):
+        """Returns a sentence of length ``n`` or ``None`` if the language has none."""
+        if self.count(self.start, n) == 0:
+            return None
+        return self._expand(self.start, n)
+
+    def count(self, symbol, n):
+        if symbol not in self.grammar:
+            return 1 if n == 1 else 0
+        key = (symbol, n)
+        if key not in self.counts:
+            self.counts[key] = 0
+            self.counts[key] = sum(self._count_sequence(rule.rhs, n) for rule in self.grammar[symbol])
+        return self.counts[key]
+
+    def _count_sequence(self, symbols, n):
+        if not symbols:
+            return 1 if n == 0 else 0
+        if n < len(symbols):
+            return 0
+        return sum(self.count(symbols[0], k) * self._count_sequence(symbols[1:], n - k)
+                   for k in range(1, n - len(symbols) + 2))
+
+    def _expand(self, symbol, n):
+        if symbol not in self.grammar:
+            return [symbol]
+        rules = self.grammar[symbol]
+        rule = self._choose([(rule, self._count_sequence(rule.rhs, n)) for rule in rules])
+        return self._expand_sequence(rule.rhs, n)
+
+    def _expand_sequence(self, symbols, n):
+        if not symbols:
+            return []
+        k = self._choose([(k, self.count(symbols[0], k) * self._count_sequence(symbols[1:], n - k))
+                          for k in range(1, n - len(symbols) + 2)])
+        return self._expand(symbols[0], k) + self._expand_sequence(symbols[1:], n - k)
+
+    def _choose(self, weighted):
+        total = sum(weight for _, weight in weighted)
+        pick = self.random.randrange(total)
+        for value, weight in weighted:
+            if pick < weight:
+                return value
+            pick -= weight
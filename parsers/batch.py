@@ -0,0 +1,148 @@
+import itertools
+import os
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley import cache as grammar_cache, scott_2008
+from parsers.shared import read_grammar, read_lexicon
+
+_engine = None
+
+
+class Recognizer:
+    """Batch engine answering whether each sentence is part of the language."""
+
+    def __init__(self, grammar, lexicon, leo=False):
+        self.recognizer = EarleyRecognizer(grammar, lexicon, leo=leo)
+
+    def __call__(self, tokens):
+        return self.recognizer.recognize(tokens)
+
+
+class Parser:
+    """
+    Batch engine returning the SPPF of each sentence (or ``None``).
+    ``grammar`` is a dict of rules or an already compiled grammar.
+    """
+
+    def __init__(self, grammar, leo=False):
+        self.grammar = grammar if isinstance(grammar, CompiledGrammar) else CompiledGrammar(grammar)
+        self.leo = leo
+
+    def __call__(self, tokens):
+        return scott_2008.parse(self.grammar, tokens, leo=self.leo)
+
+
+def _init_worker(engine):
+    global _engine
+    _engine = engine
+
+
+def _run_chunk(chunk, postprocess):
+    results = []
+    for tokens in chunk:
+        result = _engine(tokens)
+        results.append(postprocess(result) if postprocess else result)
+    return results
+
+
+def _chunks(sentences, chunksize):
+    sentences = iter(sentences)
+    while True:
+        chunk = list(itertools.islice(sentences, chunksize))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BatchParser:
+    """
+    Runs one engine over many token sequences. The grammar is loaded and
+    compiled once and shipped to each worker process once, at pool start-up;
+    sentences are sent in chunks of ``chunksize``.
+
+    ``processes=0`` runs everything in the calling process. ``postprocess``
+    is applied to each result inside the worker, e.g. to reduce a forest to
+    something cheaper to send back; it has to be picklable.
+    """
+
+    def __init__(self, engine, processes=None, chunksize=64, postprocess=None):
+        self.engine = engine
+        self.processes = processes
+        self.chunksize = chunksize
+        self.postprocess = postprocess
+
+    @staticmethod
+    def from_files(grammar_path, lexicon_path=None, leo=False, cache=False, **kwargs):
+        """
+        Recognizes with the lexicon if one is given, otherwise builds SPPFs
+        with the Scott (2008) parser. With ``cache`` (``True`` for a cache
+        file next to the grammar, or a directory) the parser's compiled
+        grammar is taken from the on-disk cache and the workers map that
+        file instead of receiving a copy.
+        """
+        if lexicon_path:
+            engine = Recognizer(read_grammar(grammar_path), read_lexicon(lexicon_path), leo=leo)
+        elif cache:
+            cache_dir = None if cache is True else cache
+            engine = Parser(grammar_cache.load(grammar_path, cache_dir=cache_dir), leo=leo)
+        else:
+            engine = Parser(read_grammar(grammar_path), leo=leo)
+        return BatchParser(engine, **kwargs)
+
+    def map(self, sentences):
+        """Yields the results in input order."""
+        for _, result in self._run(sentences, ordered=True):
+            yield result
+
+    def imap_unordered(self, sentences):
+        """Yields ``(index, result)`` pairs as soon as their chunk is done."""
+        return self._run(sentences, ordered=False)
+
+    def _run(self, sentences, ordered):
+        chunks = _chunks(sentences, self.chunksize)
+        if self.processes == 0:
+            _init_worker(self.engine)
+            index = 0
+            for chunk in chunks:
+                for result in _run_chunk(chunk, self.postprocess):
+                    yield index, result
+                    index += 1
+            return
+        with ProcessPoolExecutor(self.processes, initializer=_init_worker,
+                                 initargs=(self.engine,)) as pool:
+            max_pending = 2 * (self.processes or os.cpu_count() or 1)
+            pending, offsets = [], {}
+            offset = 0
+            for chunk in itertools.chain(chunks, [None]):
+                if chunk is not None:
+                    future = pool.submit(_run_chunk, chunk, self.postprocess)
+                    offsets[future] = offset
+                    offset += len(chunk)
+                    pending.append(future)
+                    if len(pending) < max_pending:
+                        continue
+                while pending and (chunk is None or len(pending) >= max_pending):
+                    if ordered:
+                        done = [pending.pop(0)]
+                    else:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        pending = [future for future in pending if future not in done]
+                    for future in done:
+                        start = offsets.pop(future)
+                        for i, result in enumerate(future.result()):
+                            yield start + i, result
+
+
+def is_parsed(result):
+    """Postprocessing that only reports whether a sentence was accepted."""
+    return result is not None and result is not False
+
+
+def batch_recognize(sentences, grammar_path, lexicon_path, **kwargs):
+    return BatchParser.from_files(grammar_path, lexicon_path, **kwargs).map(sentences)
+
+
+def batch_parse(sentences, grammar_path, **kwargs):
+    return BatchParser.from_files(grammar_path, **kwargs).map(sentences)
@@ -0,0 +1,116 @@
+"""
+Client for ``parsers.server``. Requests on one connection are answered
+in any order; responses are matched to them by id.
+
+Run with 'python -m parsers.client --grammar NAME [--port 8765 | --unix
+PATH] [--recognize] [--deadline SECONDS]' and one sentence per line on
+standard input, from the project's root.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import sys
+
+
+class ParseError(Exception):
+    """A request the server answered with an error (e.g. 'deadline exceeded' or 'cancelled')."""
+
+
+class ParseClient:
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self.ids = itertools.count()
+        self.pending = {}
+        self.receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def connect(cls, host='127.0.0.1', port=8765, path=None):
+        """Connects to ``path`` (a Unix socket) if given, otherwise to ``host:port``."""
+        if path is not None:
+            return cls(*await asyncio.open_unix_connection(path))
+        return cls(*await asyncio.open_connection(host, port))
+
+    async def parse(self, grammar, tokens, deadline=None):
+        """``{'accepted': ..., 'derivations': ...}`` for ``tokens``."""
+        return await self.request('parse', grammar, tokens, deadline)
+
+    async def recognize(self, grammar, tokens, deadline=None):
+        return await self.request('recognize', grammar, tokens, deadline)
+
+    async def request(self, op, grammar, tokens, deadline=None):
+        """Sends a request and returns its result; cancelling the caller cancels it on the server too."""
+        request_id = next(self.ids)
+        message = {'id': request_id, 'op': op, 'grammar': grammar, 'tokens': list(tokens)}
+        if deadline is not None:
+            message['deadline'] = deadline
+        response = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = response
+        await self._send(message)
+        try:
+            return await response
+        except asyncio.CancelledError:
+            if not self.writer.is_closing():
+                await self._send({'op': 'cancel', 'id': request_id})
+            raise
+        finally:
+            self.pending.pop(request_id, None)
+
+    async def _send(self, message):
+        self.writer.write(json.dumps(message).encode() + b'\n')
+        await self.writer.drain()
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                response = self.pending.get(message.get('id'))
+                if response is None or response.done():
+                    continue
+                if message['ok']:
+                    response.set_result(message['result'])
+                else:
+                    response.set_exception(ParseError(message['error']))
+        finally:
+            for response in self.pending.values():
+                if not response.done():
+                    response.set_exception(ConnectionError('connection closed'))
+
+    async def close(self):
+        self.writer.close()
+        await self.writer.wait_closed()
+        await asyncio.gather(self.receiver, return_exceptions=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send the sentences on stdin to a parse server.')
+    parser.add_argument('--grammar', required=True)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='connect to a Unix socket instead of TCP')
+    parser.add_argument('--recognize', action='store_true', help='only recognize instead of parsing')
+    parser.add_argument('--deadline', type=float, default=None, help='deadline per sentence in seconds')
+    args = parser.parse_args(argv)
+    op = 'recognize' if args.recognize else 'parse'
+
+    async def run():
+        async with await ParseClient.connect(args.host, args.port, args.unix) as client:
+            requests = [client.request(op, args.grammar, line.split(), args.deadline) for line in sys.stdin]
+            for result in await asyncio.gather(*requests, return_exceptions=True):
+                print(json.dumps(result if isinstance(result, dict) else {'error': str(result)}))
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
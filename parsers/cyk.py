@@ -0,0 +1,210 @@
+"""
+CYK parsing with the cells of the chart as boolean vectors over the
+symbols of the grammar, in the style of Lange and Leiß (2009): instead of
+a strict Chomsky normal form, rules are only split into binary ones, and
+unit rules and empty derivations are handled by a closure over each cell.
+
+A rule ``A -> X1 ... Xn`` with ``n > 2`` becomes ``[A -> X1 X2 . X3 ...]
+-> X1 X2``, ``[A -> X1 X2 X3 . ...] -> [A -> X1 X2 . X3 ...] X3`` and so
+on, with the dotted items as extra symbols. Those are exactly the
+intermediate nodes of ``scott_2008``, so the SPPF built here has the same
+nodes and families as the one of ``scott_2008.parse``.
+
+For a span of length ``l``, the binary rules are applied to all start
+positions and split points at once: for each split ``k`` the vectors of
+the spans ``(i, i + k)`` and ``(i + k, i + l)`` are indexed by the left
+and right symbols of all binary rules, and the rules that apply are
+mapped to their left-hand sides by a boolean matrix product.
+"""
+import numpy as np
+
+from parsers.earley.compiled import EPSILON, Item
+from parsers.earley.scott_2008 import SPPF, Family
+
+
+class CYKGrammar:
+    """
+    Grammar compiled for ``parse``: the symbols, including the dotted
+    items of long rules, are numbered, and the binary rules are kept as
+    arrays of symbol ids. ``closure[b, a]`` says that ``a`` derives ``b``
+    through unit rules and empty derivations.
+    """
+
+    def __init__(self, grammar, start='S'):
+        self.labels = []
+        self.symbol_ids = {}
+        self.start = self.intern(start)
+        self.empty_rules = set()
+        self.units = []  # (lhs, symbol)
+        self.binary = []  # (lhs, left, right)
+        for rules in grammar.values():
+            for rule in rules:
+                self._add(rule)
+        n = len(self.labels)
+        self.nullable = self._nullable()
+        self.lhs = np.array([rule[0] for rule in self.binary], dtype=np.intp)
+        self.left = np.array([rule[1] for rule in self.binary], dtype=np.intp)
+        self.right = np.array([rule[2] for rule in self.binary], dtype=np.intp)
+        self.rule_lhs = np.zeros((len(self.binary), n), dtype=bool)
+        self.rule_lhs[np.arange(len(self.binary)), self.lhs] = True
+        self.binary_by_lhs = [[] for _ in range(n)]
+        for k, (lhs, _, _) in enumerate(self.binary):
+            self.binary_by_lhs[lhs].append(k)
+        self.binary_by_lhs = [np.array(rules, dtype=np.intp) for rules in self.binary_by_lhs]
+        self.units_by_lhs = [[] for _ in range(n)]
+        for lhs, symbol in self.units:
+            self.units_by_lhs[lhs].append(symbol)
+        self.closure = self._closure()
+
+    def intern(self, label):
+        if label not in self.symbol_ids:
+            self.symbol_ids[label] = len(self.labels)
+            self.labels.append(label)
+        return self.symbol_ids[label]
+
+    def _add(self, rule):
+        lhs = self.intern(rule.lhs)
+        rhs = [self.intern(symbol) for symbol in rule.rhs]
+        if not rhs:
+            self.empty_rules.add(lhs)
+        elif len(rhs) == 1:
+            self.units.append((lhs, rhs[0]))
+        else:
+            left = rhs[0]
+            for dot in range(2, len(rhs)):
+                item = self.intern(Item(rule, dot))
+                self.binary.append((item, left, rhs[dot - 1]))
+                left = item
+            self.binary.append((lhs, left, rhs[-1]))
+
+    def _nullable(self):
+        nullable = np.zeros(len(self.labels), dtype=bool)
+        nullable[list(self.empty_rules)] = True
+        changed = True
+        while changed:
+            changed = False
+            for lhs, symbol in self.units:
+                if nullable[symbol] and not nullable[lhs]:
+                    nullable[lhs] = changed = True
+            for lhs, left, right in self.binary:
+                if nullable[left] and nullable[right] and not nullable[lhs]:
+                    nullable[lhs] = changed = True
+        return nullable
+
+    def _closure(self):
+        n = len(self.labels)
+        closure = np.eye(n, dtype=bool)
+        for lhs, symbol in self.units:
+            closure[symbol, lhs] = True
+        for lhs, left, right in self.binary:
+            if self.nullable[left]:
+                closure[right, lhs] = True
+            if self.nullable[right]:
+                closure[left, lhs] = True
+        while True:
+            extended = closure | (closure @ closure)
+            if (extended == closure).all():
+                return closure
+            closure = extended
+
+
+class CYKChart:
+    """``table[i, j]`` is the vector of symbols deriving ``tokens[i:j]``."""
+
+    def __init__(self, grammar, tokens):
+        self.grammar = grammar
+        self.tokens = tokens
+        self.table = np.zeros((len(tokens) + 1, len(tokens) + 1, len(grammar.labels)), dtype=bool)
+        self.nodes = {}
+
+    def fill(self):
+        g = self.grammar
+        n = len(self.tokens)
+        for i in range(n + 1):
+            self.table[i, i] = g.nullable
+        for i, token in enumerate(self.tokens):
+            if token in g.symbol_ids:
+                self.table[i, i + 1] = g.closure[g.symbol_ids[token]]
+        for length in range(2, n + 1):
+            starts = np.arange(n - length + 1)
+            applied = np.zeros((len(starts), len(g.binary)), dtype=bool)
+            for k in range(1, length):
+                left = self.table[starts, starts + k][:, g.left]
+                right = self.table[starts + k, starts + length][:, g.right]
+                applied |= left & right
+            derived = applied @ g.rule_lhs
+            self.table[starts, starts + length] = derived @ g.closure
+        return self
+
+    def recognize(self):
+        return bool(len(self.tokens) and self.table[0, len(self.tokens), self.grammar.start])
+
+    def find_root(self):
+        if not self.recognize():
+            return None
+        return self.node(self.grammar.start, 0, len(self.tokens))
+
+    def node(self, symbol, start, end):
+        """Returns the SPPF node for ``symbol`` over ``start..end``, building its families below it."""
+        key = (symbol, start, end)
+        if key in self.nodes:
+            return self.nodes[key]
+        root = self.nodes[key] = SPPF(self.grammar.labels[symbol], start, end)
+        agenda = [key]
+        while agenda:
+            symbol, start, end = agenda.pop()
+            for family in self._families(symbol, start, end):
+                self.nodes[(symbol, start, end)].add_family(Family(*(
+                    self._child(child, agenda) for child in family)))
+        return root
+
+    def _child(self, key, agenda):
+        if key is None:
+            return None
+        if key not in self.nodes:
+            symbol, start, end = key
+            if symbol == EPSILON:
+                self.nodes[key] = SPPF(EPSILON, start, end)
+            else:
+                self.nodes[key] = SPPF(self.grammar.labels[symbol], start, end)
+                agenda.append(key)
+        return self.nodes[key]
+
+    def _families(self, symbol, start, end):
+        """Yields the families of a node as pairs of ``(symbol, start, end)`` keys (or ``None``)."""
+        g, table = self.grammar, self.table
+        if start == end and symbol in g.empty_rules:
+            yield None, (EPSILON, start, end)
+        for child in g.units_by_lhs[symbol]:
+            if table[start, end, child]:
+                yield None, (child, start, end)
+        rules = g.binary_by_lhs[symbol]
+        if len(rules):
+            splits = np.arange(start, end + 1)
+            left = table[start, splits][:, g.left[rules]]
+            right = table[splits, end][:, g.right[rules]]
+            for k, rule in zip(*np.nonzero(left & right)):
+                split = start + int(k)
+                yield (int(g.left[rules[rule]]), start, split), (int(g.right[rules[rule]]), split, end)
+
+
+def _compiled(grammar, start):
+    if isinstance(grammar, CYKGrammar):
+        return grammar
+    return CYKGrammar(grammar, start)
+
+
+def build_chart(grammar, tokens, start='S'):
+    """Fills the CYK table for ``tokens``; ``grammar`` is a dict of rules or a ``CYKGrammar``."""
+    return CYKChart(_compiled(grammar, start), tokens).fill()
+
+
+def recognize(grammar, tokens, start='S'):
+    return build_chart(grammar, tokens, start).recognize()
+
+
+def parse(grammar, tokens, start='S'):
+    """Like ``scott_2008.parse``: the root of the SPPF for ``tokens``, or ``None``."""
+    if len(tokens) == 0:
+        return None
+    return build_chart(grammar, tokens, start).find_root()
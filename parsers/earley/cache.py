@@ -0,0 +1,249 @@
+"""
+On-disk cache of compiled grammars.
+
+``load`` compiles a grammar file (and optionally a lexicon) once and stores
+the result in a binary file named after the configuration (the lexicon
+file and the start symbol) and a SHA-256 hash of the sources' contents,
+next to the grammar or in ``cache_dir``. Editing a source changes the
+hash, so stale entries are never read; when the new entry is written, the
+entries of the same configuration with other hashes are deleted. Entries
+of other configurations are left alone.
+
+The file holds a small JSON header (symbols and rules) followed by the
+per-item and per-rule tables as flat arrays of C ints. Loading maps the
+file read-only and uses the arrays in place, so worker processes that load
+the same grammar share one copy through the page cache, and a
+``MappedGrammar`` is pickled as its path and source paths only. If the
+file is gone when it is unpickled, the grammar is loaded from the sources
+again.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+from parsers.earley.compiled import CompiledGrammar, EPSILON, Item, Rule, START
+from parsers.shared import Rule as SourceRule, read_grammar, read_lexicon
+
+MAGIC = b'PCG\x01'
+SUFFIX = '.cgc'
+_HEADER = struct.Struct('<4sI')
+
+# Tables stored as int arrays and used in place.
+_ITEM_ARRAYS = ('rule_lhs', 'rule_first_item', 'item_rule', 'item_dot', 'item_lhs', 'item_next',
+                'item_label', 'is_nonterminal')
+_ARRAYS = _ITEM_ARRAYS + ('nullable', 'predictions', 'prediction_offsets', 'nullable_predictions',
+                          'nullable_offsets', 'lookahead_terminals', 'lookahead_offsets', 'lookahead_items',
+                          'lookahead_item_offsets')
+_HEADER_KEYS = ('byteorder', 'itemsize', 'symbols', 'start', 'rules', 'arrays')
+
+
+def source_key(grammar_path, lexicon_path=None, start='S'):
+    """Hash of the source files' contents and the start symbol."""
+    digest = hashlib.sha256(MAGIC + start.encode())
+    for path in (grammar_path, lexicon_path):
+        if path is None:
+            continue
+        with open(path, 'rb') as fin:
+            contents = fin.read()
+        digest.update(struct.pack('<Q', len(contents)))
+        digest.update(contents)
+    return digest.hexdigest()
+
+
+def cache_path(grammar_path, lexicon_path=None, start='S', cache_dir=None):
+    directory = cache_dir or os.path.dirname(os.path.abspath(grammar_path))
+    key = source_key(grammar_path, lexicon_path, start)
+    return os.path.join(directory, '{}.{}{}'.format(_prefix(grammar_path, lexicon_path, start), key[:32], SUFFIX))
+
+
+def _prefix(grammar_path, lexicon_path, start):
+    """File name prefix shared by the entries of one grammar file, lexicon file and start symbol."""
+    configuration = json.dumps([os.path.abspath(lexicon_path) if lexicon_path else None, start])
+    return '.{}.{}'.format(os.path.basename(grammar_path), hashlib.sha256(configuration.encode()).hexdigest()[:8])
+
+
+def load(grammar_path, lexicon_path=None, start='S', cache_dir=None):
+    """
+    Returns the compiled grammar, from the cache if it is up to date.
+    Lexicon entries become rules ``category -> word``, so the compiled
+    grammar parses the words themselves.
+    """
+    path = cache_path(grammar_path, lexicon_path, start, cache_dir)
+    try:
+        return read(path)
+    except (OSError, ValueError):
+        pass
+    grammar = read_grammar(grammar_path)
+    if lexicon_path:
+        for category, words in read_lexicon(lexicon_path).items():
+            grammar.setdefault(category, []).extend(SourceRule(category, (word,)) for word in words)
+    compiled = CompiledGrammar(grammar, start)
+    write(compiled, path, {'grammar_path': os.path.abspath(grammar_path),
+                           'lexicon_path': os.path.abspath(lexicon_path) if lexicon_path else None,
+                           'start': start, 'cache_dir': os.path.abspath(cache_dir) if cache_dir else None})
+    _remove_stale(path, _prefix(grammar_path, lexicon_path, start))
+    return read(path)
+
+
+def _remove_stale(path, prefix):
+    directory, name = os.path.split(path)
+    prefix += '.'
+    for other in os.listdir(directory):
+        if other != name and other.startswith(prefix) and other.endswith(SUFFIX):
+            try:
+                os.remove(os.path.join(directory, other))
+            except OSError:
+                pass
+
+
+def write(grammar, path, source=None):
+    """
+    Writes ``grammar`` atomically: readers see the old file or the complete
+    new one. ``source`` holds the arguments of ``load`` that rebuild it.
+    """
+    arrays = {name: list(getattr(grammar, name)) for name in _ITEM_ARRAYS}
+    arrays['is_nonterminal'] = [int(flag) for flag in grammar.is_nonterminal]
+    arrays['nullable'] = sorted(grammar.nullable)
+    arrays['predictions'], arrays['prediction_offsets'] = _flatten(grammar.predictions)
+    arrays['nullable_predictions'], arrays['nullable_offsets'] = _flatten(grammar.nullable_predictions)
+    terminals, items = [], []
+    for table in grammar.lookahead_predictions:
+        terminals.append(sorted(table))
+        items.extend(table[terminal] for terminal in sorted(table))
+    arrays['lookahead_terminals'], arrays['lookahead_offsets'] = _flatten(terminals)
+    arrays['lookahead_items'], arrays['lookahead_item_offsets'] = _flatten(items)
+
+    layout, offset = {}, 0
+    for name, values in arrays.items():
+        layout[name] = [offset, len(values)]
+        offset += len(values)
+    header = json.dumps({
+        'byteorder': sys.byteorder,
+        'itemsize': array('i').itemsize,
+        'symbols': grammar.symbols,
+        'start': grammar.symbols[grammar.start],
+        'rules': [[rule.lhs, list(rule.rhs), getattr(rule, 'prob', 1.0)] for rule in grammar.rules[1:]],
+        'arrays': layout,
+        'source': source,
+    }).encode()
+    header += b' ' * (-(len(header) + _HEADER.size) % 8)
+
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fout:
+            fout.write(_HEADER.pack(MAGIC, len(header)))
+            fout.write(header)
+            for values in arrays.values():
+                array('i', values).tofile(fout)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+def _flatten(sequences):
+    values, offsets = [], [0]
+    for sequence in sequences:
+        values.extend(sequence)
+        offsets.append(len(values))
+    return values, offsets
+
+
+def read(path):
+    """Maps a cache file; raises ``ValueError`` if it is not a valid cache for this platform."""
+    with open(path, 'rb') as fin:
+        buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+    if len(buffer) < _HEADER.size:
+        raise ValueError('truncated grammar cache: ' + path)
+    magic, header_size = _HEADER.unpack_from(buffer)
+    if magic != MAGIC:
+        raise ValueError('not a grammar cache: ' + path)
+    header = json.loads(bytes(buffer[_HEADER.size:_HEADER.size + header_size]))
+    if not isinstance(header, dict) or any(key not in header for key in _HEADER_KEYS) \
+            or not isinstance(header['arrays'], dict) or any(name not in header['arrays'] for name in _ARRAYS):
+        raise ValueError('incomplete grammar cache header: ' + path)
+    if header['byteorder'] != sys.byteorder or header['itemsize'] != array('i').itemsize:
+        raise ValueError('grammar cache written on another platform: ' + path)
+    data = memoryview(buffer)[_HEADER.size + header_size:]
+    if len(data) % header['itemsize']:
+        raise ValueError('truncated grammar cache: ' + path)
+    data = data.cast('i')
+    for offset, length in header['arrays'].values():
+        if not 0 <= offset <= offset + length <= len(data):
+            raise ValueError('truncated grammar cache: ' + path)
+    arrays = {name: data[offset:offset + length] for name, (offset, length) in header['arrays'].items()}
+    return MappedGrammar(path, buffer, header, arrays)
+
+
+class MappedGrammar(CompiledGrammar):
+    """
+    A ``CompiledGrammar`` read from a cache file. The item and rule tables
+    are read-only views of the mapped file instead of lists.
+    """
+
+    def __init__(self, path, buffer, header, arrays):
+        self.path = path
+        self.source = header.get('source')
+        self._buffer = buffer
+        self.symbols = header['symbols']
+        self.symbol_ids = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.rules = [Rule(START, (header['start'],))]
+        self.rules.extend(SourceRule(lhs, tuple(rhs), prob) for lhs, rhs, prob in header['rules'])
+        self.start = self.symbol_ids[header['start']]
+        self.augmented_start = self.symbol_ids[START]
+        self.epsilon = self.symbol_ids[EPSILON]
+        for name in _ITEM_ARRAYS:
+            setattr(self, name, arrays[name])
+        self.start_item = 0
+        self.nullable = frozenset(arrays['nullable'])
+        self.predictions = _unflatten(arrays['predictions'], arrays['prediction_offsets'])
+        self.nullable_predictions = _unflatten(arrays['nullable_predictions'], arrays['nullable_offsets'])
+        items = _unflatten(arrays['lookahead_items'], arrays['lookahead_item_offsets'])
+        entries = iter(items)
+        self.lookahead_predictions = [{terminal: next(entries) for terminal in terminals} for terminals
+                                      in _unflatten(arrays['lookahead_terminals'], arrays['lookahead_offsets'])]
+        self.labels = _Labels(self)
+
+    def __reduce__(self):
+        return _unpickle, (self.path, self.source)
+
+
+def _unpickle(path, source):
+    """Maps ``path`` again or, if it was removed meanwhile, loads the grammar from its sources."""
+    try:
+        return read(path)
+    except (OSError, ValueError):
+        if source is None:
+            raise
+        return load(**source)
+
+
+def _unflatten(values, offsets):
+    return [tuple(values[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+
+
+class _Labels:
+    """``CompiledGrammar.labels`` built on demand: only labels used in a forest become objects."""
+
+    def __init__(self, grammar):
+        self.grammar = grammar
+        self.items = {}
+
+    def __len__(self):
+        return len(self.grammar.symbols) + len(self.grammar.item_rule)
+
+    def __getitem__(self, label):
+        grammar = self.grammar
+        if label < len(grammar.symbols):
+            return grammar.symbols[label]
+        item = label - len(grammar.symbols)
+        if item not in self.items:
+            self.items[item] = Item(grammar.rules[grammar.item_rule[item]], grammar.item_dot[item])
+        return self.items[item]
@@ -0,0 +1,291 @@
+"""
+Earley recognizers specialized to one grammar and lexicon.
+
+``generate`` turns a grammar and lexicon (as read by ``read_grammar`` and
+``read_lexicon``) into the source of a standalone Python module. Dotted
+rules are numbered, and everything ``EarleyRecognizer`` looks up in the
+grammar dicts on every step is computed once and written out as tuple and
+dict literals:
+
+- ``NEXT[item]`` and ``LHS[item]``: the symbol after the dot (or
+  ``COMPLETE``) and the left-hand side, so an item is a pair of ints and
+  no ``Rule`` or ``State`` is allocated while parsing,
+- ``PREDICT[symbol]``: all items predicted for a nonterminal, including
+  the transitive predictions and the items moved over nullable symbols,
+  and ``PREDICTED[symbol]`` the nonterminals this covers,
+- ``WORDS`` and ``PHRASES``: the lexicon indexed by word, scanning to the
+  ids of the categories.
+
+Empty rules are handled as by Aycock and Horspool (2002): an item
+expecting a nullable nonterminal is also advanced over it.
+
+``specialize`` returns the module for a grammar, generated once per
+content hash: modules are kept in ``sys.modules`` and, with a
+``cache_dir``, written there as ``_earley_<hash>.py``, where later
+processes import them without generating again.
+"""
+import hashlib
+import importlib.util
+import os
+import sys
+import tempfile
+
+from parsers.lexicon import Lexicon
+from parsers.shared import read_grammar, read_lexicon
+
+VERSION = 1
+START = 'START'
+COMPLETE = -1
+
+_RUNTIME = '''
+
+def matches(tokens, i):
+    """Maps the categories of the lexical entries starting at ``tokens[i]`` to their end positions."""
+    found = {}
+    for category in WORDS.get(tokens[i], ()):
+        found[category] = [i + 1]
+    for rest, category in PHRASES.get(tokens[i], ()):
+        end = i + 1 + len(rest)
+        if tuple(tokens[i + 1:end]) == rest:
+            found.setdefault(category, []).append(end)
+    return found
+
+
+def _fill(tokens):
+    n = len(tokens)
+    sets = [[] for _ in range(n + 1)]
+    seen = [set() for _ in range(n + 1)]
+    waiting = [{} for _ in range(n + 1)]
+    sets[0].append((START_ITEM, 0))
+    seen[0].add((START_ITEM, 0))
+    for i in range(n + 1):
+        items, curr_seen, curr_waiting = sets[i], seen[i], waiting[i]
+        found = matches(tokens, i) if i < n else {}
+        predicted = set()
+        k = 0
+        while k < len(items):
+            item, start = items[k]
+            k += 1
+            symbol = NEXT[item]
+            if symbol == COMPLETE:
+                for waiting_item, waiting_start in waiting[start].get(LHS[item], ()):
+                    new = (waiting_item + 1, waiting_start)
+                    if new not in curr_seen:
+                        curr_seen.add(new)
+                        items.append(new)
+            elif symbol in found:
+                new = (item + 1, start)
+                for end in found[symbol]:
+                    if new not in seen[end]:
+                        seen[end].add(new)
+                        sets[end].append(new)
+            elif IS_NONTERMINAL[symbol]:
+                curr_waiting.setdefault(symbol, []).append((item, start))
+                if symbol not in predicted:
+                    predicted.update(PREDICTED[symbol])
+                    for predicted_item in PREDICT[symbol]:
+                        new = (predicted_item, i)
+                        if new not in curr_seen:
+                            curr_seen.add(new)
+                            items.append(new)
+                if symbol in NULLABLE:
+                    new = (item + 1, start)
+                    if new not in curr_seen:
+                        curr_seen.add(new)
+                        items.append(new)
+    return sets, seen
+
+
+def build_chart(tokens):
+    """The Earley sets for ``tokens`` as lists of ``(item, start)`` pairs (see ``ITEMS``)."""
+    return _fill(tokens)[0]
+
+
+def recognize(tokens):
+    return (ACCEPT_ITEM, 0) in _fill(tokens)[1][-1]
+'''
+
+
+class _Tables:
+    """Numbers the symbols and dotted rules of a grammar and computes the tables of the generated module."""
+
+    def __init__(self, grammar, lexicon, start):
+        self.symbols, self.symbol_ids = [], {}
+        self.rules = [(START, (start,))]
+        self.rules.extend((rule.lhs, tuple(rule.rhs)) for rules in grammar.values() for rule in rules)
+        self.lexicon = _entries(lexicon)
+        self.categories = {category for category, _ in self.lexicon}
+        for lhs, rhs in self.rules:
+            for symbol in (lhs,) + rhs:
+                self.intern(symbol)
+        for category, _ in self.lexicon:
+            self.intern(category)
+        self.is_nonterminal = [symbol not in self.categories for symbol in self.symbols]
+        self.items, self.next, self.lhs, self.first_items = [], [], [], [[] for _ in self.symbols]
+        for lhs, rhs in self.rules:
+            self.first_items[self.symbol_ids[lhs]].append(len(self.items))
+            for dot in range(len(rhs) + 1):
+                self.items.append('{} -> {}'.format(lhs, ' '.join(rhs[:dot] + ('.',) + rhs[dot:])))
+                self.next.append(self.symbol_ids[rhs[dot]] if dot < len(rhs) else COMPLETE)
+                self.lhs.append(self.symbol_ids[lhs])
+        self.nullable = self._nullable()
+
+    def intern(self, symbol):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self.symbol_ids[symbol]
+
+    def _nullable(self):
+        nullable, changed = set(), True
+        while changed:
+            changed = False
+            for lhs, rhs in self.rules:
+                lhs = self.symbol_ids[lhs]
+                if lhs not in nullable and self.is_nonterminal[lhs] \
+                        and all(self.symbol_ids[symbol] in nullable for symbol in rhs):
+                    nullable.add(lhs)
+                    changed = True
+        return nullable
+
+    def prediction(self, symbol):
+        """The items predicted for ``symbol`` and the nonterminals predicted with it."""
+        items, predicted, agenda = [], {symbol}, list(self.first_items[symbol])
+        seen = set(agenda)
+        while agenda:
+            item = agenda.pop(0)
+            items.append(item)
+            following = []
+            next_symbol = self.next[item]
+            if next_symbol != COMPLETE and self.is_nonterminal[next_symbol]:
+                if next_symbol not in predicted:
+                    predicted.add(next_symbol)
+                    following.extend(self.first_items[next_symbol])
+                if next_symbol in self.nullable:
+                    following.append(item + 1)
+            for new in following:
+                if new not in seen:
+                    seen.add(new)
+                    agenda.append(new)
+        return tuple(items), frozenset(predicted)
+
+    def source(self, key):
+        predictions = [self.prediction(symbol) if self.is_nonterminal[symbol] else ((), frozenset())
+                       for symbol in range(len(self.symbols))]
+        words, phrases = {}, {}
+        for category, entry in self.lexicon:
+            category = self.symbol_ids[category]
+            if len(entry) == 1:
+                words.setdefault(entry[0], []).append(category)
+            else:
+                phrases.setdefault(entry[0], []).append((entry[1:], category))
+        tables = [
+            ('VERSION', VERSION),
+            ('GRAMMAR_HASH', key),
+            ('COMPLETE', COMPLETE),
+            ('SYMBOLS', tuple(self.symbols)),
+            ('ITEMS', tuple(self.items)),
+            ('START_ITEM', 0),
+            ('ACCEPT_ITEM', len(self.rules[0][1])),
+            ('NEXT', tuple(self.next)),
+            ('LHS', tuple(self.lhs)),
+            ('IS_NONTERMINAL', tuple(self.is_nonterminal)),
+            ('NULLABLE', frozenset(self.nullable)),
+            ('PREDICT', tuple(items for items, _ in predictions)),
+            ('PREDICTED', tuple(symbols for _, symbols in predictions)),
+            ('WORDS', {word: tuple(sorted(set(ids))) for word, ids in words.items()}),
+            ('PHRASES', {word: tuple(entries) for word, entries in phrases.items()}),
+        ]
+        lines = ['"""', 'Earley recognizer generated by parsers.earley.codegen; do not edit.', '"""']
+        lines.extend('{} = {!r}'.format(name, value) for name, value in tables)
+        return '\n'.join(lines) + '\n' + _RUNTIME
+
+
+def _entries(lexicon):
+    """``(category, words)`` pairs with ``words`` a tuple of tokens."""
+    if isinstance(lexicon, Lexicon) and lexicon.normalize:
+        raise ValueError('lexicons with a normalize function cannot be specialized')
+    return [(category, (words,) if isinstance(words, str) else tuple(words))
+            for category in lexicon for words in lexicon[category]]
+
+
+def grammar_key(grammar, lexicon, start='S'):
+    """SHA-256 hash of the rules, the lexical entries, the start symbol and the generator's version."""
+    digest = hashlib.sha256('{}\n{}\n'.format(VERSION, start).encode())
+    for rules in grammar.values():
+        for rule in rules:
+            digest.update('{}\n'.format(rule).encode())
+    digest.update(b'\n')
+    for category, words in _entries(lexicon):
+        digest.update('{} -> {}\n'.format(category, ' '.join(words)).encode())
+    return digest.hexdigest()
+
+
+def generate(grammar, lexicon, start='S'):
+    """The source of the recognizer module for ``grammar`` and ``lexicon``."""
+    return _Tables(grammar, lexicon, start).source(grammar_key(grammar, lexicon, start))
+
+
+def module_name(key):
+    return '_earley_' + key[:32]
+
+
+def specialize(grammar, lexicon, start='S', cache_dir=None):
+    """
+    Returns the recognizer module for ``grammar`` and ``lexicon``; it has
+    ``recognize(tokens)`` and ``build_chart(tokens)``. Without
+    ``cache_dir`` the module only lives in this process.
+    """
+    key = grammar_key(grammar, lexicon, start)
+    name = module_name(key)
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    if cache_dir is None:
+        spec = importlib.util.spec_from_loader(name, loader=None)
+        module = importlib.util.module_from_spec(spec)
+        exec(compile(generate(grammar, lexicon, start), '<{}>'.format(name), 'exec'), module.__dict__)
+    else:
+        path = os.path.join(cache_dir, name + '.py')
+        if not os.path.exists(path):
+            _write(generate(grammar, lexicon, start), path)
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    sys.modules[name] = module
+    return module
+
+
+def load(grammar_path, lexicon_path, start='S', cache_dir=None):
+    """``specialize`` for a grammar and lexicon file, caching the module next to the grammar or in ``cache_dir``."""
+    directory = cache_dir or os.path.dirname(os.path.abspath(grammar_path))
+    return specialize(read_grammar(grammar_path), read_lexicon(lexicon_path), start, directory)
+
+
+def _write(source, path):
+    """Writes ``source`` atomically, so concurrent processes never import half a module."""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as fout:
+            fout.write(source)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+
+class SpecializedRecognizer:
+    """Drop-in for ``EarleyRecognizer.recognize`` and ``has_parse`` running a generated module."""
+
+    def __init__(self, grammar, lexicon, start='S', cache_dir=None):
+        self.module = specialize(grammar, lexicon, start, cache_dir)
+        self.chart = None
+
+    def recognize(self, tokens):
+        self.chart = self.module.build_chart(tokens)
+        return self.has_parse()
+
+    def has_parse(self):
+        return (self.module.ACCEPT_ITEM, 0) in self.chart[-1]
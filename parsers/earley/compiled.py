@@ -0,0 +1,160 @@
+import collections
+import functools
+
+from parsers.grammar_analysis import PredictionTable
+
+Rule = collections.namedtuple("Rule", ["lhs", "rhs"])
+COMPLETE = -1
+START = 'START'
+EPSILON = 'eps'
+
+
+class Item:
+    __slots__ = ('rule', 'dot', '_hash')
+
+    def __init__(self, rule, dot):
+        self.rule = rule
+        self.dot = dot
+        self._hash = hash((rule, dot))
+
+    def __repr__(self):
+        rhs = list(self.rule.rhs)
+        rhs.insert(self.dot, '.')
+        rhs_string = ' '.join(rhs)
+        return '{} -> {}'.format(self.rule.lhs, rhs_string)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        return (type(self) == type(other)
+                and self._hash == other._hash
+                and self.rule == other.rule
+                and self.dot == other.dot)
+
+
+class CompiledGrammar:
+    """
+    Grammar with symbols interned to ints and every dotted item numbered
+    once up front. The items of a rule are numbered consecutively, so moving
+    the dot is ``item + 1``. Chart entries of the parsers can then be tuples
+    of ints instead of object graphs.
+
+    Rule 0 is the augmented start rule ``START -> S``.
+    """
+
+    def __init__(self, grammar, start='S'):
+        self.symbols = []
+        self.symbol_ids = {}
+        self.rules = [Rule(START, (start,))]
+        for rules in grammar.values():
+            self.rules.extend(rules)
+
+        for name in (START, EPSILON):
+            self.intern(name)
+        for rule in self.rules:
+            self.intern(rule.lhs)
+            for symbol in rule.rhs:
+                self.intern(symbol)
+        self.start = self.symbol_ids[start]
+        self.augmented_start = self.symbol_ids[START]
+        self.epsilon = self.symbol_ids[EPSILON]
+        self.is_nonterminal = [False] * len(self.symbols)
+        for rule in self.rules:
+            self.is_nonterminal[self.symbol_ids[rule.lhs]] = True
+
+        self.rule_lhs = []
+        self.rule_first_item = []
+        self.item_rule = []
+        self.item_dot = []
+        self.item_lhs = []
+        self.item_next = []
+        self.predictions = [[] for _ in self.symbols]
+        for rule_id, rule in enumerate(self.rules):
+            lhs = self.symbol_ids[rule.lhs]
+            self.rule_lhs.append(lhs)
+            self.rule_first_item.append(len(self.item_rule))
+            if rule_id > 0:
+                self.predictions[lhs].append(len(self.item_rule))
+            for dot in range(len(rule.rhs) + 1):
+                self.item_rule.append(rule_id)
+                self.item_dot.append(dot)
+                self.item_lhs.append(lhs)
+                if dot < len(rule.rhs):
+                    self.item_next.append(self.symbol_ids[rule.rhs[dot]])
+                else:
+                    self.item_next.append(COMPLETE)
+        self.predictions = [tuple(items) for items in self.predictions]
+        self.start_item = 0
+
+        # SPPF labels: complete items are labelled with their lhs symbol,
+        # all other items with themselves (offset past the symbol ids).
+        self.item_label = [lhs if nxt == COMPLETE else len(self.symbols) + item
+                           for item, (lhs, nxt)
+                           in enumerate(zip(self.item_lhs, self.item_next))]
+        self.labels = list(self.symbols)
+        self.labels.extend(Item(self.rules[rule], dot)
+                           for rule, dot in zip(self.item_rule, self.item_dot))
+        self.nullable = self._nullable()
+
+    @functools.cached_property
+    def lookahead_predictions(self):
+        """Per nonterminal, the predictions filtered by the next token's id, built on first use."""
+        self._lookahead_predictions()
+        return self.lookahead_predictions
+
+    @functools.cached_property
+    def nullable_predictions(self):
+        """Per nonterminal, the predictions kept for any token or the end of input, built on first use."""
+        self._lookahead_predictions()
+        return self.nullable_predictions
+
+    def _lookahead_predictions(self):
+        """
+        Computes ``lookahead_predictions`` and ``nullable_predictions``. Only
+        parses with lookahead need them, and the FIRST sets behind them are a
+        large part of the compile time.
+        """
+        grammar = {}
+        for rule in self.rules[1:]:
+            grammar.setdefault(rule.lhs, []).append(rule)
+        table = PredictionTable(grammar)
+        first_items = {id(rule): self.rule_first_item[rule_id]
+                       for rule_id, rule in enumerate(self.rules)}
+        self.lookahead_predictions = [{} for _ in self.symbols]
+        self.nullable_predictions = [() for _ in self.symbols]
+        for lhs in grammar:
+            symbol = self.symbol_ids[lhs]
+            self.nullable_predictions[symbol] = tuple(first_items[id(rule)] for rule in table.always[lhs])
+            for terminal, rules in table.table[lhs].items():
+                self.lookahead_predictions[symbol][self.symbol_ids[terminal]] = tuple(
+                    first_items[id(rule)] for rule in rules)
+
+    def intern(self, symbol):
+        if symbol not in self.symbol_ids:
+            self.symbol_ids[symbol] = len(self.symbols)
+            self.symbols.append(symbol)
+        return self.symbol_ids[symbol]
+
+    def _nullable(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for rule_id, rule in enumerate(self.rules):
+                lhs = self.rule_lhs[rule_id]
+                if lhs not in nullable and all(
+                        self.symbol_ids[symbol] in nullable for symbol in rule.rhs):
+                    nullable.add(lhs)
+                    changed = True
+        return frozenset(nullable)
+
+    def symbol_id(self, symbol):
+        """Id of ``symbol`` or ``None`` if it does not occur in the grammar."""
+        return self.symbol_ids.get(symbol)
+
+    def is_complete(self, item):
+        return self.item_next[item] == COMPLETE
+
+    def item_repr(self, item):
+        return repr(self.labels[len(self.symbols) + item])
@@ -1,14 +1,20 @@
 import logging
-from functools import wraps
 
+from parsers.grammar_analysis import PredictionTable, END
+from parsers.lexicon import Lexicon
 from parsers.shared import Rule, read_lexicon, read_grammar, INDENT
+from parsers.stats import counted
+from parsers.tracing import trace, logging_tracer
 
 
 class State:
+    __slots__ = ('rule', 'dot', 'span', '_hash')
+
     def __init__(self, rule, dot, span):
         self.rule = rule
         self.dot = dot
         self.span = span
+        self._hash = hash((rule, dot, span))
 
     def __repr__(self):
         rhs = list(self.rule.rhs)
@@ -16,10 +22,11 @@ class State:
         return '{} -> {} [{}, {}]'.format(self.rule.lhs, ' '.join(rhs), self.start, self.end)
 
     def __hash__(self):
-        return hash((self.rule, self.dot, self.span))
+        return self._hash
 
     def __eq__(self, other):
         return (type(self) == type(other)
+                and self._hash == other._hash
                 and self.rule == other.rule
                 and self.dot == other.dot
                 and self.span == other.span)
@@ -45,72 +52,175 @@ class State:
         return self.rule.rhs[self.dot]
 
 
-def log(func):
-    @wraps(func)
-    def wrapper(s, state):
-        f_string = '{}({})'
-        if func.__name__ == 'enqueue':
-            f_string = INDENT + f_string
-        logging.info(f_string.format(func.__name__, state))
-        func(s, state)
-
-    return wrapper
+def _end(state):
+    return state.end
 
 
 class EarleyRecognizer:
     """
     Earley recognizer implementation for educational purposes following
     pseudo code from Jurafsky and Martin (2009, p. 478).
+
+    With ``leo=True`` completions along deterministic reduction paths jump
+    straight to the topmost item (Leo 1991), which makes right recursion
+    linear instead of quadratic. The skipped intermediate items are then
+    missing from the chart.
+
+    With ``lookahead=True`` only rules whose FIRST set contains a category
+    of the next token (or that derive the empty string) are predicted.
+
+    ``lexicon`` is a ``parsers.lexicon.Lexicon`` or a dict mapping
+    categories to words, which is indexed by word on construction. Each
+    position is looked up once for all categories.
+
+    ``tracer`` receives an event for every enqueue, predict, scan and
+    complete (see ``parsers.tracing``). ``stats``, a
+    ``parsers.stats.ParseStats``, is filled with the counts and times of
+    these operations, the items per Earley set and per rule, and the
+    enqueues rejected as duplicates.
     """
 
-    def __init__(self, grammar, lexicon):
+    def __init__(self, grammar, lexicon, leo=False, lookahead=False, tracer=None, stats=None):
         self.grammar = grammar
-        self.lexicon = lexicon
+        self.lexicon = lexicon if isinstance(lexicon, Lexicon) else Lexicon(lexicon)
+        self.leo = leo
+        self.table = PredictionTable(grammar) if lookahead else None
+        self.matched = None
+        if tracer:
+            for op in ('enqueue', 'predict', 'scan', 'complete'):
+                setattr(self, op, trace(getattr(self, op), op, tracer, _end))
+        self.stats = stats
+        if stats:
+            for op in ('recognize', 'predict', 'scan', 'complete'):
+                setattr(self, op, counted(getattr(self, op), op, stats))
+            self.enqueue = self._counting_enqueue(self.enqueue)
         self.states = None
         self.chart = None
+        self.waiting = None
+        self.predicted = None
+        self.transitive = None
         self.tokens = None
 
     def recognize(self, tokens):
+        self.reset(tokens)
+        for _ in range(len(tokens)):
+            self.add_column()
+        for i in range(len(self.chart)):
+            self.process(i)
+        return self.has_parse()
+
+    def reset(self, tokens):
+        """Starts a new chart with only the first Earley set."""
         self.states = set()
-        self.chart = [[] for _ in range(len(tokens) + 1)]
+        self.chart = []
+        self.waiting = []
+        self.predicted = []
+        self.transitive = []
+        self.matched = {}
         self.tokens = tokens
+        self.add_column()
         self.enqueue(State(Rule.from_str('START -> S'), 0, (0, 0)))
-        for i in range(len(self.chart)):
-            for state in self.chart[i]:
-                if not state.is_complete:
-                    if state.next_cat not in self.lexicon:
-                        self.predict(state)
-                    else:
-                        self.scan(state)
+
+    def add_column(self):
+        self.chart.append([])
+        self.waiting.append({})
+        self.predicted.append(set())
+        self.transitive.append({})
+
+    def process(self, i):
+        """Runs predictor, scanner and completer over Earley set ``i``."""
+        for state in self.chart[i]:
+            if not state.is_complete:
+                if state.next_cat not in self.lexicon:
+                    self.predict(state)
                 else:
-                    self.complete(state)
-        return self.has_parse()
+                    self.scan(state)
+            else:
+                self.complete(state)
 
-    @log
     def enqueue(self, state):
         if state not in self.states:
             self.chart[state.end].append(state)
             self.states.add(state)
+            if not state.is_complete:
+                self.waiting[state.end].setdefault(state.next_cat, []).append(state)
+
+    def _counting_enqueue(self, enqueue):
+        stats = self.stats
+
+        def wrapper(state):
+            if state in self.states:
+                stats.count('duplicate')
+            else:
+                stats.add_item(state.end, state.rule)
+            enqueue(state)
+        return wrapper
 
-    @log
     def predict(self, state):
-        for rule in self.grammar[state.next_cat]:
+        if state.next_cat in self.predicted[state.end]:
+            return
+        self.predicted[state.end].add(state.next_cat)
+        rules = self.grammar[state.next_cat]
+        if self.table:
+            rules = self.table.predict(state.next_cat, self.lookahead(state.end))
+        for rule in rules:
             self.enqueue(State(Rule(state.next_cat, rule.rhs),
                                0, (state.end, state.end)))
 
-    @log
     def scan(self, state):
-        if (state.end < len(self.tokens) and state.next_cat in self.lexicon
-                and self.tokens[state.end] in self.lexicon[state.next_cat]):
+        for end in self.matches(state.end).get(state.next_cat, ()):
             self.enqueue(State(state.rule, state.dot + 1,
-                               (state.start, state.end + 1)))
+                               (state.start, end)))
 
-    @log
     def complete(self, state):
-        for entry in self.chart[state.start]:
-            if not entry.is_complete and entry.next_cat == state.lhs:
-                self.enqueue(State(entry.rule, entry.dot +
-                                   1, (entry.start, state.end)))
+        if self.leo and state.start < state.end:
+            top = self.leo_item(state.start, state.lhs)
+            if top:
+                rule, start = top
+                self.enqueue(State(rule, len(rule.rhs), (start, state.end)))
+                return
+        for entry in self.waiting[state.start].get(state.lhs, ()):
+            self.enqueue(State(entry.rule, entry.dot + 1,
+                               (entry.start, state.end)))
+
+    def matches(self, i):
+        """Maps the categories of the lexical entries starting at token ``i`` to their end positions."""
+        if i not in self.matched:
+            self.matched[i] = self.lexicon.matches(self.tokens, i)
+        return self.matched[i]
+
+    def lookahead(self, i):
+        """Lexical categories of token ``i``."""
+        if i == len(self.tokens):
+            return {END}
+        return self.matches(i).keys()
+
+    def leo_item(self, i, lhs):
+        """
+        Returns ``(rule, start)`` of the topmost item on the deterministic
+        reduction path above a completed ``lhs`` starting at ``i``, or
+        ``None`` if the path is empty. Results are memoized per Earley set.
+        """
+        path = []
+        top = None
+        while True:
+            transitive = self.transitive[i]
+            if lhs in transitive:
+                top = transitive[lhs]
+                break
+            transitive[lhs] = None
+            waiting = self.waiting[i].get(lhs, ())
+            if len(waiting) != 1 or waiting[0].dot + 1 != len(waiting[0].rule.rhs) \
+                    or waiting[0].lhs == 'START':
+                break
+            entry = waiting[0]
+            path.append((transitive, lhs, entry))
+            i, lhs = entry.start, entry.lhs
+        for transitive, lhs, entry in reversed(path):
+            if top is None:
+                top = (entry.rule, entry.start)
+            transitive[lhs] = top
+        return top
 
     def has_parse(self):
         for state in self.chart[-1]:
@@ -119,12 +229,95 @@ class EarleyRecognizer:
         return False
 
 
-def recognize(tokens, grammar_path, lexicon_path):
+class RecognizerSession:
+    """
+    Incremental recognition, one token at a time. Each call to ``feed``
+    builds only the next Earley set, so a dead prefix is noticed at the
+    first token that cannot be scanned.
+
+    With ``keep_chart=False`` finished Earley sets (those further back than
+    the longest lexical entry) are cut down to the items that later
+    completions can still advance, which keeps memory
+    proportional to the number of pending constituents instead of the
+    whole chart.
+
+    Lookahead filtering is not available here, the next token is not known
+    yet when an Earley set is built.
+    """
+
+    def __init__(self, grammar, lexicon, leo=False, keep_chart=True, tracer=None):
+        self.recognizer = EarleyRecognizer(grammar, lexicon, leo=leo, tracer=tracer)
+        self.keep_chart = keep_chart
+        self.recognizer.reset([])
+        self.recognizer.process(0)
+        self.viable = True
+
+    @property
+    def position(self):
+        return len(self.recognizer.tokens)
+
+    @property
+    def chart(self):
+        return self.recognizer.chart
+
+    def feed(self, token):
+        """Consumes ``token`` and returns whether the prefix can still be extended to a sentence."""
+        if not self.viable:
+            return False
+        recognizer = self.recognizer
+        lexicon = recognizer.lexicon
+        i = self.position
+        recognizer.tokens.append(token)
+        recognizer.add_column()
+        # Only entries ending at the new token can be scanned now; longer
+        # multi-token entries are scanned once their last token arrives.
+        for start in range(max(0, i + 1 - lexicon.max_length), i + 1):
+            recognizer.matched[start] = {category: (i + 1,) for category, ends
+                                         in lexicon.matches(recognizer.tokens, start).items() if i + 1 in ends}
+            for category in recognizer.matched[start]:
+                for state in recognizer.waiting[start].get(category, ()):
+                    recognizer.scan(state)
+        if not self.keep_chart and i + 1 >= lexicon.max_length:
+            self._discard(i + 1 - lexicon.max_length)
+        recognizer.process(i + 1)
+        self.viable = bool(recognizer.chart[i + 1]) or any(
+            category in recognizer.waiting[start]
+            for start in range(max(0, i + 2 - lexicon.max_length), i + 1)
+            for category in lexicon.continuations(recognizer.tokens, start))
+        return self.viable
+
+    def feed_all(self, tokens):
+        for token in tokens:
+            if not self.feed(token):
+                return False
+        return True
+
+    def expected(self):
+        """Lexical categories that can be scanned next."""
+        if not self.viable:
+            return set()
+        return {category for category in self.recognizer.waiting[self.position]
+                if category in self.recognizer.lexicon}
+
+    def accepts(self):
+        """Whether the tokens fed so far form a sentence."""
+        return self.viable and self.recognizer.has_parse()
+
+    def _discard(self, i):
+        recognizer = self.recognizer
+        recognizer.states.difference_update(recognizer.chart[i])
+        recognizer.chart[i] = []
+        recognizer.predicted[i] = None
+        for category in recognizer.lexicon:
+            recognizer.waiting[i].pop(category, None)
+
+
+def recognize(tokens, grammar_path, lexicon_path, stats=None):
     logging.info('\nTokens: ' + str(tokens))
     logging.info('Loading lexicon and grammar...')
     lexicon = read_lexicon(lexicon_path)
     grammar = read_grammar(grammar_path)
-    parser = EarleyRecognizer(grammar, lexicon)
+    parser = EarleyRecognizer(grammar, lexicon, tracer=logging_tracer(), stats=stats)
 
     logging.info('\nRunning Earley algorithm...')
     part_of_lang = parser.recognize(tokens)
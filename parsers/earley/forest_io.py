@@ -0,0 +1,267 @@
+"""
+Export and import of whole SPPFs as node and family tables.
+
+``dump`` walks the forest below a root once, breadth-first, and streams
+one record per node to the file, so the size of the output (and the time
+to write it) is linear in the size of the forest, not in the number of
+trees. Nodes are numbered in the order they are written; the root is
+node 0. A node record holds its label, span and the range of its
+families in the family table; a family is a pair of node ids (``-1``
+for a missing left child).
+
+Two formats are available:
+
+- ``binary``: little-endian int32 tables, the node table followed by
+  the family table, then the labels as JSON and a fixed-size footer
+  with the offsets. ``load`` maps the file and reads records on demand.
+- ``jsonl``: one JSON object per line, ``{"label": id, "value": ...}``
+  before a label's first use and ``{"node": id, "label": id, "start":
+  ..., "end": ..., "families": [[left, right], ...]}`` per node.
+
+The ``ForestNode`` objects returned by ``load`` have the attributes of
+``scott_2008.SPPF`` (``item``, ``start``, ``end``, ``families``), so the
+functions in ``utils`` and ``viterbi`` work on them unchanged.
+"""
+import collections
+import json
+import mmap
+import shutil
+import struct
+import tempfile
+
+from parsers.earley.compiled import Item, Rule
+from parsers.earley.scott_2008 import Family
+
+MAGIC = b'SPF\x01'
+NONE = -1
+_NODE = struct.Struct('<5i')  # label, start, end, first family, number of families
+_FAMILY = struct.Struct('<2i')  # left, right
+_FOOTER = struct.Struct('<4s5q')  # magic, nodes, families, labels offset, labels length, families offset
+
+
+def dump(root, path, format='binary'):
+    """
+    Writes the forest below ``root`` to ``path`` as ``'binary'`` or
+    ``'jsonl'``. ``root`` must be expanded (see ``Chart.expand``) if the
+    chart was built with Leo's optimization; ``None`` writes an empty forest.
+    """
+    if format == 'binary':
+        writer = _BinaryWriter(path)
+    elif format == 'jsonl':
+        writer = _JsonlWriter(path)
+    else:
+        raise ValueError('unknown forest format: ' + format)
+    with writer:
+        if root is not None:
+            _walk(root, writer)
+
+
+def _walk(root, writer):
+    ids = {id(root): 0}
+    nodes = collections.deque([root])
+    labels = {}
+    while nodes:
+        node = nodes.popleft()
+        label = _label_id(node.item, labels, writer)
+        families = []
+        for family in node.families:
+            pair = []
+            for child in family:
+                if child is None:
+                    pair.append(NONE)
+                    continue
+                if id(child) not in ids:
+                    ids[id(child)] = len(ids)
+                    nodes.append(child)
+                pair.append(ids[id(child)])
+            families.append(pair)
+        writer.node(label, node.start, node.end, families)
+
+
+def _label_id(label, labels, writer):
+    key = (type(label), label)
+    if key not in labels:
+        labels[key] = len(labels)
+        if isinstance(label, Item):
+            writer.label([label.rule.lhs, list(label.rule.rhs), label.dot])
+        else:
+            writer.label(label)
+    return labels[key]
+
+
+class _BinaryWriter:
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.families = tempfile.TemporaryFile()
+        self.labels = []
+        self.num_nodes = 0
+        self.num_families = 0
+
+    def label(self, value):
+        self.labels.append(value)
+
+    def node(self, label, start, end, families):
+        self.file.write(_NODE.pack(label, start, end, self.num_families, len(families)))
+        for left, right in families:
+            self.families.write(_FAMILY.pack(left, right))
+        self.num_nodes += 1
+        self.num_families += len(families)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if exc[0] is None:
+                families_offset = self.file.tell()
+                self.families.seek(0)
+                shutil.copyfileobj(self.families, self.file)
+                labels_offset = self.file.tell()
+                labels = json.dumps(self.labels).encode()
+                self.file.write(labels)
+                self.file.write(_FOOTER.pack(MAGIC, self.num_nodes, self.num_families,
+                                             labels_offset, len(labels), families_offset))
+        finally:
+            self.families.close()
+            self.file.close()
+
+
+class _JsonlWriter:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+        self.num_labels = 0
+        self.num_nodes = 0
+
+    def label(self, value):
+        self.file.write(json.dumps({'label': self.num_labels, 'value': value}))
+        self.file.write('\n')
+        self.num_labels += 1
+
+    def node(self, label, start, end, families):
+        self.file.write(json.dumps({'node': self.num_nodes, 'label': label, 'start': start, 'end': end,
+                                    'families': families}))
+        self.file.write('\n')
+        self.num_nodes += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+def load(path):
+    """Reads a forest written by ``dump`` (either format); the nodes are built lazily."""
+    with open(path, 'rb') as fin:
+        jsonl = fin.read(1) in (b'{', b'')
+    return JsonlForest(path) if jsonl else BinaryForest(path)
+
+
+class ForestNode:
+    """SPPF node of a loaded forest; its families are read on first access."""
+    __slots__ = ('forest', 'id', 'item', 'start', 'end', '_families')
+
+    def __init__(self, forest, id, item, start, end):
+        self.forest = forest
+        self.id = id
+        self.item = item
+        self.start = start
+        self.end = end
+        self._families = None
+
+    @property
+    def families(self):
+        if self._families is None:
+            node = self.forest.node
+            self._families = [Family(None if left == NONE else node(left), node(right))
+                              for left, right in self.forest.family_ids(self.id)]
+        return self._families
+
+    def __hash__(self):
+        return hash((self.id, id(self.forest)))
+
+    def __eq__(self, other):
+        return type(self) == type(other) and self.id == other.id and self.forest is other.forest
+
+    def __repr__(self):
+        return '({}-{}: {})'.format(self.start, self.end, self.item)
+
+
+class _Forest:
+    def __init__(self, labels):
+        self.labels = [_decode_label(value) for value in labels]
+        self.nodes = {}
+
+    @property
+    def root(self):
+        return self.node(0) if len(self) else None
+
+    def node(self, i):
+        """The node with id ``i``; one object per id, so nodes can be compared by identity."""
+        node = self.nodes.get(i)
+        if node is None:
+            label, start, end = self.node_record(i)
+            node = self.nodes[i] = ForestNode(self, i, self.labels[label], start, end)
+        return node
+
+
+def _decode_label(value):
+    if isinstance(value, list):
+        lhs, rhs, dot = value
+        return Item(Rule(lhs, tuple(rhs)), dot)
+    return value
+
+
+class BinaryForest(_Forest):
+    """Forest in the binary format, read from a memory map."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as fin:
+            self.buffer = mmap.mmap(fin.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) < _FOOTER.size:
+            raise ValueError('not a forest file: ' + path)
+        magic, self.num_nodes, self.num_families, labels_offset, labels_length, self.families_offset = \
+            _FOOTER.unpack_from(self.buffer, len(self.buffer) - _FOOTER.size)
+        if magic != MAGIC:
+            raise ValueError('not a forest file: ' + path)
+        super().__init__(json.loads(bytes(self.buffer[labels_offset:labels_offset + labels_length])))
+
+    def __len__(self):
+        return self.num_nodes
+
+    def node_record(self, i):
+        return _NODE.unpack_from(self.buffer, i * _NODE.size)[:3]
+
+    def family_ids(self, i):
+        first, count = _NODE.unpack_from(self.buffer, i * _NODE.size)[3:]
+        offset = self.families_offset + first * _FAMILY.size
+        return [_FAMILY.unpack_from(self.buffer, offset + k * _FAMILY.size) for k in range(count)]
+
+
+class JsonlForest(_Forest):
+    """Forest in the JSONL format; the records are parsed into flat tables when loading."""
+
+    def __init__(self, path):
+        labels = []
+        self.records = []
+        self.families = []
+        with open(path, 'r') as fin:
+            for line in fin:
+                record = json.loads(line)
+                if 'node' not in record:
+                    labels.append(record['value'])
+                else:
+                    self.records.append((record['label'], record['start'], record['end'], len(self.families),
+                                         len(record['families'])))
+                    self.families.extend(tuple(family) for family in record['families'])
+        super().__init__(labels)
+
+    def __len__(self):
+        return len(self.records)
+
+    def node_record(self, i):
+        return self.records[i][:3]
+
+    def family_ids(self, i):
+        first, count = self.records[i][3:]
+        return self.families[first:first + count]
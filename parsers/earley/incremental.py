@@ -0,0 +1,146 @@
+"""
+Incremental re-parsing for the Scott (2008) parser.
+
+Earley set ``i`` only depends on the tokens before ``i`` (and on token
+``i`` itself with lookahead), and an SPPF node only on the tokens it
+spans. When tokens are replaced from position ``p`` on, a ``ParseSession``
+keeps the Earley sets up to ``p`` (``p - 1`` with lookahead) and the
+nodes that end there, and rebuilds only the sets after them.
+
+The one complication is that the chart does not store the items that
+expect the next token: they go straight to the scan. ``IncrementalChart``
+records them per set, so a kept set can be scanned again with a
+different token.
+"""
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.scott_2008 import NO_NODE, NO_TOKEN, Chart, process, scan
+
+
+class IncrementalChart(Chart):
+    """``Chart`` that also keeps, in ``scannable_items[i]``, the items of set ``i`` that were scanned."""
+
+    def __init__(self, grammar, tokens, lookahead=False, leo=False):
+        super().__init__(grammar, tokens, lookahead, leo)
+        self.scannable_items = [set() for _ in range(len(tokens) + 1)]
+
+    def add_next_item(self, item, i):
+        if self._is_scannable(item, i):
+            self.scannable_items[i].add(item)
+        super().add_next_item(item, i)
+
+    def add_curr_item(self, item, i):
+        if self._is_scannable(item, i):
+            self.scannable_items[i].add(item)
+        super().add_curr_item(item, i)
+
+
+class ParseSession:
+    """
+    Keeps the chart of the last parse so that ``replace`` only rebuilds
+    the Earley sets from the first changed token on. Edits near the end
+    of a long input cost time proportional to the rebuilt suffix. With
+    ``leo=True`` dropping the invalidated SPPF nodes needs a pass over all
+    nodes, since Leo's expansion appends nodes out of order.
+    """
+
+    def __init__(self, grammar, tokens=(), leo=False, lookahead=False):
+        if not isinstance(grammar, CompiledGrammar):
+            grammar = CompiledGrammar(grammar)
+        self.grammar = grammar
+        self.label_ids = {label: k for k, label in enumerate(grammar.labels)}
+        self._start(list(tokens), lookahead, leo)
+
+    def _start(self, tokens, lookahead, leo):
+        self.chart = IncrementalChart(self.grammar, tokens, lookahead, leo)
+        self.chart.add_next_item((self.grammar.start_item, 0, NO_NODE), 0)
+        self._rebuild(0)
+
+    @property
+    def tokens(self):
+        return self.chart.tokens
+
+    def parse(self):
+        """The root of the SPPF for the current tokens, like ``scott_2008.parse``."""
+        if len(self.tokens) == 0:
+            return None
+        root = self.chart.find_root()
+        self.chart.expand(root)
+        return root
+
+    def replace(self, start, end, tokens):
+        """Replaces ``self.tokens[start:end]`` with ``tokens`` and returns the new root."""
+        old = self.tokens[start:end]
+        changed = start
+        while changed - start < min(len(old), len(tokens)) and old[changed - start] == tokens[changed - start]:
+            changed += 1
+        if len(old) == len(tokens) and changed == start + len(old):
+            return self.parse()
+        kept = changed - 1 if self.chart.lookahead else changed
+        if kept < 0:
+            chart = self.chart
+            self._start(chart.tokens[:start] + list(tokens) + chart.tokens[end:], chart.lookahead, chart.leo)
+        else:
+            self._truncate(kept, start, end, tokens)
+            self._rescan(kept)
+        return self.parse()
+
+    def insert(self, i, tokens):
+        return self.replace(i, i, tokens)
+
+    def delete(self, start, end):
+        return self.replace(start, end, [])
+
+    def _truncate(self, kept, start, end, tokens):
+        """Drops the Earley sets after ``kept`` and the nodes ending after it, and splices in ``tokens``."""
+        chart = self.chart
+        chart.tokens[start:end] = tokens
+        chart.token_ids[start:end] = [self.grammar.symbol_ids.get(token, NO_TOKEN) for token in tokens]
+        fresh = len(chart.tokens) - kept
+        for columns, empty in ((chart.chart, set), (chart.waiting, dict), (chart.transitive, dict),
+                               (chart.scannable_items, set)):
+            del columns[kept + 1:]
+            columns.extend(empty() for _ in range(fresh))
+        chart.next_scannables = set()
+        self._drop_nodes(kept)
+
+    def _drop_nodes(self, kept):
+        chart = self.chart
+        nodes = chart.nodes
+        while nodes and nodes[-1].end > kept:
+            self._forget(nodes.pop(), len(nodes))
+        if chart.leo:
+            # nodes still referenced by nothing but the list stay in place,
+            # so that the ids of the kept ones do not change
+            for node_id, node in enumerate(nodes):
+                if node.end > kept:
+                    self._forget(node, node_id)
+            chart.leo_links = {top: links for top, links in chart.leo_links.items() if top.end <= kept}
+
+    def _forget(self, node, node_id):
+        key = (self.label_ids.get(node.item), node.start, node.end)
+        if self.chart.node_ids.get(key) == node_id:
+            del self.chart.node_ids[key]
+
+    def _rescan(self, kept):
+        """Scans set ``kept`` again with the (new) token at ``kept`` and rebuilds the sets after it."""
+        chart = self.chart
+        grammar = self.grammar
+        # set ``kept`` lacks the items that expected the old token; put them
+        # back and take out those that expect the new one
+        for item in chart.scannable_items[kept]:
+            chart._add(item, kept)
+        scannables = set()
+        if kept < len(chart.tokens):
+            token = chart.token_ids[kept]
+            scannables = {item for item in chart.chart[kept] if grammar.item_next[item[0]] == token}
+            chart.chart[kept] -= scannables
+            if token in chart.waiting[kept]:
+                del chart.waiting[kept][token]
+        chart.scannable_items[kept] = set(scannables)
+        chart.scannables = scannables
+        scan(chart, kept)
+        self._rebuild(kept + 1)
+
+    def _rebuild(self, first):
+        for i in range(first, len(self.chart.tokens) + 1):
+            process(self.chart, i)
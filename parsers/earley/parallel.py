@@ -0,0 +1,265 @@
+"""
+Earley recognition with the work of each Earley set spread over worker
+processes.
+
+The items of the chart are sharded by their start position: shard ``w``
+of ``n`` holds every item ``(item, start)`` with ``start % n == w``. With
+that split most steps stay inside one shard:
+
+- scanning keeps the start, so a scanned item stays in its shard,
+- the items predicted in set ``i`` start at ``i``, so shard ``i % n``
+  predicts them and goes on predicting from them,
+- completing a constituent that starts at ``j`` needs the items of set
+  ``j`` waiting for it. Once set ``j`` is finished, its index of waiting
+  items is kept by shard ``j % n``, which holds all constituents starting
+  at ``j``.
+
+Only two things cross shards: requests to predict a nonterminal in the
+current set, and items advanced by a completion that start in another
+shard. Set ``i`` is built in rounds. Every shard works off its queue and
+returns what belongs to the others, the coordinator hands it out, and the
+set is finished when a round produces nothing. Empty rules are handled as
+by Aycock and Horspool (2002): an item expecting a nullable nonterminal is
+also advanced over it, so constituents that start and end at ``i`` are
+never completed against the growing set ``i``.
+
+The Earley sets are sets of ``(item, start)`` pairs over a
+``CompiledGrammar``. They do not depend on the order in which the shards
+run and equal those of ``processes=0``, a single shard in the calling
+process. Only recognition is parallel; forests are built by
+``scott_2008``.
+"""
+import multiprocessing
+import os
+
+from parsers.earley.compiled import COMPLETE, CompiledGrammar
+
+NO_TOKEN = -1
+
+
+class _Shard:
+    """The items of a chart whose start is ``index`` modulo ``count``."""
+
+    def __init__(self, grammar, index, count):
+        self.grammar = grammar
+        self.index = index
+        self.count = count
+
+    def begin(self, tokens):
+        g = self.grammar
+        self.token_ids = [g.symbol_ids.get(token, NO_TOKEN) for token in tokens]
+        self.sets = [set() for _ in range(len(tokens) + 1)]
+        self.waiting = {}  # start of a finished set we own -> symbol -> waiting items
+        self.column = None
+        if self.index == 0:
+            self.sets[0].add((g.start_item, 0))
+
+    def work(self, i, symbols, items, waiting=None):
+        """
+        Predicts ``symbols`` and adds ``items`` to set ``i``, then closes the
+        set over everything this shard can do alone. ``waiting`` is the index
+        of a finished set this shard owns. Returns the prediction requests and
+        items for the other shards, by shard.
+        """
+        g = self.grammar
+        if waiting is not None:
+            self.waiting[waiting[0]] = waiting[1]
+        if i != self.column:
+            self.column = i
+            self.queue = list(self.sets[i])
+            self.predicted = set()
+            self.requested = set()
+        outgoing = {}
+        for symbol in symbols:
+            self._predict(symbol, i)
+        for item in items:
+            self._add(item, i)
+        owner = i % self.count
+        while self.queue:
+            item, start = self.queue.pop()
+            symbol = g.item_next[item]
+            if symbol == COMPLETE:
+                if start != i:
+                    for waiting_item, waiting_start in self.waiting[start].get(g.item_lhs[item], ()):
+                        self._send((waiting_item + 1, waiting_start), i, outgoing)
+            elif g.is_nonterminal[symbol]:
+                if owner == self.index:
+                    self._predict(symbol, i)
+                elif symbol not in self.requested:
+                    self.requested.add(symbol)
+                    outgoing.setdefault(owner, ([], []))[0].append(symbol)
+                if symbol in g.nullable:
+                    self._add((item + 1, start), i)
+            elif i < len(self.token_ids) and self.token_ids[i] == symbol:
+                self.sets[i + 1].add((item + 1, start))
+        return outgoing
+
+    def _predict(self, symbol, i):
+        if symbol not in self.predicted:
+            self.predicted.add(symbol)
+            for item in self.grammar.predictions[symbol]:
+                self._add((item, i), i)
+
+    def _add(self, item, i):
+        if item not in self.sets[i]:
+            self.sets[i].add(item)
+            self.queue.append(item)
+
+    def _send(self, item, i, outgoing):
+        owner = item[1] % self.count
+        if owner == self.index:
+            self._add(item, i)
+        else:
+            outgoing.setdefault(owner, ([], []))[1].append(item)
+
+    def finish(self, i):
+        """This shard's part of the index of set ``i`` and the number of items it scanned into set ``i + 1``."""
+        g = self.grammar
+        index = {}
+        for item, start in self.sets[i]:
+            symbol = g.item_next[item]
+            if symbol != COMPLETE and g.is_nonterminal[symbol]:
+                index.setdefault(symbol, []).append((item, start))
+        return index, len(self.sets[i + 1]) if i + 1 < len(self.sets) else 0
+
+    def contains(self, i, item):
+        return item in self.sets[i]
+
+    def chart(self):
+        return self.sets
+
+
+def _serve(conn, grammar, index, count):
+    shard = _Shard(grammar, index, count)
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        method, args = message
+        conn.send(getattr(shard, method)(*args))
+
+
+class _Local:
+    """A shard in the calling process, used like the pipe of a worker."""
+
+    def __init__(self, shard):
+        self.shard = shard
+        self.result = None
+
+    def send(self, message):
+        method, args = message
+        self.result = getattr(self.shard, method)(*args)
+
+    def recv(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+class _Worker:
+    def __init__(self, grammar, index, count):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, grammar, index, count), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, message):
+        self.conn.send(message)
+
+    def recv(self):
+        return self.conn.recv()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join()
+        self.conn.close()
+
+
+class ParallelRecognizer:
+    """
+    Recognizer whose Earley sets are sharded over ``processes`` worker
+    processes (all cores by default); ``processes=0`` runs one shard in the
+    calling process. ``grammar`` is a dict of rules or a
+    ``CompiledGrammar``; it is compiled once and shipped to each worker
+    once. Use it as a context manager, or call ``close``, to stop the
+    workers.
+    """
+
+    def __init__(self, grammar, processes=None, start='S'):
+        self.grammar = grammar if isinstance(grammar, CompiledGrammar) else CompiledGrammar(grammar, start)
+        if processes is None:
+            processes = os.cpu_count() or 1
+        if processes == 0:
+            self.shards = [_Local(_Shard(self.grammar, 0, 1))]
+        else:
+            self.shards = [_Worker(self.grammar, index, processes) for index in range(processes)]
+
+    def recognize(self, tokens):
+        if not self._fill(tokens):
+            return False
+        return self._call(0, 'contains', len(tokens), (self.grammar.start_item + 1, 0))
+
+    def build_chart(self, tokens):
+        """The Earley sets for ``tokens`` as sets of ``(item, start)`` pairs, merged over the shards."""
+        self._fill(tokens)
+        sets = [set() for _ in range(len(tokens) + 1)]
+        for shard_sets in self._broadcast('chart'):
+            for merged, shard_set in zip(sets, shard_sets):
+                merged.update(shard_set)
+        return sets
+
+    def _fill(self, tokens):
+        """Builds the Earley sets in the shards; ``False`` if a set stayed empty."""
+        count = len(self.shards)
+        self._broadcast('begin', tokens)
+        waiting = None
+        for i in range(len(tokens) + 1):
+            pending = {index: ([], []) for index in range(count)}
+            while pending:
+                for index, (symbols, items) in pending.items():
+                    owns = waiting is not None and index == waiting[0] % count
+                    self.shards[index].send(('work', (i, symbols, items, waiting if owns else None)))
+                replies = [self.shards[index].recv() for index in pending]
+                waiting = None
+                pending = {}
+                for outgoing in replies:
+                    for index, (symbols, items) in outgoing.items():
+                        symbols_for, items_for = pending.setdefault(index, ([], []))
+                        symbols_for.extend(symbols)
+                        items_for.extend(items)
+            index, scanned = {}, 0
+            for shard_index, shard_scanned in self._broadcast('finish', i):
+                for symbol, items in shard_index.items():
+                    index.setdefault(symbol, []).extend(items)
+                scanned += shard_scanned
+            waiting = (i, index)
+            if i < len(tokens) and scanned == 0:
+                return False
+        return True
+
+    def _call(self, index, method, *args):
+        self.shards[index].send((method, args))
+        return self.shards[index].recv()
+
+    def _broadcast(self, method, *args):
+        for shard in self.shards:
+            shard.send((method, args))
+        return [shard.recv() for shard in self.shards]
+
+    def close(self):
+        for shard in self.shards:
+            shard.close()
+        self.shards = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
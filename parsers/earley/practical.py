@@ -0,0 +1,294 @@
+"""
+Earley parsing over an LR(0) automaton, following Aycock and Horspool
+(2002), "Practical Earley Parsing".
+
+The dotted items of the compiled grammar are grouped into the states of
+an LR(0) automaton whose closure also moves the dot over nullable
+nonterminals (the epsilon-DFA), so empty derivations need no special
+treatment. As in the paper every state is split in two: the kernel items,
+which share the start position of the Earley item they came from, and
+the predicted items, which start at the current position. A chart item is
+a ``(state, start)`` pair, and items that move in lockstep share one.
+
+Recognition only touches states. ``parse`` builds the same SPPF as
+``scott_2008.parse`` afterwards, top-down from the root, by looking up
+which dotted items the states of each Earley set stand for.
+
+Reference:
+
+* Aycock, J., & Horspool, R. N. (2002). Practical Earley parsing. The Computer Journal, 45(6), 620-630.
+"""
+from parsers.earley.compiled import COMPLETE, EPSILON, CompiledGrammar
+from parsers.earley.scott_2008 import NO_TOKEN, SPPF, Family
+from parsers.lexicon import Lexicon
+
+NO_STATE = -1
+
+
+class LR0Automaton:
+    """
+    The split epsilon-DFA of a ``CompiledGrammar``, built lazily: states
+    are numbered as they are reached, and transitions are cached.
+    """
+
+    def __init__(self, grammar, start='S'):
+        if not isinstance(grammar, CompiledGrammar):
+            grammar = CompiledGrammar(grammar, start)
+        self.grammar = grammar
+        self.items = []  # state -> tuple of dotted items
+        self.state_ids = {}
+        self.completed = []  # state -> lhs symbols of its complete items
+        self.expected = []  # state -> symbols after a dot
+        self.accepting = []
+        self.predicted = []  # state -> state of its predictions or NO_STATE
+        self.transitions = {}
+        self.start = self.state(self._nullable_closure([grammar.start_item]))
+
+    def state(self, items):
+        key = frozenset(items)
+        if key not in self.state_ids:
+            g = self.grammar
+            self.state_ids[key] = len(self.items)
+            self.items.append(tuple(sorted(key)))
+            self.completed.append(tuple({g.item_lhs[item] for item in key if g.item_next[item] == COMPLETE}))
+            self.expected.append(frozenset(g.item_next[item] for item in key if g.item_next[item] != COMPLETE))
+            self.accepting.append(any(g.item_lhs[item] == g.augmented_start and g.item_next[item] == COMPLETE
+                                      for item in key))
+            self.predicted.append(None)
+        return self.state_ids[key]
+
+    def _nullable_closure(self, items):
+        g = self.grammar
+        closure, agenda = set(items), list(items)
+        while agenda:
+            item = agenda.pop()
+            if g.item_next[item] in g.nullable and item + 1 not in closure:
+                closure.add(item + 1)
+                agenda.append(item + 1)
+        return closure
+
+    def predictions(self, state):
+        """The state of the items predicted by ``state`` (starting at the current position), or ``NO_STATE``."""
+        if self.predicted[state] is None:
+            g = self.grammar
+            predicted, seen = set(), set()
+            agenda = [symbol for symbol in self.expected[state] if g.is_nonterminal[symbol]]
+            while agenda:
+                symbol = agenda.pop()
+                if symbol in seen:
+                    continue
+                seen.add(symbol)
+                for item in self._nullable_closure(g.predictions[symbol]):
+                    predicted.add(item)
+                    if g.item_next[item] != COMPLETE and g.is_nonterminal[g.item_next[item]]:
+                        agenda.append(g.item_next[item])
+            self.predicted[state] = self.state(predicted) if predicted else NO_STATE
+        return self.predicted[state]
+
+    def goto(self, state, symbol):
+        key = (state, symbol)
+        if key not in self.transitions:
+            g = self.grammar
+            kernel = [item + 1 for item in self.items[state] if g.item_next[item] == symbol]
+            self.transitions[key] = self.state(self._nullable_closure(kernel)) if kernel else NO_STATE
+        return self.transitions[key]
+
+
+class PracticalChart:
+    """
+    Earley sets of ``(state, start)`` items. ``waiting[j]`` indexes the
+    items of set ``j`` by the nonterminals their states expect.
+    """
+
+    def __init__(self, automaton, tokens, lexicon=None):
+        self.automaton = automaton
+        self.tokens = tokens
+        self.lexicon = lexicon
+        grammar = automaton.grammar
+        self.token_ids = [grammar.symbol_ids.get(token, NO_TOKEN) for token in tokens]
+        self.chart = [[] for _ in range(len(tokens) + 1)]
+        self.seen = [set() for _ in range(len(tokens) + 1)]
+        self.waiting = [{} for _ in range(len(tokens) + 1)]
+        self.dotted_items = {}
+        self.nodes = {}
+
+    def add(self, item, i):
+        if item[0] != NO_STATE and item not in self.seen[i]:
+            self.seen[i].add(item)
+            self.chart[i].append(item)
+            grammar = self.automaton.grammar
+            for symbol in self.automaton.expected[item[0]]:
+                if grammar.is_nonterminal[symbol]:
+                    self.waiting[i].setdefault(symbol, []).append(item)
+
+    def matches(self, i):
+        """Maps the terminals found at position ``i`` to the positions where they end."""
+        if self.lexicon is None:
+            if i < len(self.tokens) and self.token_ids[i] != NO_TOKEN:
+                return {self.token_ids[i]: (i + 1,)}
+            return {}
+        symbol_ids = self.automaton.grammar.symbol_ids
+        return {symbol_ids[category]: ends for category, ends in self.lexicon.matches(self.tokens, i).items()
+                if category in symbol_ids}
+
+    def process(self, i):
+        automaton = self.automaton
+        matches = self.matches(i)
+        items = self.chart[i]
+        k = 0
+        while k < len(items):
+            state, start = items[k]
+            k += 1
+            self.add((automaton.predictions(state), i), i)
+            if start != i:  # completions of empty constituents are part of the closure
+                for lhs in automaton.completed[state]:
+                    for waiting_state, waiting_start in self.waiting[start].get(lhs, ()):
+                        self.add((automaton.goto(waiting_state, lhs), waiting_start), i)
+            for terminal, ends in matches.items():
+                if terminal in automaton.expected[state]:
+                    for end in ends:
+                        self.add((automaton.goto(state, terminal), start), end)
+
+    def recognize(self):
+        return any(start == 0 and self.automaton.accepting[state] for state, start in self.chart[-1])
+
+    def find_root(self):
+        if len(self.tokens) == 0 or not self.recognize():
+            return None
+        return self.node(self.automaton.grammar.start, 0, len(self.tokens))
+
+    # SPPF construction
+
+    def dotted(self, i):
+        """Maps the dotted items of Earley set ``i`` to their start positions."""
+        if i not in self.dotted_items:
+            index = {}
+            for state, start in self.chart[i]:
+                for item in self.automaton.items[state]:
+                    index.setdefault(item, set()).add(start)
+            self.dotted_items[i] = index
+        return self.dotted_items[i]
+
+    def node(self, label, start, end):
+        """The SPPF node of ``scott_2008`` for ``label`` (a symbol or item label) over ``start..end``."""
+        key = (label, start, end)
+        if key in self.nodes:
+            return self.nodes[key]
+        root = self._node(key, [])
+        agenda = [key]
+        while agenda:
+            key = agenda.pop()
+            sppf = self.nodes[key]
+            for left, right in self._families(*key):
+                sppf.add_family(Family(self._child(left, agenda), self._child(right, agenda)))
+        return root
+
+    def _node(self, key, agenda):
+        label, start, end = key
+        grammar = self.automaton.grammar
+        if label == EPSILON:
+            self.nodes[key] = SPPF(EPSILON, start, end)
+        elif label < len(grammar.symbols) and not grammar.is_nonterminal[label]:
+            self.nodes[key] = SPPF(self.tokens[start], start, end)
+        else:
+            self.nodes[key] = SPPF(grammar.labels[label], start, end)
+            agenda.append(key)
+        return self.nodes[key]
+
+    def _child(self, key, agenda):
+        if key is None:
+            return None
+        if key in self.nodes:
+            return self.nodes[key]
+        return self._node(key, agenda)
+
+    def _families(self, label, start, end):
+        grammar = self.automaton.grammar
+        dotted = self.dotted(end)
+        if label < len(grammar.symbols):
+            items = self._complete_items(label)
+        else:
+            items = [label - len(grammar.symbols)]
+        for item in items:
+            if start in dotted.get(item, ()):
+                yield from self._item_families(item, start, end)
+
+    def _item_families(self, item, start, end):
+        grammar = self.automaton.grammar
+        if grammar.item_dot[item] == 0:
+            yield None, (EPSILON, end, end)
+            return
+        previous = item - 1
+        symbol = grammar.item_next[previous]
+        if grammar.is_nonterminal[symbol]:
+            splits = range(start, end + 1)
+        else:
+            splits = [end - 1] if end > start and self.token_ids[end - 1] == symbol else []
+        for split in splits:
+            if start not in self.dotted(split).get(previous, ()):
+                continue
+            if grammar.is_nonterminal[symbol] and not self._completes(symbol, split, end):
+                continue
+            left = None
+            if grammar.item_dot[previous] == 1:
+                left = self._first_child(previous, start, split)
+            elif grammar.item_dot[previous] > 1:
+                left = (grammar.item_label[previous], start, split)
+            yield left, (symbol, split, end)
+
+    def _first_child(self, item, start, end):
+        """Key of the node standing for a non-complete item after its first symbol (see ``make_node``)."""
+        return self.automaton.grammar.item_next[item - 1], start, end
+
+    def _completes(self, symbol, start, end):
+        dotted = self.dotted(end)
+        return any(start in dotted.get(item, ()) for item in self._complete_items(symbol))
+
+    def _complete_items(self, lhs):
+        grammar = self.automaton.grammar
+        return [first + len(grammar.rules[grammar.item_rule[first]].rhs) for first in grammar.predictions[lhs]]
+
+
+def _automaton(grammar):
+    if isinstance(grammar, LR0Automaton):
+        return grammar
+    return LR0Automaton(grammar)
+
+
+def build_chart(grammar, tokens, lexicon=None):
+    """
+    Runs the recognizer over ``tokens``. ``grammar`` is a dict of rules, a
+    ``CompiledGrammar`` or an ``LR0Automaton`` (share the latter between
+    sentences, its states are built on demand). With a ``lexicon`` tokens
+    are scanned by their categories.
+    """
+    chart = PracticalChart(_automaton(grammar), tokens, lexicon)
+    chart.add((chart.automaton.start, 0), 0)
+    for i in range(len(tokens) + 1):
+        chart.process(i)
+    return chart
+
+
+def recognize(grammar, tokens, lexicon=None):
+    return build_chart(grammar, tokens, lexicon).recognize()
+
+
+def parse(grammar, tokens):
+    """Like ``scott_2008.parse``: the root of the SPPF for ``tokens``, or ``None``."""
+    return build_chart(grammar, tokens).find_root()
+
+
+class PracticalEarleyRecognizer:
+    """Drop-in for ``EarleyRecognizer.recognize`` and ``has_parse`` with a grammar and lexicon."""
+
+    def __init__(self, grammar, lexicon):
+        self.automaton = LR0Automaton(grammar)
+        self.lexicon = lexicon if isinstance(lexicon, Lexicon) else Lexicon(lexicon)
+        self.chart = None
+
+    def recognize(self, tokens):
+        self.chart = build_chart(self.automaton, tokens, self.lexicon)
+        return self.has_parse()
+
+    def has_parse(self):
+        return self.chart.recognize()
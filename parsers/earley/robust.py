@@ -0,0 +1,252 @@
+"""
+Error-correcting Earley parsing (after Lyon 1974) over the compiled
+grammar, building an SPPF of the least-cost repairs in one pass.
+
+Besides scanning, an item can
+
+- insert the terminal it expects without reading a token,
+- substitute the terminal it expects for the next token, or
+- delete the next token and stay where it is,
+
+each at a cost. The cost of an item is the cost of the edits inside the
+part it has recognized. Each Earley set is processed in order of cost
+(Dijkstra), so every item and every SPPF node is first reached with its
+least cost. Families are only kept if they reach their node at that
+cost, so the forest below the root holds exactly the least-cost
+repaired derivations. Edits show up as leaf nodes labelled with an
+``Edit``. Items costing more than ``max_cost`` are dropped, which bounds
+the work.
+
+``partial_parses`` works on a chart without repairs and covers the input
+with as few of the complete constituents found as possible.
+"""
+import collections
+import heapq
+import itertools
+
+from parsers.earley.compiled import COMPLETE, EPSILON, CompiledGrammar
+from parsers.earley.scott_2008 import NO_NODE, NO_TOKEN, SPPF, Family
+
+
+class Edit(collections.namedtuple('Edit', ['op', 'expected', 'token'])):
+    """Label of a leaf standing for an inserted, substituted or deleted token."""
+
+    def __str__(self):
+        if self.op == 'ins':
+            return 'ins({})'.format(self.expected)
+        if self.op == 'del':
+            return 'del({})'.format(self.token)
+        return 'sub({}/{})'.format(self.expected, self.token)
+
+    __repr__ = __str__
+
+
+class RobustChart:
+    """
+    Earley sets of ``(item, start, node)`` tuples as in ``scott_2008.Chart``
+    plus, per set, the cost of each item, and a priority queue of the items
+    still to be added. ``node_cost`` holds the least cost of every node.
+    """
+
+    def __init__(self, grammar, tokens, insertion=1, deletion=1, substitution=1, max_cost=3):
+        self.grammar = grammar
+        self.tokens = tokens
+        self.insertion = insertion
+        self.deletion = deletion
+        self.substitution = substitution
+        self.max_cost = max_cost
+        self.token_ids = [grammar.symbol_ids.get(token, NO_TOKEN) for token in tokens]
+        self.chart = [{} for _ in range(len(tokens) + 1)]  # (item, start) -> (node, cost)
+        self.waiting = [{} for _ in range(len(tokens) + 1)]
+        self.queues = [[] for _ in range(len(tokens) + 1)]
+        self.completed = [{} for _ in range(len(tokens) + 1)]
+        self.predicted = [set() for _ in range(len(tokens) + 1)]
+        self.nodes = []
+        self.node_ids = {}
+        self.node_cost = {}
+        self.leaves = {}
+        self.counter = itertools.count()
+
+    def push(self, i, cost, item, start, left, right):
+        """
+        Schedules ``item`` for set ``i``; its node gets the family ``(left,
+        right)``. Unlike ``scott_2008.make_node``, items after their first
+        symbol get a node of their own, so that repairs of equal cost
+        ending in different leaves share it.
+        """
+        if self.max_cost is None or cost <= self.max_cost:
+            heapq.heappush(self.queues[i], (cost, next(self.counter), item, start, left, right))
+
+    def leaf(self, label, start, end):
+        key = (label, start, end)
+        if key not in self.leaves:
+            self.leaves[key] = len(self.nodes)
+            self.nodes.append(SPPF(label, start, end))
+        return self.leaves[key]
+
+    def node(self, node):
+        if node == NO_NODE:
+            return None
+        return self.nodes[node]
+
+    def get_node(self, label, start, end, cost):
+        """Returns the id of node (label, start, end) and whether ``cost`` is its least cost."""
+        key = (label, start, end)
+        node = self.node_ids.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(SPPF(self.grammar.labels[label], start, end))
+            self.node_ids[key] = node
+            self.node_cost[node] = cost
+        return node, self.node_cost[node] == cost
+
+    def find_root(self):
+        """The least-cost root node and its cost, or ``(None, None)``."""
+        g = self.grammar
+        node = self.node_ids.get((g.start, 0, len(self.tokens)))
+        if node is None:
+            return None, None
+        return self.nodes[node], self.node_cost[node]
+
+
+def parse(grammar, tokens, insertion=1, deletion=1, substitution=1, max_cost=3):
+    """
+    Returns ``(root, cost)``: the SPPF of the least-cost repairs of
+    ``tokens`` and their cost, or ``(None, None)`` if no repair costs at
+    most ``max_cost`` (``None`` for no bound).
+    """
+    return build_chart(grammar, tokens, insertion, deletion, substitution, max_cost).find_root()
+
+
+def build_chart(grammar, tokens, insertion=1, deletion=1, substitution=1, max_cost=3):
+    if not isinstance(grammar, CompiledGrammar):
+        grammar = CompiledGrammar(grammar)
+    chart = RobustChart(grammar, tokens, insertion, deletion, substitution, max_cost)
+    chart.push(0, 0, grammar.start_item, 0, NO_NODE, None)
+    for i in range(len(tokens) + 1):
+        process(chart, i)
+    return chart
+
+
+def process(chart, i):
+    g = chart.grammar
+    queue = chart.queues[i]
+    while queue:
+        cost, _, item, start, left, right = heapq.heappop(queue)
+        node = _node(chart, item, start, i, left, right, cost)
+        key = (item, start)
+        if key in chart.chart[i]:
+            continue
+        chart.chart[i][key] = (node, cost)
+        next_symbol = g.item_next[item]
+        if next_symbol == COMPLETE:
+            _complete(chart, item, start, node, cost, i)
+        else:
+            chart.waiting[i].setdefault(next_symbol, []).append((item, start, node, cost))
+            if g.is_nonterminal[next_symbol]:
+                _predict(chart, next_symbol, i)
+                if next_symbol in chart.completed[i]:
+                    empty, empty_cost = chart.completed[i][next_symbol]
+                    chart.push(i, cost + empty_cost, item + 1, start, node, empty)
+            else:
+                _scan(chart, item, start, node, cost, next_symbol, i)
+        if i < len(chart.tokens):
+            deleted = chart.leaf(Edit('del', None, chart.tokens[i]), i, i + 1)
+            chart.push(i + 1, cost + chart.deletion, item, start, node, deleted)
+
+
+def _node(chart, item, start, end, left, right, cost):
+    """The node of a new item; adds the family if it reaches the node at its least cost."""
+    g = chart.grammar
+    if right is None:
+        return NO_NODE
+    node, least = chart.get_node(g.item_label[item], start, end, cost)
+    if least:
+        chart.nodes[node].add_family(Family(chart.node(left), chart.nodes[right]))
+    return node
+
+
+def _predict(chart, lhs, i):
+    if lhs in chart.predicted[i]:
+        return
+    chart.predicted[i].add(lhs)
+    for item in chart.grammar.predictions[lhs]:
+        chart.push(i, 0, item, i, NO_NODE, None)
+
+
+def _scan(chart, item, start, node, cost, terminal, i):
+    expected = chart.grammar.symbols[terminal]
+    inserted = chart.leaf(Edit('ins', expected, None), i, i)
+    chart.push(i, cost + chart.insertion, item + 1, start, node, inserted)
+    if i == len(chart.tokens):
+        return
+    if chart.token_ids[i] == terminal:
+        chart.push(i + 1, cost, item + 1, start, node, chart.leaf(chart.tokens[i], i, i + 1))
+    else:
+        substituted = chart.leaf(Edit('sub', expected, chart.tokens[i]), i, i + 1)
+        chart.push(i + 1, cost + chart.substitution, item + 1, start, node, substituted)
+
+
+def _complete(chart, item, start, node, cost, i):
+    lhs = chart.grammar.item_lhs[item]
+    if node == NO_NODE:
+        node, least = chart.get_node(lhs, i, i, cost)
+        if least:
+            chart.nodes[node].add_family(Family(None, SPPF(EPSILON, i, i)))
+    if start == i:
+        if lhs in chart.completed[i]:
+            return
+        chart.completed[i][lhs] = (node, cost)
+    elif chart.node_cost[node] != cost or (lhs, start) in chart.completed[i]:
+        return
+    else:
+        chart.completed[i][(lhs, start)] = (node, cost)
+    for waiting_item, waiting_start, waiting_node, waiting_cost in chart.waiting[start].get(lhs, ()):
+        chart.push(i, waiting_cost + cost, waiting_item + 1, waiting_start, waiting_node, node)
+
+
+def edits(tree):
+    """The edits in a derivation (a list of edges from ``utils.iter_derivations``), left to right."""
+    leaves = {(edge.to_node.start, edge.to_node.end, edge.to_node.label) for edge in tree
+              if isinstance(edge.to_node.label, Edit)}
+    return [label for _, _, label in sorted(leaves, key=lambda leaf: (leaf[0], leaf[1]))]
+
+
+def partial_parses(chart):
+    """
+    Covers the input with complete constituents of a ``scott_2008.Chart``:
+    returns the nodes of a cover that leaves as few tokens uncovered as
+    possible and, among those, uses as few constituents as possible. The
+    chart only holds constituents that continue a viable prefix, so tokens
+    after the point where parsing got stuck stay uncovered.
+    """
+    spans = [(node.start, node.end, node) for node in chart.nodes
+             if isinstance(node.item, str) and node.families and node.start < node.end]
+    return maximal_cover(spans, len(chart.tokens))
+
+
+def maximal_cover(spans, n):
+    """
+    Picks from ``(start, end, value)`` triples a sequence of non-overlapping
+    spans over ``0..n`` minimizing (uncovered tokens, number of spans) and
+    returns their values left to right. Ties go to the longer span.
+    """
+    by_start = collections.defaultdict(list)
+    for start, end, value in spans:
+        by_start[start].append((end, value))
+    best = [None] * (n + 1)
+    best[n] = ((0, 0), None, None)
+    for i in range(n - 1, -1, -1):
+        (uncovered, pieces), _, _ = best[i + 1]
+        best[i] = ((uncovered + 1, pieces), i + 1, None)
+        for end, value in sorted(by_start[i], key=lambda span: -span[0]):
+            (uncovered, pieces), _, _ = best[end]
+            if (uncovered, pieces + 1) < best[i][0]:
+                best[i] = ((uncovered, pieces + 1), end, value)
+    values, i = [], 0
+    while i < n:
+        _, end, value = best[i]
+        if value is not None:
+            values.append(value)
+        i = end
+    return values
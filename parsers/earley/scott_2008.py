@@ -1,86 +1,40 @@
 import collections
 
-Rule = collections.namedtuple("Rule", ["lhs", "rhs"])
-Family = collections.namedtuple("Family", ["left", "right"])
-EPSILON = 'eps'
-
-
-class Item:
-    def __init__(self, rule, dot):
-        self.rule = rule
-        self.dot = dot
-
-    def __repr__(self):
-        rhs = list(self.rule.rhs)
-        rhs.insert(self.dot, '.')
-        rhs_string = ' '.join(rhs)
-        return '{} -> {}'.format(self.rule.lhs, rhs_string)
-
-    def __hash__(self):
-        return hash((self.rule, self.dot))
-
-    def __eq__(self, other):
-        return (type(self) == type(other)
-                and self.rule == other.rule
-                and self.dot == other.dot)
-
-
-class ParserItem:
-    def __init__(self, item, start, sppf):
-        self.item = item
-        self.start = start
-        self.sppf = sppf
-
-    def __hash__(self):
-        return hash((self.item, self.start, self.sppf))
-
-    def __eq__(self, other):
-        return (type(self) == type(other)
-                and self.item == other.item
-                and self.start == other.start
-                and self.sppf == other.sppf)
-
-    def __repr__(self):
-        return '({} [{}])'.format(self.item, self.start)
-
-    @property
-    def next(self):
-        if self.is_complete():
-            return None
-        return self.item.rule.rhs[self.item.dot]
-
-    def is_complete(self):
-        return self.item.dot == len(self.item.rule.rhs)
+from parsers.earley.compiled import CompiledGrammar, Item, Rule, COMPLETE, EPSILON
+from parsers.stats import timed
 
-    @property
-    def rule(self):
-        return self.item.rule
-
-    @property
-    def lhs(self):
-        return self.item.rule.lhs
-
-    @property
-    def dot(self):
-        return self.item.dot
+Family = collections.namedtuple("Family", ["left", "right"])
+NO_NODE = -1
+NO_TOKEN = -2
 
 
 class SPPF:
+    """
+    Node of the shared packed parse forest. ``families`` keeps the packed
+    children in insertion order, a set beside it makes the duplicate check
+    constant time.
+    """
+    __slots__ = ('item', 'start', 'end', 'families', '_family_set', '_hash')
+
     def __init__(self, item, start, end):
         self.item = item
         self.start = start
         self.end = end
         self.families = []
+        self._family_set = set()
+        self._hash = hash((item, start, end))
 
     def add_family(self, family):
-        if family not in self.families:
+        if family not in self._family_set:
+            self._family_set.add(family)
             self.families.append(family)
 
     def __hash__(self):
-        return hash((self.item, self.start, self.end))
+        return self._hash
 
     def __eq__(self, other):
         return (type(self) == type(other)
+                and self._hash == other._hash
                 and self.item == other.item
                 and self.start == other.start
                 and self.end == other.end)
@@ -89,18 +43,30 @@ class SPPF:
         return '({}-{}: {})'.format(self.start, self.end, self.item)
 
 
-def get_rules(grammar, nt):
-    if not nt in grammar:
-        return []
-    return grammar[nt]
-
-
 class Chart:
-    def __init__(self, tokens):
+    """
+    Earley sets over a compiled grammar. Chart items are ``(item, start,
+    node)`` tuples of ints, where ``node`` indexes ``self.nodes`` (or is
+    ``NO_NODE``). Each set is indexed by the symbol its items expect next,
+    so completion only visits the items it can advance.
+
+    Leo completions record a link on the topmost node instead of building
+    the nodes along the reduction path; ``expand`` builds them on demand.
+    """
+
+    def __init__(self, grammar, tokens, lookahead=False, leo=False):
+        self.grammar = grammar
         self.tokens = tokens
+        self.lookahead = lookahead
+        self.leo = leo
+        self.token_ids = [grammar.symbol_ids.get(token, NO_TOKEN) for token in tokens]
         self.chart = [set() for _ in range(len(tokens) + 1)]
+        self.waiting = [{} for _ in range(len(tokens) + 1)]
+        self.transitive = [{} for _ in range(len(tokens) + 1)]
         self.next_scannables = set()
-        self.curr_nodes = {}
+        self.nodes = []
+        self.node_ids = {}
+        self.leo_links = {}
 
     def get_token(self, i):
         if i >= len(self.tokens):
@@ -110,117 +76,276 @@ class Chart:
 
     def advance(self, i):
         self.empty_derivations = {}
+        self.predicted = set()
         self.new_items = set(self.chart[i])
         self.scannables = set(self.next_scannables)
         self.next_scannables = set()
 
     def _is_scannable(self, item, i):
-        return i < len(self.tokens) and item.next == self.tokens[i]
+        return i < len(self.tokens) and self.grammar.item_next[item[0]] == self.token_ids[i]
+
+    def predictions(self, lhs, i):
+        if not self.lookahead:
+            return self.grammar.predictions[lhs]
+        token = self.token_ids[i] if i < len(self.tokens) else NO_TOKEN
+        return self.grammar.lookahead_predictions[lhs].get(token, self.grammar.nullable_predictions[lhs])
 
     def completable_items(self, lhs, i):
-        completable = []
-        for item in self.chart[i]:
-            if item.next == lhs:
-                completable.append(item)
-        return completable
+        return self.waiting[i].get(lhs, ())
+
+    def _add(self, item, i):
+        self.chart[i].add(item)
+        next_symbol = self.grammar.item_next[item[0]]
+        if next_symbol != COMPLETE:
+            self.waiting[i].setdefault(next_symbol, []).append(item)
 
     def add_next_item(self, item, i):
         if self._is_scannable(item, i):
             self.next_scannables.add(item)
         elif i < len(self.chart) and item not in self.chart[i]:
-            self.chart[i].add(item)
+            self._add(item, i)
 
     def add_curr_item(self, item, i):
         if self._is_scannable(item, i):
             self.scannables.add(item)
         elif i < len(self.chart) and item not in self.chart[i]:
-            self.chart[i].add(item)
+            self._add(item, i)
             self.new_items.add(item)
 
+    def node(self, node):
+        if node == NO_NODE:
+            return None
+        return self.nodes[node]
+
+    def get_node(self, label, start, end):
+        """Returns the id of the SPPF node (label, start, end), creating it if needed."""
+        key = (label, start, end)
+        node = self.node_ids.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(SPPF(self.grammar.labels[label], start, end))
+            self.node_ids[key] = node
+        return node
+
+    def leo_item(self, i, lhs):
+        """
+        Returns ``(item, start)`` of the topmost (complete) item on the
+        deterministic reduction path above a completed ``lhs`` starting at
+        ``i``, or ``None`` if the path is empty. Results are memoized per
+        Earley set.
+        """
+        g = self.grammar
+        path = []
+        top = None
+        while True:
+            transitive = self.transitive[i]
+            if lhs in transitive:
+                top = transitive[lhs]
+                break
+            transitive[lhs] = None
+            waiting = self.waiting[i].get(lhs, ())
+            if len(waiting) != 1 or g.item_next[waiting[0][0] + 1] != COMPLETE \
+                    or g.item_lhs[waiting[0][0]] == g.augmented_start:
+                break
+            entry = waiting[0]
+            path.append((transitive, lhs, entry))
+            i, lhs = entry[1], g.item_lhs[entry[0]]
+        for transitive, lhs, entry in reversed(path):
+            if top is None:
+                top = (entry[0] + 1, entry[1])
+            transitive[lhs] = top
+        return top
+
+    def expand(self, root):
+        """Builds the SPPF nodes skipped by Leo completions below ``root``."""
+        if not self.leo_links or root is None:
+            return
+        stack, seen = [root], {id(root)}
+        while stack:
+            sppf = stack.pop()
+            for i, lhs, right in self.leo_links.pop(sppf, ()):
+                self._expand_link(sppf, i, lhs, right)
+            for family in sppf.families:
+                for child in family:
+                    if child is not None and id(child) not in seen:
+                        seen.add(id(child))
+                        stack.append(child)
+
+    def _expand_link(self, top, i, lhs, right):
+        g = self.grammar
+        while True:
+            waiting = self.waiting[i][lhs]
+            item, start, left = waiting[0]
+            node = self.get_node(g.item_label[item + 1], start, top.end)
+            sppf = self.nodes[node]
+            sppf.add_family(Family(self.node(left), right))
+            if sppf is top or len(waiting) != 1:
+                return
+            right = sppf
+            i, lhs = start, g.item_lhs[item]
+
     def find_root(self):
-        for item in self.chart[-1]:
-            if item.lhs == 'S' and item.is_complete() and item.start == 0:
-                return item.sppf
+        g = self.grammar
+        for item, start, node in self.chart[-1]:
+            if g.item_lhs[item] == g.start and g.item_next[item] == COMPLETE and start == 0:
+                return self.node(node)
         return None
 
 
-def parse(grammar, tokens):
+class CountingChart(Chart):
+    """
+    ``Chart`` that records its work in a ``parsers.stats.ParseStats``:
+    predictions, completions, scans, items per set and rule, rejected
+    duplicates and the peak number of items waiting to be processed.
+    """
+
+    def __init__(self, grammar, tokens, stats, lookahead=False, leo=False):
+        super().__init__(grammar, tokens, lookahead, leo)
+        self.stats = stats
+
+    def predictions(self, lhs, i):
+        self.stats.count('predict')
+        return super().predictions(lhs, i)
+
+    def completable_items(self, lhs, i):
+        items = super().completable_items(lhs, i)
+        self.stats.count('complete', len(items))
+        return items
+
+    def add_next_item(self, item, i):
+        if i > 0:
+            self.stats.count('scan')
+        self._count(item, i, self.next_scannables)
+        super().add_next_item(item, i)
+
+    def add_curr_item(self, item, i):
+        self._count(item, i, self.scannables)
+        super().add_curr_item(item, i)
+        self.stats.frontier(len(self.new_items))
+
+    def _count(self, item, i, scannables):
+        if item in self.chart[i] or item in scannables:
+            self.stats.count('duplicate')
+        else:
+            self.stats.add_item(i, self.grammar.rules[self.grammar.item_rule[item[0]]])
+
+
+def parse(grammar, tokens, leo=False, lookahead=False, stats=None):
+    """
+    Builds the SPPF for ``tokens``. ``grammar`` is either a dict mapping
+    nonterminals to their rules or a ``CompiledGrammar``; pass the latter to
+    share one compilation between many sentences. ``leo=True`` enables
+    Leo's optimization for right recursion, ``lookahead=True`` only
+    predicts rules that can start with the next token. A ``ParseStats``
+    passed as ``stats`` receives the counts of the chart, the size of the
+    forest and the time of each phase.
+    """
     if len(tokens) == 0:
         return None
-    chart = Chart(tokens)
-    start_item = ParserItem(Item(Rule('START', ('S',)), 0), 0, None)
-    chart.add_next_item(start_item, 0)
-
-    for i in range(len(tokens) + 1):
-        chart.advance(i)
-        while chart.new_items:
-            curr = chart.new_items.pop()
-            if not curr.is_complete():
-                predict(grammar, chart, curr.next, i)
-                if curr.next in chart.empty_derivations:  # next is empty derivation
-                    adv_item = advance(
-                        chart, curr, i, chart.empty_derivations[curr.next])
-                    chart.add_curr_item(adv_item, i)
-            else:
-                if curr.sppf == None:
-                    curr.sppf = make_empty_node(chart, curr.lhs, i)
-                if curr.start == i:
-                    chart.empty_derivations[curr.lhs] = curr.sppf
-                complete(chart, curr, i)
-        chart.curr_nodes = {}
-        scan(chart, i)
-    return chart.find_root()
+    chart = build_chart(grammar, tokens, leo, lookahead, stats)
+    with timed(stats, 'forest'):
+        root = chart.find_root()
+        chart.expand(root)
+    if stats is not None:
+        stats.forest(chart.nodes)
+    return root
+
+
+def build_chart(grammar, tokens, leo=False, lookahead=False, stats=None):
+    """Runs the parser over ``tokens`` and returns the filled chart (a ``CountingChart`` with ``stats``)."""
+    if not isinstance(grammar, CompiledGrammar):
+        with timed(stats, 'compile'):
+            grammar = CompiledGrammar(grammar)
+    if stats is None:
+        chart = Chart(grammar, tokens, lookahead, leo)
+    else:
+        chart = CountingChart(grammar, tokens, stats, lookahead, leo)
+    with timed(stats, 'chart'):
+        chart.add_next_item((grammar.start_item, 0, NO_NODE), 0)
+        for i in range(len(tokens) + 1):
+            process(chart, i)
+    return chart
+
+
+def process(chart, i):
+    """Completes Earley set ``i`` and scans its token into set ``i + 1``."""
+    grammar = chart.grammar
+    item_next = grammar.item_next
+    chart.advance(i)
+    while chart.new_items:
+        curr = chart.new_items.pop()
+        next_symbol = item_next[curr[0]]
+        if next_symbol != COMPLETE:
+            predict(grammar, chart, next_symbol, i)
+            if next_symbol in chart.empty_derivations:  # next is empty derivation
+                adv_item = advance(
+                    chart, curr, i, chart.empty_derivations[next_symbol])
+                chart.add_curr_item(adv_item, i)
+        else:
+            lhs = grammar.item_lhs[curr[0]]
+            node = curr[2]
+            if node == NO_NODE:
+                node = make_empty_node(chart, lhs, i)
+            if curr[1] == i:
+                chart.empty_derivations[lhs] = node
+            elif chart.leo:
+                top = chart.leo_item(curr[1], lhs)
+                if top is not None:
+                    complete_transitive(chart, top, curr[1], lhs, node, i)
+                    continue
+            complete(chart, curr, node, i)
+    scan(chart, i)
 
 
 def predict(grammar, chart, lhs, i):
-    for rule in get_rules(grammar, lhs):
-        chart.add_curr_item(ParserItem(Item(rule, 0), i, None), i)
+    if lhs in chart.predicted:
+        return
+    chart.predicted.add(lhs)
+    for item in chart.predictions(lhs, i):
+        chart.add_curr_item((item, i, NO_NODE), i)
 
 
 def scan(chart, i):
-    token_sppf = SPPF(chart.get_token(i), i, i + 1)
+    if not chart.scannables:
+        return
+    token_node = len(chart.nodes)
+    chart.nodes.append(SPPF(chart.get_token(i), i, i + 1))
     while chart.scannables:
         item = chart.scannables.pop()
-        adv_item = advance(chart, item, i + 1, token_sppf)
+        adv_item = advance(chart, item, i + 1, token_node)
         chart.add_next_item(adv_item, i + 1)
 
 
-def complete(chart, curr, i):
-    for item in chart.completable_items(curr.lhs, curr.start):
-        adv_item = advance(chart, item, i, curr.sppf)
+def complete(chart, curr, node, i):
+    for item in chart.completable_items(chart.grammar.item_lhs[curr[0]], curr[1]):
+        adv_item = advance(chart, item, i, node)
         chart.add_curr_item(adv_item, i)
 
 
-def advance(chart, completable, i, right_sppf):
-    adv_item = Item(completable.rule, completable.dot + 1)  # move dot
-    y = make_node(chart, adv_item, completable.start, i,
-                  completable.sppf, right_sppf)  # create SPPF node
-    return ParserItem(adv_item, completable.start, y)  # create new item
+def complete_transitive(chart, top, j, lhs, node, i):
+    item, start = top
+    top_node = chart.get_node(chart.grammar.item_label[item], start, i)
+    chart.leo_links.setdefault(chart.nodes[top_node], []).append((j, lhs, chart.nodes[node]))
+    chart.add_curr_item((item, start, top_node), i)
+
+
+def advance(chart, completable, i, right_node):
+    item, start, left_node = completable
+    y = make_node(chart, item + 1, start, i, left_node, right_node)  # move dot, create SPPF node
+    return (item + 1, start, y)  # create new item
 
 
 def make_empty_node(chart, lhs, i):
-    empty_node = SPPF(lhs, i, i)
-    if empty_node in chart.curr_nodes:
-        empty_node = chart.curr_nodes[empty_node]
-    else:
-        chart.curr_nodes[empty_node] = empty_node
+    empty_node = chart.get_node(lhs, i, i)
     epsilon_sppf = SPPF(EPSILON, i, i)
-    empty_node.add_family(Family(None, epsilon_sppf))
+    chart.nodes[empty_node].add_family(Family(None, epsilon_sppf))
     return empty_node
 
 
 def make_node(chart, item, start, end, left, right):
-    s = item.rule.lhs
-    if item.dot != len(item.rule.rhs):  # item is not complete
-        if item.dot == 1:
-            return right
-        s = item
-    sppf = SPPF(s, start, end)
-    if sppf not in chart.curr_nodes:
-        chart.curr_nodes[sppf] = sppf
-    sppf = chart.curr_nodes[sppf]
-    if (left == None):
-        sppf.add_family(Family(None, right))
-    else:
-        sppf.add_family(Family(left, right))
-    return sppf
+    g = chart.grammar
+    if g.item_dot[item] == 1 and g.item_next[item] != COMPLETE:
+        return right
+    node = chart.get_node(g.item_label[item], start, end)
+    chart.nodes[node].add_family(Family(chart.node(left), chart.nodes[right]))
+    return node
@@ -1,4 +1,5 @@
 import collections
+import math
 from functools import total_ordering
 
 
@@ -38,46 +39,196 @@ class Edge:
                 (other.to_node.start, self.to_node.span()))
 
 
-Deriv = collections.namedtuple("Deriv", ["edges", "families", "stack"])
+def collect_derivations(sppf):
+    return list(iter_derivations(sppf))
+
+
+def iter_derivations(sppf, limit=None):
+    """
+    Yields the derivations in the forest below ``sppf`` one at a time, as
+    lists of edges. Only a single derivation is held in memory: ambiguous
+    nodes are choice points that are undone and retried on backtracking
+    instead of copying the partial derivation. A family is used at most
+    once on each path from the root, which unrolls every cycle at most
+    once; a branch that can only go on through used families is dropped.
+    """
+    if limit is not None and limit <= 0:
+        return
+    cyclic = _cyclic_components(sppf)
+    edges, stack = [], [(sppf, _NONE_USED)]
+    trail = []  # choice points: [node, used, options, chosen index, len(edges)]
+    count = 0
+    while True:
+        while stack:
+            node, used = stack.pop()
+            options = _options(node, used)
+            if not options:
+                stack.append((node, used))
+                break
+            trail.append([node, used, options, 0, len(edges)])
+            _apply(node, used, options[0], edges, stack, cyclic)
+        else:
+            yield list(edges)
+            count += 1
+            if limit is not None and count >= limit:
+                return
+        while trail:
+            choice = trail[-1]
+            node, used, options, k, num_edges = choice
+            _undo(options[k], edges, stack, num_edges)
+            if k + 1 < len(options):
+                choice[3] = k + 1
+                _apply(node, used, options[k + 1], edges, stack, cyclic)
+                break
+            trail.pop()
+            stack.append((node, used))
+        else:
+            return
+
+
+_NONE_USED = frozenset()
+
+
+def _options(node, used):
+    if not node or not node.families:
+        return [None]
+    return _unused(node, used)
+
+
+def _unused(node, used):
+    return [family for family in node.families if family not in used]
+
+
+def _child_used(node, used, family, child, cyclic):
+    """The families of the path that can recur below ``child``: only those of its strongly connected component."""
+    component = cyclic.get(id(child))
+    if component is None or component != cyclic.get(id(node)):
+        return _NONE_USED
+    return used | {family}
+
+
+def _apply(node, used, family, edges, stack, cyclic):
+    if family is not None:
+        _add_edges(edges, node, family)
+        stack.append((family.left, _child_used(node, used, family, family.left, cyclic)))
+        stack.append((family.right, _child_used(node, used, family, family.right, cyclic)))
+
+
+def _undo(family, edges, stack, num_edges):
+    if family is not None:
+        del edges[num_edges:]
+        del stack[-2:]
+
+
+def count_derivations(sppf, infinite=False):
+    """
+    Counts the derivations that ``iter_derivations`` yields without
+    building them, by annotating every node with the number of its
+    subtrees (dynamic programming over the forest). Below a node on a
+    cycle the count also depends on the families of its cycle used above
+    it, so such nodes are annotated once per set of used families.
+
+    Forests with cycles encode infinitely many derivations; with
+    ``infinite`` their count is ``math.inf``.
+    """
+    if not sppf:
+        return 1
+    cyclic = _cyclic_components(sppf)
+    if infinite and cyclic:
+        return math.inf
+    counts = {}
+    stack = [(sppf, _NONE_USED, False)]
+    while stack:
+        node, used, expanded = stack.pop()
+        key = (id(node), used)
+        if expanded:
+            total = 0 if node.families else 1
+            for family in _unused(node, used):
+                subtotal = 1
+                for child in family:
+                    if child:
+                        subtotal *= counts[id(child), _child_used(node, used, family, child, cyclic)]
+                total += subtotal
+            counts[key] = total
+            continue
+        if key in counts:
+            continue
+        stack.append((node, used, True))
+        for family in _unused(node, used):
+            for child in family:
+                if child:
+                    child_used = _child_used(node, used, family, child, cyclic)
+                    if (id(child), child_used) not in counts:
+                        stack.append((child, child_used, False))
+    return counts[id(sppf), _NONE_USED]
+
+
+def _cyclic_components(sppf):
+    """
+    Maps the id of every node on a cycle below ``sppf`` to the id of the
+    root of its strongly connected component (Tarjan's algorithm, with an
+    explicit stack).
+    """
+    if not sppf:
+        return {}
+    index, low, components = {}, {}, {}
+    path, on_path = [], set()
+    work = []
+
+    def visit(node):
+        index[id(node)] = low[id(node)] = len(index)
+        path.append(node)
+        on_path.add(id(node))
+        work.append((node, _children(node)))
+
+    visit(sppf)
+    while work:
+        node, children = work[-1]
+        for child in children:
+            if id(child) not in index:
+                visit(child)
+                break
+            if id(child) in on_path:
+                low[id(node)] = min(low[id(node)], index[id(child)])
+        else:
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[id(parent)] = min(low[id(parent)], low[id(node)])
+            if low[id(node)] == index[id(node)]:
+                component = []
+                while not component or component[-1] is not node:
+                    component.append(path.pop())
+                    on_path.discard(id(component[-1]))
+                if len(component) > 1 or any(child is node for child in _children(node)):
+                    for member in component:
+                        components[id(member)] = id(node)
+    return components
+
+
+def _children(node):
+    return iter([child for family in node.families for child in family if child])
 
 
-def collect_derivations(sppf):
-    unfinished = [Deriv([], set(), [sppf])]
-    finished = []
-    while unfinished:
-        deriv = unfinished.pop()
-        while deriv.stack:
-            sppf = deriv.stack.pop()
-            if not sppf:
-                continue
-            if len(sppf.families) > 1:
-                for family in sppf.families[1:]:
-                    if family in deriv.families:
-                        continue
-                    new_deriv = Deriv(list(deriv.edges), set(
-                        deriv.families), list(deriv.stack))
-                    _add_family(new_deriv, sppf, family)
-                    unfinished.append(new_deriv)
-            if len(sppf.families) > 0:
-                first_family = sppf.families[0]
-                if first_family not in deriv.families:
-                    _add_family(deriv, sppf, first_family)
-        finished.append(deriv.edges)
-    return finished
+Deriv = collections.namedtuple("Deriv", ["edges", "families", "stack"])
 
 
 def _add_family(deriv, sppf, family):
     deriv.families.add(family)
+    _add_edges(deriv.edges, sppf, family)
+    deriv.stack.append(family.left)
+    deriv.stack.append(family.right)
+
+
+def _add_edges(edges, sppf, family):
     root = Node(sppf.item, sppf.start, sppf.end)
     if family.left:
         left_edge = Edge(root, Node(family.left.item,
                                     family.left.start, family.left.end))
-        deriv.edges.append(left_edge)
-    deriv.stack.append(family.left)
+        edges.append(left_edge)
     right_edge = Edge(root, Node(family.right.item,
                                  family.right.start, family.right.end))
-    deriv.edges.append(right_edge)
-    deriv.stack.append(family.right)
+    edges.append(right_edge)
 
 
 def to_dot_language(tree, name):
@@ -0,0 +1,192 @@
+import heapq
+import math
+
+from parsers.earley.compiled import Item, EPSILON
+from parsers.earley.utils import Deriv, _add_family
+
+
+def rule_probabilities(grammar):
+    """Maps (lhs, rhs) to the rule probability, 1.0 for rules without one."""
+    return {(rule.lhs, rule.rhs): getattr(rule, 'prob', 1.0)
+            for rules in grammar.values() for rule in rules}
+
+
+def family_rule(node, family):
+    """
+    Returns (lhs, rhs) of the rule a family of a symbol node stands for, or
+    ``None`` for families of intermediate nodes (their rule is only counted
+    once the item is complete).
+    """
+    if isinstance(node.item, Item):
+        return None
+    left, right = family
+    if left is None:
+        rhs = () if right.item == EPSILON else (right.item,)
+    elif isinstance(left.item, Item):
+        rhs = left.item.rule.rhs
+    else:
+        rhs = (left.item, right.item)
+    return node.item, rhs
+
+
+def _log(prob):
+    return math.log(prob) if prob > 0 else -math.inf
+
+
+class _Forest:
+    """
+    Nodes of a forest in bottom-up order with the log probability of every
+    family's rule. Families closing a cycle are left out, so all scores
+    below are over the acyclic derivations.
+    """
+
+    def __init__(self, sppf, probabilities):
+        self.order = []
+        self.families = {}
+        on_stack, done = set(), set()
+        stack = [(sppf, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                on_stack.discard(id(node))
+                done.add(id(node))
+                self.order.append(node)
+                continue
+            if id(node) in done or id(node) in on_stack:
+                continue
+            on_stack.add(id(node))
+            stack.append((node, True))
+            families = []
+            for family in node.families:
+                children = [child for child in family if child is not None]
+                if any(id(child) in on_stack for child in children):
+                    continue
+                rule = family_rule(node, family)
+                score = 0.0 if rule is None else _log(probabilities.get(rule, 1.0))
+                families.append((score, family, children))
+                stack.extend((child, False) for child in children if id(child) not in done)
+            self.families[id(node)] = families
+
+
+def viterbi(sppf, probabilities):
+    """
+    Returns ``(log probability, tree)`` of the most probable derivation in
+    one bottom-up pass over the forest, or ``None`` for an empty forest. The
+    tree is a list of edges like the ones from ``collect_derivations``.
+    """
+    if sppf is None:
+        return None
+    forest = _Forest(sppf, probabilities)
+    best = {}
+    for node in forest.order:
+        families = forest.families[id(node)]
+        if not node.families:
+            best[id(node)] = (0.0, None)
+            continue
+        best[id(node)] = max(((score + sum(best[id(child)][0] for child in children), i)
+                              for i, (score, family, children) in enumerate(families)),
+                             default=(-math.inf, None))
+    choice = {key: forest.families[key][i][1] if i is not None else None
+              for key, (_, i) in best.items()}
+    return best[id(sppf)][0], _build_tree(sppf, lambda node: choice[id(node)])
+
+
+def inside(sppf, probabilities):
+    """Returns the inside probability of every node in the forest, keyed by node."""
+    if sppf is None:
+        return {}
+    forest = _Forest(sppf, probabilities)
+    scores = {}
+    for node in forest.order:
+        if not node.families:
+            scores[node] = 1.0
+            continue
+        scores[node] = sum(math.exp(score) * math.prod(scores[child] for child in children)
+                           for score, family, children in forest.families[id(node)])
+    return scores
+
+
+def k_best(sppf, probabilities, k=None):
+    """
+    Yields ``(log probability, tree)`` pairs in order of decreasing
+    probability, computing each only when it is requested (Huang & Chiang
+    2005, algorithm 3).
+    """
+    if sppf is None:
+        return
+    kbest = _KBest(_Forest(sppf, probabilities))
+    rank = 0
+    while k is None or rank < k:
+        derivation = kbest.get(sppf, rank)
+        if derivation is None:
+            return
+        yield derivation[0], kbest.tree(sppf, rank)
+        rank += 1
+
+
+class _KBest:
+    def __init__(self, forest):
+        self.forest = forest
+        self.derivations = {}  # node -> [(score, family index, child ranks)]
+        self.candidates = {}
+        self.seen = set()
+
+    def get(self, node, rank):
+        key = id(node)
+        if key not in self.derivations:
+            self.derivations[key] = []
+            self.candidates[key] = []
+            if not node.families:
+                self.derivations[key].append((0.0, None, ()))
+            else:
+                for i in range(len(self.forest.families[key])):
+                    self._push(node, i, (0,) * len(self.forest.families[key][i][2]))
+        derivations = self.derivations[key]
+        candidates = self.candidates[key]
+        while len(derivations) <= rank and candidates:
+            negative, i, ranks = heapq.heappop(candidates)
+            derivations.append((-negative, i, ranks))
+            for position in range(len(ranks)):
+                successor = ranks[:position] + (ranks[position] + 1,) + ranks[position + 1:]
+                self._push(node, i, successor)
+        return derivations[rank] if rank < len(derivations) else None
+
+    def _push(self, node, i, ranks):
+        if (id(node), i, ranks) in self.seen:
+            return
+        self.seen.add((id(node), i, ranks))
+        score, family, children = self.forest.families[id(node)][i]
+        for child, rank in zip(children, ranks):
+            derivation = self.get(child, rank)
+            if derivation is None:
+                return
+            score += derivation[0]
+        if score > -math.inf:
+            heapq.heappush(self.candidates[id(node)], (-score, i, ranks))
+
+    def tree(self, sppf, rank):
+        ranks = {}
+
+        def choose(node):
+            _, i, child_ranks = self.derivations[id(node)][ranks.get(id(node), 0)]
+            if i is None:
+                return None
+            score, family, children = self.forest.families[id(node)][i]
+            for child, child_rank in zip(children, child_ranks):
+                ranks[id(child)] = child_rank
+            return family
+
+        ranks[id(sppf)] = rank
+        return _build_tree(sppf, choose)
+
+
+def _build_tree(sppf, choose):
+    deriv = Deriv([], set(), [sppf])
+    while deriv.stack:
+        node = deriv.stack.pop()
+        if not node:
+            continue
+        family = choose(node)
+        if family is not None:
+            _add_family(deriv, node, family)
+    return deriv.edges
@@ -0,0 +1,165 @@
+import math
+
+END = '<END>'
+
+
+def nullable_symbols(grammar):
+    """Nonterminals that derive the empty string."""
+    nullable = set()
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in grammar.items():
+            if lhs not in nullable and any(all(symbol in nullable for symbol in rule.rhs) for rule in rules):
+                nullable.add(lhs)
+                changed = True
+    return nullable
+
+
+def first_sets(grammar, nullable=None):
+    """
+    Maps every nonterminal to the terminals its derivations can start with.
+    Symbols without rules are terminals; with a lexicon these are the
+    lexical categories.
+    """
+    if nullable is None:
+        nullable = nullable_symbols(grammar)
+    first = {lhs: set() for lhs in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in grammar.items():
+            for rule in rules:
+                new = sequence_first(rule.rhs, first, nullable) - first[lhs]
+                if new:
+                    first[lhs].update(new)
+                    changed = True
+    return first
+
+
+def sequence_first(symbols, first, nullable):
+    """Terminals a derivation of the symbol sequence can start with."""
+    result = set()
+    for symbol in symbols:
+        if symbol not in first:
+            result.add(symbol)
+            return result
+        result.update(first[symbol])
+        if symbol not in nullable:
+            return result
+    return result
+
+
+def min_yields(grammar):
+    """
+    Maps every nonterminal to the length of the shortest terminal string it
+    derives (``math.inf`` if it derives none).
+    """
+    lengths = {lhs: math.inf for lhs in grammar}
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in grammar.items():
+            for rule in rules:
+                length = sum(lengths.get(symbol, 1) for symbol in rule.rhs)
+                if length < lengths[lhs]:
+                    lengths[lhs] = length
+                    changed = True
+    return lengths
+
+
+def follow_sets(grammar, start='S', first=None, nullable=None):
+    """Maps every nonterminal to the terminals (or ``END``) that can follow it."""
+    if nullable is None:
+        nullable = nullable_symbols(grammar)
+    if first is None:
+        first = first_sets(grammar, nullable)
+    follow = {lhs: set() for lhs in grammar}
+    follow[start].add(END)
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in grammar.items():
+            for rule in rules:
+                for i, symbol in enumerate(rule.rhs):
+                    if symbol not in grammar:
+                        continue
+                    rest = rule.rhs[i + 1:]
+                    new = sequence_first(rest, first, nullable)
+                    if all(other in nullable for other in rest):
+                        new = new | follow[lhs]
+                    new = new - follow[symbol]
+                    if new:
+                        follow[symbol].update(new)
+                        changed = True
+    return follow
+
+
+def remove_useless(grammar, start='S', nonterminals=None):
+    """
+    Returns a copy of the grammar without unproductive rules (those using a
+    nonterminal that derives no terminal string) and without rules of
+    nonterminals that cannot be reached from ``start``. The rule objects
+    are kept. ``nonterminals`` defaults to the symbols with rules; pass a
+    larger set if nonterminals without rules are not terminals.
+    """
+    if nonterminals is None:
+        nonterminals = grammar
+    productive = set()
+    changed = True
+    while changed:
+        changed = False
+        for lhs, rules in grammar.items():
+            if lhs not in productive and any(_is_productive(rule, nonterminals, productive) for rule in rules):
+                productive.add(lhs)
+                changed = True
+    rules = {lhs: [rule for rule in rules if _is_productive(rule, nonterminals, productive)]
+             for lhs, rules in grammar.items() if lhs in productive}
+
+    reachable, agenda = {start}, [start]
+    while agenda:
+        for rule in rules.get(agenda.pop(), ()):
+            for symbol in rule.rhs:
+                if symbol in rules and symbol not in reachable:
+                    reachable.add(symbol)
+                    agenda.append(symbol)
+    return {lhs: rules[lhs] for lhs in rules if lhs in reachable}
+
+
+def _is_productive(rule, nonterminals, productive):
+    return all(symbol not in nonterminals or symbol in productive for symbol in rule.rhs)
+
+
+class PredictionTable:
+    """
+    Rules to predict for a nonterminal given the terminals the next token
+    can be. A rule is kept if its right-hand side can start with one of
+    them or can derive the empty string.
+    """
+
+    def __init__(self, grammar):
+        nullable = nullable_symbols(grammar)
+        first = first_sets(grammar, nullable)
+        self.rules = grammar
+        self.table = {}
+        self.always = {}
+        for lhs, rules in grammar.items():
+            always = [rule for rule in rules if all(symbol in nullable for symbol in rule.rhs)]
+            table = {}
+            for rule in rules:
+                for terminal in sequence_first(rule.rhs, first, nullable):
+                    table.setdefault(terminal, set()).add(rule)
+            self.always[lhs] = always
+            self.table[lhs] = {terminal: [rule for rule in rules if rule in predicted or rule in always]
+                               for terminal, predicted in table.items()}
+
+    def predict(self, lhs, terminals):
+        """Rules of ``lhs`` that can start with one of ``terminals``, in grammar order."""
+        table = self.table[lhs]
+        if len(terminals) == 1:
+            for terminal in terminals:
+                return table.get(terminal, self.always[lhs])
+        rules = set(self.always[lhs])
+        for terminal in terminals:
+            rules.update(table.get(terminal, ()))
+        return [rule for rule in self.rules[lhs] if rule in rules]
@@ -0,0 +1,292 @@
+"""
+Transformation of a grammar into one a top-down parser can explore
+exhaustively: without empty rules (except ``S ->`` if the start symbol
+derives the empty string), without unit rules, and thus without cycles,
+and without left recursion (Paull's algorithm, in the variant that
+introduces no empty rules).
+
+Every rule of the result is a ``TransformedRule`` that knows how to
+rebuild the original derivation tree from the trees of its nonterminal
+children, so ``original_derivation`` maps a leftmost derivation in the
+transformed grammar back to the leftmost derivation in the original one.
+A tree is a pair ``(rule, children)`` over original rules. The children
+of a fresh nonterminal introduced for left recursion are not trees but
+functions that complete a tree given its leftmost subtree.
+
+Derivations that go around a cycle (a nonterminal deriving itself through
+unit rules or empty derivations) have no counterpart in the transformed
+grammar; all others are kept. A symbol with several empty derivations
+leaves one copy of each rule it was dropped from per empty derivation.
+
+``to_cnf`` converts into Chomsky normal form the same way, replacing
+left-recursion removal by lifting terminals out of longer rules and
+splitting the rules into binary ones.
+"""
+import itertools
+
+from .grammar_analysis import remove_useless
+from .shared import Rule
+
+
+class TransformedRule(Rule):
+    """
+    Rule of a transformed grammar. ``origin`` maps the results of the
+    ``arity`` nonterminals on the right-hand side to the original tree.
+    """
+    __slots__ = ('origin', 'arity')
+
+    def __init__(self, lhs, rhs, origin, arity=0, prob=1.0):
+        super().__init__(lhs, rhs, prob)
+        self.origin = origin
+        self.arity = arity
+
+
+def transform_for_top_down(grammar, start='S'):
+    """Returns the transformed grammar as a dict of ``TransformedRule`` lists."""
+    return _Transformer(grammar, start).run()
+
+
+def to_cnf(grammar, start='S'):
+    """
+    Returns an equivalent grammar in Chomsky normal form, as a dict of
+    ``TransformedRule`` lists: every rule is ``A -> B C`` or ``A -> a``,
+    and ``S ->`` if ``S`` derives the empty string.
+    """
+    return _Transformer(grammar, start).run(cnf=True)
+
+
+def original_derivation(rules):
+    """Maps a leftmost derivation in a transformed grammar to one in the original grammar."""
+    if not rules or not isinstance(rules[0], TransformedRule):
+        return list(rules)
+    remaining = iter(rules)
+
+    def build():
+        rule = next(remaining)
+        return rule.origin([build() for _ in range(rule.arity)])
+
+    derivation, stack = [], [build()]
+    while stack:
+        rule, children = stack.pop()
+        derivation.append(rule)
+        stack.extend(reversed(children))
+    return derivation
+
+
+def _tree(rule):
+    return lambda children: (rule, children)
+
+
+class _Transformer:
+    def __init__(self, grammar, start):
+        self.start = start
+        self.nonterminals = set(grammar)
+        self.terminals = {symbol for rules in grammar.values() for rule in rules
+                          for symbol in rule.rhs if symbol not in self.nonterminals}
+        self.rules = {lhs: [TransformedRule(rule.lhs, rule.rhs, _tree(rule)) for rule in rules]
+                      for lhs, rules in grammar.items()}
+
+    def run(self, cnf=False):
+        self.remove_empty_rules()
+        self.remove_unit_rules()
+        if cnf:
+            self.lift_terminals()
+            self.binarize()
+        else:
+            self.remove_left_recursion()
+        self.remove_useless()
+        return {lhs: [TransformedRule(rule.lhs, rule.rhs, rule.origin, self.arity(rule.rhs))
+                      for rule in rules]
+                for lhs, rules in self.rules.items()}
+
+    def arity(self, rhs):
+        return sum(1 for symbol in rhs if symbol in self.nonterminals)
+
+    def fresh(self, symbol):
+        while symbol in self.nonterminals or symbol in self.terminals:
+            symbol += "'"
+        self.nonterminals.add(symbol)
+        return symbol
+
+    def rename(self, old, new):
+        def replace(symbol):
+            return new if symbol == old else symbol
+
+        self.rules = {replace(lhs): [TransformedRule(replace(rule.lhs), tuple(map(replace, rule.rhs)), rule.origin)
+                                     for rule in rules]
+                      for lhs, rules in self.rules.items()}
+
+    def remove_empty_rules(self):
+        nullable = set()
+        changed = True
+        while changed:
+            changed = False
+            for lhs, rules in self.rules.items():
+                if lhs not in nullable and any(all(symbol in nullable for symbol in rule.rhs) for rule in rules):
+                    nullable.add(lhs)
+                    changed = True
+        if not nullable:
+            return
+        empty = {symbol: self._empty_derivations(symbol, frozenset()) for symbol in nullable}
+        if self.start in empty:
+            # the start symbol gets a fresh copy, so that only 'S ->' is empty
+            inner = self.fresh(self.start)
+            self.rename(self.start, inner)
+            empty[inner] = empty.pop(self.start)
+            self.rules[self.start] = [TransformedRule(self.start, (inner,), lambda children: children[0])]
+            empty[self.start] = empty[inner]
+        rules = {}
+        for lhs, old_rules in self.rules.items():
+            rules[lhs] = []
+            for rule in old_rules:
+                for keep in itertools.product(*[(True, False) if symbol in empty else (True,)
+                                                for symbol in rule.rhs]):
+                    rhs = tuple(symbol for symbol, kept in zip(rule.rhs, keep) if kept)
+                    if (not rhs and lhs != self.start) or rhs == (lhs,):
+                        continue
+                    dropped = [empty[symbol] for symbol, kept in zip(rule.rhs, keep) if not kept]
+                    for results in itertools.product(*dropped):
+                        rules[lhs].append(TransformedRule(lhs, rhs, self._drop(rule, keep, results)))
+        self.rules = rules
+        self.remove_useless()
+
+    def _empty_derivations(self, symbol, path):
+        """The results of all empty derivations of ``symbol`` that derive no symbol of ``path`` or itself again."""
+        path = path | {symbol}
+        results = []
+        for rule in self.rules.get(symbol, ()):
+            if any(child in path or child not in self.nonterminals for child in rule.rhs):
+                continue
+            for children in itertools.product(*[self._empty_derivations(child, path) for child in rule.rhs]):
+                results.append(rule.origin(list(children)))
+        return results
+
+    def _drop(self, rule, keep, results):
+        """Origin of ``rule`` without the symbols not to ``keep``, whose empty derivations gave ``results``."""
+        nonterminals = [kept for symbol, kept in zip(rule.rhs, keep) if symbol in self.nonterminals]
+
+        def origin(children):
+            children, dropped = iter(children), iter(results)
+            return rule.origin([next(children) if kept else next(dropped) for kept in nonterminals])
+
+        return origin
+
+    def remove_unit_rules(self):
+        rules = {}
+        for lhs in self.rules:
+            rules[lhs] = []
+            for symbol, wrap in self._unit_paths(lhs):
+                for rule in self.rules[symbol]:
+                    if not self._is_unit(rule):
+                        rules[lhs].append(TransformedRule(
+                            lhs, rule.rhs, lambda children, wrap=wrap, rule=rule: wrap(rule.origin(children))))
+        self.rules = rules
+        self.remove_useless()
+
+    def _is_unit(self, rule):
+        return len(rule.rhs) == 1 and rule.rhs[0] in self.nonterminals
+
+    def _unit_paths(self, lhs):
+        """
+        Yields, for every chain of unit rules from ``lhs`` that visits no
+        symbol twice, its last symbol and a function wrapping a result of
+        that symbol into a result of ``lhs``.
+        """
+        stack = [(lhs, lambda result: result, frozenset([lhs]))]
+        while stack:
+            symbol, wrap, path = stack.pop()
+            yield symbol, wrap
+            for rule in reversed(self.rules.get(symbol, ())):
+                if self._is_unit(rule) and rule.rhs[0] not in path:
+                    stack.append((rule.rhs[0], lambda result, wrap=wrap, rule=rule: wrap(rule.origin([result])),
+                                  path | {rule.rhs[0]}))
+
+    def remove_left_recursion(self):
+        order = [lhs for lhs in self.rules]
+        for i, lhs in enumerate(order):
+            earlier = set(order[:i])
+            changed = True
+            while changed:
+                changed = False
+                rules = []
+                for rule in self.rules[lhs]:
+                    if rule.rhs and rule.rhs[0] in earlier:
+                        changed = True
+                        for first in self.rules[rule.rhs[0]]:
+                            rules.append(TransformedRule(lhs, first.rhs + rule.rhs[1:],
+                                                         self._substituted(rule, first)))
+                    else:
+                        rules.append(rule)
+                self.rules[lhs] = rules
+            self._remove_immediate_left_recursion(lhs)
+
+    def _substituted(self, rule, first):
+        n = self.arity(first.rhs)
+        return lambda children: rule.origin([first.origin(children[:n])] + children[n:])
+
+    def _remove_immediate_left_recursion(self, lhs):
+        recursive = [rule for rule in self.rules[lhs] if rule.rhs and rule.rhs[0] == lhs]
+        if not recursive:
+            return
+        tail = self.fresh(lhs)
+        rules, tail_rules = [], []
+        for rule in self.rules[lhs]:
+            if rule in recursive:
+                continue
+            n = self.arity(rule.rhs)
+            rules.append(rule)
+            rules.append(TransformedRule(lhs, rule.rhs + (tail,),
+                                         lambda children, rule=rule, n=n: children[n](rule.origin(children[:n]))))
+        for rule in recursive:
+            rest = rule.rhs[1:]
+            n = self.arity(rest)
+            tail_rules.append(TransformedRule(tail, rest, lambda children, rule=rule: (
+                lambda left: rule.origin([left] + children))))
+            tail_rules.append(TransformedRule(tail, rest + (tail,), lambda children, rule=rule, n=n: (
+                lambda left: children[n](rule.origin([left] + children[:n])))))
+        self.rules[lhs] = rules
+        self.rules[tail] = tail_rules
+
+    def lift_terminals(self):
+        """Replaces terminals in rules of two or more symbols by nonterminals deriving only them."""
+        preterminals = {}
+        for lhs in list(self.rules):
+            rules = []
+            for rule in self.rules[lhs]:
+                if len(rule.rhs) < 2 or all(symbol in self.nonterminals for symbol in rule.rhs):
+                    rules.append(rule)
+                    continue
+                kept = [symbol in self.nonterminals for symbol in rule.rhs]
+                rhs = []
+                for symbol, nonterminal in zip(rule.rhs, kept):
+                    if not nonterminal and symbol not in preterminals:
+                        preterminals[symbol] = self.fresh(symbol.upper())
+                        self.rules[preterminals[symbol]] = [
+                            TransformedRule(preterminals[symbol], (symbol,), lambda children: None)]
+                    rhs.append(symbol if nonterminal else preterminals[symbol])
+                rules.append(TransformedRule(lhs, tuple(rhs), lambda children, rule=rule, kept=kept: rule.origin(
+                    [child for child, nonterminal in zip(children, kept) if nonterminal])))
+            self.rules[lhs] = rules
+
+    def binarize(self):
+        """Splits ``A -> X1 X2 ... Xn`` into ``A -> X1 A'``, ``A' -> X2 A''``, ..., ``A'..' -> Xn-1 Xn``."""
+        for lhs in list(self.rules):
+            rules = []
+            for rule in self.rules[lhs]:
+                if len(rule.rhs) <= 2:
+                    rules.append(rule)
+                    continue
+                rest = self.fresh(lhs)
+                rules.append(TransformedRule(lhs, (rule.rhs[0], rest),
+                                             lambda children, rule=rule: rule.origin([children[0]] + children[1])))
+                for k in range(1, len(rule.rhs) - 2):
+                    following = self.fresh(lhs)
+                    self.rules[rest] = [TransformedRule(rest, (rule.rhs[k], following),
+                                                        lambda children: [children[0]] + children[1])]
+                    rest = following
+                self.rules[rest] = [TransformedRule(rest, rule.rhs[-2:], list)]
+            self.rules[lhs] = rules
+
+    def remove_useless(self):
+        """Drops rules using nonterminals without (productive) rules and rules of unreachable ones."""
+        self.rules = remove_useless(self.rules, self.start, self.nonterminals)
@@ -1,7 +1,20 @@
+import collections
+import heapq
+import itertools
+import time
 from abc import ABC, abstractmethod
 
+from .stats import timed
+
 
 class Graph(ABC):
+    """
+    A graph searched from a start vertex. If ``stats`` is a
+    ``parsers.stats.ParseStats``, the searches count the expanded vertices,
+    record the peak size of their frontier and time the search in it.
+    """
+    stats = None
+
     @abstractmethod
     def successors(self, vertex):
         pass
@@ -10,52 +23,203 @@ class Graph(ABC):
     def is_goal(self, vertex):
         pass
 
+    def heuristic(self, vertex):
+        """Estimated distance to a goal, used by best-first search (lower is expanded first)."""
+        return 0
 
-def bfs_search_first(graph, start):
-    visited, queue = set(), [start]
-    while queue:
-        vertex = queue.pop(0)
-        if graph.is_goal(vertex):
-            return vertex
-        if vertex not in visited:
-            visited.add(vertex)
-            queue.extend(graph.successors(vertex) - visited)
-    return None
 
+class Limits:
+    """
+    Bounds for a search: ``max_nodes`` expanded vertices, ``max_frontier``
+    vertices waiting to be expanded and ``timeout`` seconds. ``None`` means
+    unbounded. A search that reaches a bound raises ``SearchLimitReached``.
+    """
 
-def bfs_search_all(graph, start):
-    vertices = []
-    visited, queue = set(), [start]
-    while queue:
-        vertex = queue.pop(0)
-        if graph.is_goal(vertex):
-            vertices.append(vertex)
-        if vertex not in visited:
-            visited.add(vertex)
-            queue.extend(graph.successors(vertex) - visited)
-    return vertices
+    def __init__(self, max_nodes=None, max_frontier=None, timeout=None):
+        self.max_nodes = max_nodes
+        self.max_frontier = max_frontier
+        self.timeout = timeout
 
 
-def dfs_search_first(graph, start):
-    visited, stack = set(), [start]
-    while stack:
-        vertex = stack.pop()
+class SearchLimitReached(Exception):
+    """Raised when a search hits one of its ``Limits``; ``found`` holds the goals found until then."""
+
+    def __init__(self, reason, found):
+        super().__init__(reason)
+        self.reason = reason
+        self.found = found
+
+
+class _Budget:
+    def __init__(self, limits, stats=None):
+        self.limits = limits or Limits()
+        self.stats = stats
+        self.expanded = 0
+        self.deadline = None
+        if self.limits.timeout is not None:
+            self.deadline = time.monotonic() + self.limits.timeout
+
+    def expand(self, frontier, found):
+        self.expanded += 1
+        if self.stats is not None:
+            self.stats.count('expand')
+            self.stats.frontier(frontier)
+        limits = self.limits
+        if limits.max_nodes is not None and self.expanded > limits.max_nodes:
+            raise SearchLimitReached('node budget of {} exhausted'.format(limits.max_nodes), found)
+        if limits.max_frontier is not None and frontier > limits.max_frontier:
+            raise SearchLimitReached('frontier exceeds {} vertices'.format(limits.max_frontier), found)
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise SearchLimitReached('timeout after {}s'.format(limits.timeout), found)
+
+
+class _Queue:
+    def __init__(self, start):
+        self.vertices = collections.deque([start])
+
+    def push(self, vertex):
+        self.vertices.append(vertex)
+
+    def pop(self):
+        return self.vertices.popleft()
+
+    def __len__(self):
+        return len(self.vertices)
+
+
+class _Stack:
+    def __init__(self, start):
+        self.vertices = [start]
+
+    def push(self, vertex):
+        self.vertices.append(vertex)
+
+    def pop(self):
+        return self.vertices.pop()
+
+    def __len__(self):
+        return len(self.vertices)
+
+
+class _PriorityQueue:
+    """Lowest heuristic value first, ties in insertion order."""
+
+    def __init__(self, start, heuristic):
+        self.heuristic = heuristic
+        self.counter = itertools.count()
+        self.vertices = []
+        self.push(start)
+
+    def push(self, vertex):
+        heapq.heappush(self.vertices, (self.heuristic(vertex), next(self.counter), vertex))
+
+    def pop(self):
+        return heapq.heappop(self.vertices)[2]
+
+    def __len__(self):
+        return len(self.vertices)
+
+
+def _search(graph, frontier, first, limits):
+    stats = getattr(graph, 'stats', None)
+    with timed(stats, 'search'):
+        return _explore(graph, frontier, first, _Budget(limits, stats))
+
+
+def _explore(graph, frontier, first, budget):
+    found = []
+    visited = set()
+    while frontier:
+        vertex = frontier.pop()
         if graph.is_goal(vertex):
-            return vertex
+            if first:
+                return [vertex]
+            found.append(vertex)
         if vertex not in visited:
             visited.add(vertex)
-            stack.extend(graph.successors(vertex) - visited)
-    return None
+            for successor in graph.successors(vertex):
+                if successor not in visited:
+                    frontier.push(successor)
+            budget.expand(len(frontier), found)
+    return found
+
+
+def _first(found):
+    return found[0] if found else None
+
+
+def bfs_search_first(graph, start, limits=None):
+    return _first(_search(graph, _Queue(start), True, limits))
+
+
+def bfs_search_all(graph, start, limits=None):
+    return _search(graph, _Queue(start), False, limits)
+
+
+def dfs_search_first(graph, start, limits=None):
+    return _first(_search(graph, _Stack(start), True, limits))
+
 
+def dfs_search_all(graph, start, limits=None):
+    return _search(graph, _Stack(start), False, limits)
 
-def dfs_search_all(graph, start):
-    vertices = []
-    visited, stack = set(), [start]
+
+def best_first_search_first(graph, start, limits=None, heuristic=None):
+    """Expands the vertex with the lowest ``heuristic`` (default: ``graph.heuristic``) first."""
+    return _first(_search(graph, _PriorityQueue(start, heuristic or graph.heuristic), True, limits))
+
+
+def best_first_search_all(graph, start, limits=None, heuristic=None):
+    return _search(graph, _PriorityQueue(start, heuristic or graph.heuristic), False, limits)
+
+
+def _depth_limited(graph, start, depth, first, budget):
+    """
+    Depth-first search up to ``depth`` expansions from ``start``. Returns
+    the goals and whether the depth bound cut off any vertex. A vertex is
+    expanded again if it is reached on a shorter path than before.
+    """
+    found, cut_off = [], False
+    visited = {}
+    stack = [(start, 0)]
     while stack:
-        vertex = stack.pop()
-        if graph.is_goal(vertex):
-            vertices.append(vertex)
-        if vertex not in visited:
-            visited.add(vertex)
-            stack.extend(graph.successors(vertex) - visited)
-    return vertices
+        vertex, d = stack.pop()
+        if graph.is_goal(vertex) and vertex not in visited:
+            found.append(vertex)
+            if first:
+                return found, cut_off
+        if visited.get(vertex, depth + 1) <= d:
+            continue
+        visited[vertex] = d
+        if d == depth:
+            cut_off = True
+            continue
+        for successor in graph.successors(vertex):
+            stack.append((successor, d + 1))
+        budget.expand(len(stack), found)
+    return found, cut_off
+
+
+def _iterative_deepening(graph, start, first, limits):
+    stats = getattr(graph, 'stats', None)
+    budget = _Budget(limits, stats)
+    depth = 0
+    with timed(stats, 'search'):
+        while True:
+            found, cut_off = _depth_limited(graph, start, depth, first, budget)
+            if (first and found) or not cut_off:
+                return found
+            depth += 1
+
+
+def iddfs_search_first(graph, start, limits=None):
+    """
+    Iterative deepening: depth-first searches with a growing depth bound.
+    Finds a shallowest goal with the memory of a depth-first search.
+    """
+    return _first(_iterative_deepening(graph, start, True, limits))
+
+
+def iddfs_search_all(graph, start, limits=None):
+    """All goals, from the first iteration whose depth bound reaches the whole search space."""
+    return _iterative_deepening(graph, start, False, limits)
@@ -0,0 +1,108 @@
+from .shared import Rule
+
+
+class _TrieNode:
+    __slots__ = ('children', 'categories')
+
+    def __init__(self):
+        self.children = {}
+        self.categories = set()
+
+
+class Lexicon:
+    """
+    Lexicon indexed by word instead of by category. Looking up a token
+    takes one dict access whatever the size of the vocabulary, and all
+    categories of a position are found at once.
+
+    Entries can span several tokens ('NP -> New York'); these are kept in a
+    trie over the tokens. ``normalize`` (e.g. ``str.casefold``) is applied
+    to the words of the entries and to the tokens before lookup.
+
+    Membership, iteration and ``lexicon[category]`` work on categories as
+    with the plain dicts returned by ``read_lexicon``.
+    """
+
+    def __init__(self, entries=None, normalize=None):
+        self.normalize = normalize
+        self.words = {}
+        self.index = {}
+        self.trie = _TrieNode()
+        self.max_length = 1
+        for category, words in (entries or {}).items():
+            for word in words:
+                self.add(category, word)
+
+    @staticmethod
+    def from_file(path, normalize=None):
+        """Reads 'category -> word ...' lines; every word of the right-hand side is part of the entry."""
+        lexicon = Lexicon(normalize=normalize)
+        with open(path, 'r') as fin:
+            for line in fin:
+                if line.strip():
+                    rule = Rule.from_str(line)
+                    lexicon.add(rule.lhs, rule.rhs)
+        return lexicon
+
+    def add(self, category, words):
+        """Adds an entry; ``words`` is a single token or a sequence of tokens."""
+        if isinstance(words, str):
+            words = (words,)
+        self.words.setdefault(category, []).append(words[0] if len(words) == 1 else words)
+        words = tuple(self._normalize(word) for word in words)
+        if len(words) == 1:
+            self.index.setdefault(words[0], set()).add(category)
+        self.max_length = max(self.max_length, len(words))
+        node = self.trie
+        for word in words:
+            node = node.children.setdefault(word, _TrieNode())
+        node.categories.add(category)
+
+    def _normalize(self, token):
+        return self.normalize(token) if self.normalize else token
+
+    def categories(self, token):
+        """Categories of the single-token entries for ``token``."""
+        return self.index.get(self._normalize(token), set())
+
+    def matches(self, tokens, i):
+        """Maps the categories of all entries starting at ``tokens[i]`` to the positions where they end."""
+        if i >= len(tokens):
+            return {}
+        if self.max_length == 1:
+            return {category: (i + 1,) for category in self.categories(tokens[i])}
+        matches = {}
+        node = self.trie
+        for end in range(i + 1, min(len(tokens), i + self.max_length) + 1):
+            node = node.children.get(self._normalize(tokens[end - 1]))
+            if node is None:
+                break
+            for category in node.categories:
+                matches.setdefault(category, []).append(end)
+        return matches
+
+    def continuations(self, tokens, i):
+        """Categories of the entries that start with ``tokens[i:]`` and are longer than it."""
+        node = self.trie
+        for token in tokens[i:]:
+            node = node.children.get(self._normalize(token))
+            if node is None:
+                return set()
+        categories, agenda = set(), list(node.children.values())
+        while agenda:
+            node = agenda.pop()
+            categories.update(node.categories)
+            agenda.extend(node.children.values())
+        return categories
+
+    def __contains__(self, category):
+        return category in self.words
+
+    def __iter__(self):
+        return iter(self.words)
+
+    def __len__(self):
+        return len(self.words)
+
+    def __getitem__(self, category):
+        return self.words[category]
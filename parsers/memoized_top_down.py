@@ -0,0 +1,211 @@
+from .top_down import UniqueTopDownConfig
+
+
+class MemoizedTopDown:
+    """
+    Top-down recognizer memoizing, for every (symbol, position), the set of
+    positions where a derivation of the symbol can end. Left-recursive
+    calls read the current approximation from the memo table and the whole
+    computation is repeated until no entry grows any more (a least fixed
+    point), so left recursion and cycles terminate and the run time stays
+    polynomial in the input length.
+    """
+
+    def __init__(self, grammar, tokens):
+        self.grammar = grammar
+        self.tokens = tokens
+        self.memo = {}
+        self.visited = None
+        self.changed = False
+
+    def recognize(self, symbol):
+        if symbol not in self.grammar:
+            return self.tokens == [symbol]
+        while True:
+            self.visited = {(symbol, 0)}
+            self.changed = False
+            _run(self._ends(symbol, 0), self._call)
+            if not self.changed:
+                break
+        return len(self.tokens) in self.memo[symbol, 0]
+
+    def ends(self, symbol, i):
+        """The positions where a derivation of ``symbol`` from ``i`` ends, as far as computed."""
+        if symbol not in self.grammar:
+            if i < len(self.tokens) and self.tokens[i] == symbol:
+                return {i + 1}
+            return set()
+        return self.memo.get((symbol, i), set())
+
+    def sequence_ends(self, rhs, i):
+        """Returns, for each prefix of ``rhs``, the positions where it can end."""
+        positions = [{i}]
+        for symbol in rhs:
+            ends = set()
+            for position in positions[-1]:
+                ends.update(self.ends(symbol, position))
+            positions.append(ends)
+        return positions
+
+    # One pass of the fixed point is a depth-first traversal of the
+    # (symbol, position) keys. Each key is a generator that yields the keys
+    # it needs and is sent their ends, and _run keeps the generators on an
+    # explicit stack, so deep derivations do not hit the recursion limit.
+
+    def _call(self, key):
+        if key in self.visited:
+            return None, self.memo[key]
+        self.visited.add(key)
+        return self._ends(*key), None
+
+    def _ends(self, symbol, i):
+        ends = self.memo.setdefault((symbol, i), set())
+        for rule in self.grammar[symbol]:
+            positions = [{i}]
+            for child in rule.rhs:
+                child_ends = set()
+                for position in positions[-1]:
+                    if child in self.grammar:
+                        child_ends.update((yield child, position))
+                    else:
+                        child_ends.update(self.ends(child, position))
+                positions.append(child_ends)
+            new_ends = positions[-1] - ends
+            if new_ends:
+                ends.update(new_ends)
+                self.changed = True
+        return ends
+
+    def derivations(self, symbol, i, j):
+        """
+        Yields leftmost derivations (lists of rules) of ``symbol`` over
+        ``tokens[i:j]``. A nonterminal does not derive the same span twice on
+        one path, which leaves out derivations that only go around a cycle.
+
+        The derivation is built in place with a trail of choice points that
+        are retried on backtracking, like ``iter_derivations`` in
+        ``parsers.earley.utils``.
+        """
+        rules, goals = [], [(symbol, i, j, frozenset())]
+        trail = []  # choice points: [goal, options, chosen index, len(rules)]
+        while True:
+            while goals:
+                goal = goals.pop()
+                options = self._options(*goal)
+                if not options:
+                    goals.append(goal)
+                    break
+                trail.append([goal, options, 0, len(rules)])
+                self._apply(goal, options[0], rules, goals)
+            else:
+                yield list(rules)
+            while trail:
+                choice = trail[-1]
+                goal, options, k, num_rules = choice
+                del rules[num_rules:]
+                del goals[len(goals) - _goals(options[k]):]
+                if k + 1 < len(options):
+                    choice[2] = k + 1
+                    self._apply(goal, options[k + 1], rules, goals)
+                    break
+                trail.pop()
+                goals.append(goal)
+            else:
+                return
+
+    def _options(self, symbol, i, j, path):
+        """The ``(rule, splits)`` pairs that derive ``tokens[i:j]`` from ``symbol``, or ``[None]`` for a terminal."""
+        if symbol not in self.grammar:
+            return [None]
+        if (symbol, i, j) in path or j not in self.memo.get((symbol, i), ()):
+            return []
+        options = []
+        for rule in self.grammar[symbol]:
+            positions = self.sequence_ends(rule.rhs, i)
+            options.extend((rule, splits) for splits in self._splits(rule.rhs, positions, j))
+        return options
+
+    def _apply(self, goal, option, rules, goals):
+        if option is None:
+            return
+        symbol, i, j, path = goal
+        rule, splits = option
+        rules.append(rule)
+        # Only spans equal to the goal's can repeat it below, so the path
+        # keeps just the keys of that span.
+        path = path | {(symbol, i, j)}
+        for k in reversed(range(len(rule.rhs))):
+            start, end = splits[k], splits[k + 1]
+            goals.append((rule.rhs[k], start, end, path if (start, end) == (i, j) else frozenset()))
+
+    def _splits(self, rhs, positions, j):
+        if j not in positions[len(rhs)]:
+            return
+        if not rhs:
+            yield [j]
+            return
+        for split in sorted(positions[len(rhs) - 1]):
+            if j in self.ends(rhs[-1], split):
+                for splits in self._splits(rhs[:-1], positions, split):
+                    yield splits + [j]
+
+
+def _goals(option):
+    return 0 if option is None else len(option[0].rhs)
+
+
+def _run(generator, call):
+    """
+    Runs ``generator`` and the generators it calls without recursion.
+    A generator yields the arguments of a call; ``call`` returns a new
+    generator to run first or the result to send back right away.
+    """
+    stack, value = [generator], None
+    while stack:
+        try:
+            args = stack[-1].send(value)
+        except StopIteration as stop:
+            stack.pop()
+            value = stop.value
+            continue
+        callee, value = call(args)
+        if callee is not None:
+            stack.append(callee)
+
+
+def memo_search_first(graph, start):
+    """
+    Drop-in replacement for the search functions in ``graph_search`` that
+    parses with ``MemoizedTopDown`` instead of exploring configurations.
+    """
+    for config in _memo_search(graph, start):
+        return config
+    return None
+
+
+def memo_search_all(graph, start):
+    return list(_memo_search(graph, start))
+
+
+def _memo_search(graph, start):
+    parser = MemoizedTopDown(graph.grammar, graph.input)
+    symbol = start.prediction
+    if not parser.recognize(symbol):
+        return
+    for rules in parser.derivations(symbol, 0, len(graph.input)):
+        yield _replay(graph, start, rules)
+
+
+def _replay(graph, start, rules):
+    """Rebuilds the configurations the naive parser passes through for a leftmost derivation."""
+    config = UniqueTopDownConfig(start.ind, start.stack, None, None)
+    for rule in rules:
+        config = _match(graph, config)
+        config = UniqueTopDownConfig(config.ind, config.stack.tail.push(rule.rhs), rule, config)
+    return _match(graph, config)
+
+
+def _match(graph, config):
+    while config.stack and config.prediction not in graph.grammar:
+        config = UniqueTopDownConfig(config.ind + 1, config.stack.tail, None, config)
+    return config
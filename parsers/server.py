@@ -0,0 +1,328 @@
+"""
+Asyncio parse service speaking newline-delimited JSON over TCP or a Unix
+socket.
+
+A request is ``{"id": ..., "op": "parse" | "recognize", "grammar": name,
+"tokens": [...], "deadline": seconds}`` (``deadline`` is optional, a
+non-negative number); a
+request ``{"op": "cancel", "id": ...}`` cancels an earlier one of the same
+connection. Every request gets one response, ``{"id": ..., "ok": true,
+"result": {...}}`` or ``{"id": ..., "ok": false, "error": message}``.
+A parse result is ``{"accepted": ..., "derivations": n}``, where ``n`` is
+``null`` if a cyclic grammar gives infinitely many derivations.
+
+The grammars are loaded and compiled once in each worker process, which
+answers with the batch engines of ``parsers.batch``. The workers are
+plain processes on pipes rather than a ``ProcessPoolExecutor``, so that a
+worker stuck on a pathological sentence can be killed when its deadline
+passes or its request is cancelled; a fresh one takes its place.
+
+Requests wait in a bounded queue. When it is full, the server stops
+reading from the connection, which pushes back on the client through
+TCP. Requests of at most ``batch_tokens`` tokens are sent to a worker in
+batches of up to ``batch_size``. If a batch has to be aborted, its
+requests that are still wanted are run again one by one.
+
+Run with 'python -m parsers.server --grammar name=grammar.txt[:lexicon.txt]
+--port 8765' (or ``--unix PATH``) from the project's root.
+"""
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import math
+import multiprocessing
+import os
+import time
+
+from parsers.batch import Parser, Recognizer
+from parsers.earley import cache as grammar_cache
+from parsers.earley.utils import count_derivations
+from parsers.shared import read_grammar, read_lexicon
+
+
+def _engines(grammars, cache_dir):
+    engines = {}
+    for name, (grammar_path, lexicon_path) in grammars.items():
+        parser = Parser(grammar_cache.load(grammar_path, lexicon_path, cache_dir=cache_dir))
+        recognizer = (Recognizer(read_grammar(grammar_path), read_lexicon(lexicon_path)) if lexicon_path
+                      else lambda tokens, parser=parser: parser(tokens) is not None)
+        engines[name] = {'parse': parser, 'recognize': recognizer}
+    return engines
+
+
+def _answer(engines, op, grammar, tokens):
+    try:
+        result = engines[grammar][op](tokens)
+    except Exception as error:
+        return False, '{}: {}'.format(type(error).__name__, error)
+    if op == 'parse':
+        derivations = count_derivations(result, infinite=True) if result is not None else 0
+        return True, {'accepted': result is not None, 'derivations': None if math.isinf(derivations) else derivations}
+    return True, {'accepted': bool(result)}
+
+
+def _serve(conn, grammars, cache_dir):
+    engines = _engines(grammars, cache_dir)
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            return
+        if batch is None:
+            return
+        conn.send([_answer(engines, *request) for request in batch])
+
+
+def _is_deadline(deadline):
+    return deadline is None or (isinstance(deadline, (int, float)) and not isinstance(deadline, bool)
+                                and deadline >= 0)
+
+
+class _Worker:
+    def __init__(self, grammars, cache_dir):
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, grammars, cache_dir), daemon=True)
+        self.process.start()
+        child.close()
+        self.thread = concurrent.futures.ThreadPoolExecutor(1)
+
+    async def run(self, batch):
+        # The exchange blocks on the pipe, so it runs on this worker's own
+        # thread; the event loop keeps serving clients and deadlines, and
+        # kill() ends it with an EOFError that nobody awaits any more.
+        return await asyncio.get_running_loop().run_in_executor(self.thread, self._exchange, batch)
+
+    def _exchange(self, batch):
+        self.conn.send(batch)
+        return self.conn.recv()
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.thread.shutdown()
+        self.conn.close()
+
+    def stop(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.thread.shutdown()
+        self.conn.close()
+
+
+class _Request:
+    def __init__(self, message, send, deadline):
+        self.id = message.get('id')
+        self.op = message['op']
+        self.grammar = message['grammar']
+        self.tokens = list(message['tokens'])
+        self.send = send
+        self.deadline = None if deadline is None else time.monotonic() + deadline
+        self.done = False
+        self.cancelled = False
+        self.abort = None  # future of the batch running this request
+
+    def expired(self):
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def respond(self, ok, value):
+        if not self.done:
+            self.done = True
+            self.send({'id': self.id, 'ok': ok, 'result' if ok else 'error': value})
+
+    def cancel(self):
+        self.cancelled = True
+        self.respond(False, 'cancelled')
+
+
+class ParseServer:
+    """
+    ``grammars`` maps names to ``(grammar_path, lexicon_path)`` pairs
+    (``lexicon_path`` may be ``None``). The compiled grammars are written
+    to the cache of ``parsers.earley.cache`` (next to the grammars or in
+    ``cache_dir``) up front, so that the workers only map them. ``deadline``
+    is the default for requests without one, in seconds.
+    """
+
+    def __init__(self, grammars, workers=None, queue_size=64, batch_size=8, batch_tokens=16, deadline=None,
+                 cache_dir=None):
+        self.grammars = dict(grammars)
+        self.cache_dir = cache_dir
+        for grammar_path, lexicon_path in self.grammars.values():
+            grammar_cache.load(grammar_path, lexicon_path, cache_dir=cache_dir)
+        self.workers = [_Worker(self.grammars, cache_dir) for _ in range(workers or os.cpu_count() or 1)]
+        self.queue = None
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.batch_tokens = batch_tokens
+        self.deadline = deadline
+        self.server = None
+        self.dispatchers = []
+        self.connections = set()
+
+    async def start(self, host='127.0.0.1', port=0, path=None):
+        """Listens on ``path`` (a Unix socket) if given, otherwise on ``host:port``; returns the address."""
+        self.queue = asyncio.Queue(self.queue_size)
+        self.dispatchers = [asyncio.ensure_future(self._dispatch(k)) for k in range(len(self.workers))]
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._connection, path)
+            return path
+        self.server = await asyncio.start_server(self._connection, host, port)
+        return self.server.sockets[0].getsockname()[:2]
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        for task in self.dispatchers + list(self.connections):
+            task.cancel()
+        await asyncio.gather(*self.dispatchers, *self.connections, return_exceptions=True)
+        for worker in self.workers:
+            worker.stop()
+
+    async def _connection(self, reader, writer):
+        self.connections.add(asyncio.current_task())
+        requests = {}
+
+        def send(message):
+            request = requests.get(message['id'])
+            if request is not None and request.done:
+                del requests[message['id']]
+            if not writer.is_closing():
+                writer.write(json.dumps(message).encode() + b'\n')
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    message = json.loads(line)
+                    op = message['op']
+                except (ValueError, KeyError, TypeError):
+                    send({'id': None, 'ok': False, 'error': 'malformed request'})
+                    continue
+                if op == 'cancel':
+                    request = requests.pop(message.get('id'), None)
+                    if request is not None:
+                        self._cancel(request)
+                    continue
+                deadline = message.get('deadline', self.deadline)
+                if op not in ('parse', 'recognize') or message.get('grammar') not in self.grammars \
+                        or not isinstance(message.get('tokens'), list) or not _is_deadline(deadline):
+                    send({'id': message.get('id'), 'ok': False, 'error': 'bad request'})
+                    continue
+                request = _Request(message, send, deadline)
+                requests[request.id] = request
+                await self.queue.put(request)
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass  # the client went away or the server is closing
+        finally:
+            for request in list(requests.values()):
+                if not request.done:
+                    self._cancel(request)
+            writer.close()
+            self.connections.discard(asyncio.current_task())
+
+    def _cancel(self, request):
+        request.cancel()
+        if request.abort is not None and not request.abort.done():
+            request.abort.set_result(None)
+
+    async def _dispatch(self, k):
+        carry = None
+        while True:
+            request = carry or await self.queue.get()
+            carry = None
+            batch = [request]
+            if len(request.tokens) <= self.batch_tokens:
+                while len(batch) < self.batch_size and not self.queue.empty():
+                    request = self.queue.get_nowait()
+                    if len(request.tokens) > self.batch_tokens:
+                        carry = request
+                        break
+                    batch.append(request)
+            await self._execute(k, batch)
+
+    async def _execute(self, k, batch):
+        live = []
+        for request in batch:
+            if request.expired():
+                request.respond(False, 'deadline exceeded')
+            elif not request.done:
+                live.append(request)
+        if not live:
+            return
+        loop = asyncio.get_running_loop()
+        deadlines = [request.deadline for request in live if request.deadline is not None]
+        timeout = max(0, min(deadlines) - time.monotonic()) if deadlines else None
+        task = asyncio.ensure_future(self.workers[k].run([(r.op, r.grammar, r.tokens) for r in live]))
+        abort = loop.create_future()
+        for request in live:
+            request.abort = abort if len(live) == 1 else None
+        done, _ = await asyncio.wait({task, abort}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        if task in done and not task.exception():
+            for request, (ok, value) in zip(live, task.result()):
+                request.respond(ok, value)
+            return
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        self.workers[k].kill()
+        self.workers[k] = _Worker(self.grammars, self.cache_dir)
+        timed_out = not done
+        for request in live:
+            request.abort = None
+            if request.expired() or (timed_out and request.deadline == min(deadlines)):
+                request.respond(False, 'deadline exceeded')
+        if len(live) > 1:
+            for request in live:
+                await self._execute(k, [request])
+        else:
+            live[0].respond(False, 'worker failed')
+
+
+def _grammar_spec(spec):
+    name, _, paths = spec.partition('=')
+    grammar_path, _, lexicon_path = paths.partition(':')
+    return name, (grammar_path, lexicon_path or None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve parse requests as newline-delimited JSON.')
+    parser.add_argument('--grammar', type=_grammar_spec, action='append', required=True,
+                        help='NAME=GRAMMAR[:LEXICON], may be repeated')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--unix', help='listen on a Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--queue-size', type=int, default=64)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--batch-tokens', type=int, default=16)
+    parser.add_argument('--deadline', type=float, default=None, help='default deadline in seconds')
+    parser.add_argument('--cache-dir', default=None, help='directory for the compiled grammars')
+    args = parser.parse_args(argv)
+
+    async def run():
+        server = ParseServer(dict(args.grammar), args.workers, args.queue_size, args.batch_size,
+                             args.batch_tokens, args.deadline, args.cache_dir)
+        address = await server.start(args.host, args.port, args.unix)
+        print('listening on {}'.format(address), flush=True)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
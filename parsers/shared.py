@@ -2,25 +2,42 @@ INDENT = ' ' * 4
 
 
 class Rule:
-    def __init__(self, lhs, rhs):
+    __slots__ = ('lhs', 'rhs', 'prob', '_hash')
+
+    def __init__(self, lhs, rhs, prob=1.0):
         self.lhs = lhs
         self.rhs = rhs
+        self.prob = prob
+        self._hash = hash((lhs, rhs))
 
     def __repr__(self):
         return '{} -> {}'.format(self.lhs, ' '.join(self.rhs))
 
     def __hash__(self):
-        return hash((self.lhs, self.rhs))
+        return self._hash
 
     def __eq__(self, other):
         return (type(self) == type(other)
+                and self._hash == other._hash
                 and self.lhs == other.lhs
                 and self.rhs == other.rhs)
 
     @staticmethod
     def from_str(rule_str):
+        """
+        Parses 'lhs -> rhs', optionally followed by a probability as in
+        'S -> NP VP [0.9]'. Other bracketed symbols ('X -> [ Y ]') are kept.
+        """
         fields = rule_str.split('->')
-        return Rule(fields[0].strip(), tuple(fields[1].strip().split()))
+        rhs = fields[1].split()
+        prob = 1.0
+        if rhs and rhs[-1].startswith('[') and rhs[-1].endswith(']'):
+            try:
+                prob = float(rhs[-1][1:-1])
+                rhs.pop()
+            except ValueError:
+                pass
+        return Rule(fields[0].strip(), tuple(rhs), prob)
 
 
 def read_lexicon(path):
@@ -0,0 +1,174 @@
+"""
+Opt-in statistics and profiling of parses.
+
+Like a tracer (see ``parsers.tracing``), a ``ParseStats`` is handed to a
+parser or search, which only then replaces its operations with counting
+wrappers; without one nothing is counted or timed. The parse fills the
+object in place, so the caller reads it next to the parse result.
+
+``profiled`` and ``traced_memory`` wrap any code in a cProfile or
+tracemalloc capture.
+"""
+import collections
+import contextlib
+import cProfile
+import io
+import pstats
+import sys
+import time
+import tracemalloc
+from functools import wraps
+
+
+class ParseStats:
+    """
+    Counters of one parse:
+
+    - ``counts``: calls or results per operation (e.g. 'predict', 'scan',
+      'complete', 'enqueue'), 'duplicate' for items rejected because they
+      were already in their Earley set, 'expand' for expanded search
+      vertices,
+    - ``columns``: items added to each Earley set,
+    - ``rules``: items (or predicted configurations) per grammar rule,
+    - ``nodes`` and ``families`` of the SPPF,
+    - ``peak_frontier``: most items or vertices waiting at once,
+    - ``timings``: seconds per phase or operation.
+    """
+
+    def __init__(self):
+        self.counts = collections.Counter()
+        self.columns = []
+        self.rules = collections.Counter()
+        self.nodes = 0
+        self.families = 0
+        self.peak_frontier = 0
+        self.timings = collections.defaultdict(float)
+
+    def count(self, op, n=1):
+        self.counts[op] += n
+
+    def add_item(self, column, rule):
+        """Records an item added to Earley set ``column`` for ``rule``."""
+        while len(self.columns) <= column:
+            self.columns.append(0)
+        self.columns[column] += 1
+        self.rules[rule] += 1
+        self.counts['enqueue'] += 1
+
+    def frontier(self, size):
+        if size > self.peak_frontier:
+            self.peak_frontier = size
+
+    def forest(self, nodes):
+        """Records the size of an SPPF given as an iterable of its nodes."""
+        self.nodes = self.families = 0
+        for node in nodes:
+            self.nodes += 1
+            self.families += len(node.families)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """Adds the time spent in the ``with`` block to ``timings[name]``."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def top_rules(self, n=10):
+        """The ``n`` rules with the most items, most first."""
+        return self.rules.most_common(n)
+
+    def as_dict(self):
+        return {'counts': dict(self.counts), 'columns': list(self.columns),
+                'rules': {str(rule): n for rule, n in self.rules.items()}, 'nodes': self.nodes,
+                'families': self.families, 'peak_frontier': self.peak_frontier, 'timings': dict(self.timings)}
+
+    def report(self, rules=10):
+        lines = ['{}: {}'.format(op, n) for op, n in sorted(self.counts.items())]
+        if self.columns:
+            lines.append('items per column: {}'.format(' '.join(str(n) for n in self.columns)))
+        if self.nodes:
+            lines.append('SPPF: {} nodes, {} families'.format(self.nodes, self.families))
+        if self.peak_frontier:
+            lines.append('peak frontier: {}'.format(self.peak_frontier))
+        for name, seconds in sorted(self.timings.items()):
+            lines.append('time {}: {:.6f}s'.format(name, seconds))
+        if self.rules:
+            lines.append('most items by rule:')
+            lines.extend('  {:8d}  {}'.format(n, rule) for rule, n in self.top_rules(rules))
+        return '\n'.join(lines)
+
+    def __repr__(self):
+        return 'ParseStats({})'.format(self.as_dict())
+
+
+def counted(method, op, stats, rule=None):
+    """
+    Wraps a single-argument method so that its calls are counted as
+    ``op`` and timed. With ``rule``, a function of the returned successors,
+    also counts the successors per rule.
+    """
+    @wraps(method)
+    def wrapper(arg):
+        start = time.perf_counter()
+        rval = method(arg)
+        stats.timings[op] += time.perf_counter() - start
+        stats.counts[op] += 1
+        if rule is not None:
+            for successor in rval:
+                stats.rules[rule(successor)] += 1
+        return rval
+    return wrapper
+
+
+def timed(stats, name):
+    """``stats.phase(name)``, or a context doing nothing without ``stats``."""
+    if stats is None:
+        return contextlib.nullcontext()
+    return stats.phase(name)
+
+
+@contextlib.contextmanager
+def profiled(path=None, sort='cumulative', limit=20, stream=None):
+    """
+    Runs the ``with`` block under cProfile. The profile is written to
+    ``path`` if given (for ``pstats`` or snakeviz), otherwise its ``limit``
+    most expensive functions are printed to ``stream`` (default stderr).
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path is not None:
+            profiler.dump_stats(path)
+        else:
+            text = io.StringIO()
+            pstats.Stats(profiler, stream=text).sort_stats(sort).print_stats(limit)
+            (stream or sys.stderr).write(text.getvalue())
+
+
+@contextlib.contextmanager
+def traced_memory(limit=10, stream=None):
+    """
+    Runs the ``with`` block under tracemalloc and prints the peak memory
+    and the ``limit`` source lines that allocated most of what was still
+    alive at the end to ``stream`` (default stderr).
+    """
+    started = not tracemalloc.is_tracing()
+    if started:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    try:
+        yield
+    finally:
+        snapshot = tracemalloc.take_snapshot()
+        current, peak = tracemalloc.get_traced_memory()
+        if started:
+            tracemalloc.stop()
+        stream = stream or sys.stderr
+        stream.write('memory: {} bytes at the end, {} bytes at the peak\n'.format(current, peak))
+        for statistic in snapshot.statistics('lineno')[:limit]:
+            stream.write('{}\n'.format(statistic))
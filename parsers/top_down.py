@@ -1,60 +1,170 @@
 import logging
-from functools import wraps
 
-from .graph_search import Graph
-from .shared import concat_tuples, read_grammar, INDENT
+from .grammar_analysis import min_yields
+from .grammar_transform import original_derivation, transform_for_top_down
+from .graph_search import Graph, SearchLimitReached
+from .shared import read_grammar
+from .stats import counted
+from .tracing import trace, logging_tracer
+
+
+class PredictionStack:
+    """
+    Immutable stack of predicted symbols as a linked list. Pushing a rule's
+    right-hand side shares the rest of the stack with the parent
+    configuration, so a configuration costs memory proportional to the
+    rule, not to the whole stack. The hash is computed incrementally.
+
+    ``weight`` is the sum of the weights of the symbols on the stack, used
+    for the minimal number of tokens the stack still has to match.
+    """
+    __slots__ = ('head', 'tail', 'size', 'weight', '_hash')
+
+    def __init__(self, head=None, tail=None, weight=0):
+        self.head = head
+        self.tail = tail
+        self.size = 0 if tail is None else tail.size + 1
+        self.weight = weight if tail is None else tail.weight + weight
+        self._hash = hash((head, None if tail is None else tail._hash))
+
+    @staticmethod
+    def of(symbols, weights=None):
+        return EMPTY.push(symbols, weights)
+
+    def push(self, symbols, weights=None):
+        """
+        Returns the stack with ``symbols`` on top, ``symbols[0]`` topmost.
+        With ``weights``, a symbol weighs ``weights[symbol]``, or 1 if it
+        has no entry; without, everything weighs 0.
+        """
+        stack = self
+        for symbol in reversed(symbols):
+            weight = 0 if weights is None else weights.get(symbol, 1)
+            stack = PredictionStack(symbol, stack, weight)
+        return stack
+
+    def __iter__(self):
+        stack = self
+        while stack.size:
+            yield stack.head
+            stack = stack.tail
+
+    def __len__(self):
+        return self.size
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if type(self) != type(other):
+            return False
+        a, b = self, other
+        while a is not b:
+            if a._hash != b._hash or a.size != b.size or a.head != b.head:
+                return False
+            a, b = a.tail, b.tail
+        return True
+
+    def __repr__(self):
+        return ' '.join(self)
+
+
+EMPTY = PredictionStack()
+
+
+def _stack(predictions):
+    return predictions if isinstance(predictions, PredictionStack) else PredictionStack.of(predictions)
 
 
 class UniqueTopDownConfig:
+    __slots__ = ('ind', 'stack', 'rule', 'parent')
+
     def __init__(self, ind, predictions, rule, parent):
         self.ind = ind
-        self.predictions = predictions
+        self.stack = _stack(predictions)
         self.rule = rule
         self.parent = parent
 
     def __repr__(self):
-        return '{}: {}'.format(self.ind, ' '.join(self.predictions))
+        return '{}: {}'.format(self.ind, self.stack)
+
+    @property
+    def predictions(self):
+        return tuple(self.stack)
 
     @property
     def prediction(self):
-        if self.predictions:
-            return self.predictions[0]
-        return None
+        return self.stack.head
 
     @property
     def derivation(self):
+        """The leftmost derivation, in rules of the original grammar if the parser transformed it."""
         rules = []
         config = self
         while config:
             if config.rule:
-                rules.insert(0, config.rule)
+                rules.append(config.rule)
             config = config.parent
-        return rules
+        rules.reverse()
+        return original_derivation(rules)
+
 
+def _ind(config):
+    return config.ind
 
-def log(func):
-    @wraps(func)
-    def wrapper(s, state):
-        logging.info('{}({})'.format(func.__name__.strip('_'), state))
-        rval = func(s, state)
-        logging.info(INDENT + 'rval: {}'.format(rval))
-        return rval
 
-    return wrapper
+def _init(parser, grammar, tracer, transform, prune, stats):
+    parser.grammar = transform_for_top_down(grammar) if transform else grammar
+    parser.min_yields = min_yields(parser.grammar) if prune else None
+    parser.input = None
+    parser.stats = stats
+    _trace(parser, tracer)
+    _count(parser, stats)
+
+
+def _fits(parser, config):
+    """Whether the predicted symbols can still match the rest of the input (always without pruning)."""
+    return config.stack.weight <= len(parser.input) - config.ind
+
+
+def _trace(parser, tracer):
+    if tracer:
+        parser._match = trace(parser._match, 'match', tracer, _ind, result=True)
+        parser._predict = trace(parser._predict, 'predict', tracer, _ind, result=True)
+
+
+def _rule(config):
+    return config.rule
+
+
+def _count(parser, stats):
+    if stats:
+        parser._match = counted(parser._match, 'match', stats)
+        parser._predict = counted(parser._predict, 'predict', stats, rule=_rule)
 
 
 class NaiveTopDownParser(Graph):
     """
     Naive top-down parser implementation.
+
+    With ``transform=True`` the grammar is first rid of empty rules, cycles
+    and left recursion (see ``grammar_transform``), so every search
+    terminates; derivations are still reported in the original rules.
+    With ``prune=True`` configurations whose predictions need more tokens
+    than are left are not generated.
+
+    With a ``parsers.stats.ParseStats`` as ``stats`` the parser counts and
+    times its matches and predictions, counts the predicted configurations
+    per rule, and the searches record the vertices they expand, the peak
+    size of their frontier and their time (see ``graph_search.Graph``).
     """
 
-    def __init__(self, grammar):
-        self.grammar = grammar
-        self.input = None
+    def __init__(self, grammar, tracer=None, transform=False, prune=True, stats=None):
+        _init(self, grammar, tracer, transform, prune, stats)
 
     def parse(self, input, search):
         self.input = input
-        start_config = UniqueTopDownConfig(0, ('S',), None, None)
+        start_config = UniqueTopDownConfig(0, PredictionStack.of(('S',), self.min_yields), None, None)
         return search(self, start_config)
 
     def successors(self, config):
@@ -63,31 +173,45 @@ class NaiveTopDownParser(Graph):
         return self._match(config)
 
     def is_goal(self, config):
-        return not config.prediction and len(self.input) == config.ind
+        return not config.stack and len(self.input) == config.ind
+
+    def heuristic(self, config):
+        return _heuristic(self, config)
 
-    @log
     def _match(self, config):
         if config.ind < len(self.input) and config.prediction == self.input[config.ind]:
-            return {UniqueTopDownConfig(config.ind + 1, config.predictions[1:], None, config)}
+            return {UniqueTopDownConfig(config.ind + 1, config.stack.tail, None, config)}
         return set()
 
-    @log
     def _predict(self, config):
         configs = []
         for rule in self.grammar[config.prediction]:
-            configs.append(
-                UniqueTopDownConfig(config.ind, concat_tuples(rule.rhs, config.predictions[1:]), rule, config))
+            successor = UniqueTopDownConfig(config.ind, config.stack.tail.push(rule.rhs, self.min_yields), rule, config)
+            if _fits(self, successor):
+                configs.append(successor)
         return set(configs)
 
 
-def parse(tokens, grammar_path, search):
+def _heuristic(parser, config):
+    """Tokens left to read plus symbols left to expand or match; 0 exactly for goals."""
+    return len(parser.input) - config.ind + len(config.stack)
+
+
+def parse(tokens, grammar_path, search, stats=None):
     logging.info('\nTokens: ' + str(tokens))
     logging.info('Loading lexicon and grammar...')
     grammar = read_grammar(grammar_path)
     logging.info('\nRunning top-down parser...')
-    parser = NaiveTopDownParser(grammar)
-
-    configs = parser.parse(tokens, search)
+    parser = NaiveTopDownParser(grammar, tracer=logging_tracer(), transform=True, stats=stats)
+
+    try:
+        configs = parser.parse(tokens, search)
+    except SearchLimitReached as e:
+        logging.info('\nSearch stopped: {}'.format(e.reason))
+        configs = e.found
+        if not configs:
+            logging.info('\nNo derivation found so far.')
+            return
     if not configs:
         logging.info('\nString is not part of the language!')
         return
@@ -99,42 +223,48 @@ def parse(tokens, grammar_path, search):
 
 
 class TopDownConfig():
+    __slots__ = ('ind', 'stack', 'rule', '_hash')
+
     def __init__(self, ind, predictions, rule):
-        super().__init__()
         self.ind = ind
-        self.predictions = predictions
+        self.stack = _stack(predictions)
         self.rule = rule
+        self._hash = hash((ind, self.stack))
 
     def __repr__(self):
-        return '{}: {}'.format(self.ind, ' '.join(self.predictions))
+        return '{}: {}'.format(self.ind, self.stack)
 
     def __hash__(self):
-        return hash((self.ind, self.predictions))
+        return self._hash
 
     def __eq__(self, other):
         return (type(self) is type(other) and
+                self._hash == other._hash and
                 self.ind == other.ind and
-                self.predictions == other.predictions)
+                self.stack == other.stack)
+
+    @property
+    def predictions(self):
+        return tuple(self.stack)
 
     @property
     def prediction(self):
-        if self.predictions:
-            return self.predictions[0]
-        return None
+        return self.stack.head
 
 
 class TopDownParser(Graph):
     """
-    Naive top-down parser implementation.
+    Naive top-down parser implementation. Configurations do not remember
+    their derivation, equal ones are explored once. ``transform`` and
+    ``prune`` and ``stats`` as for ``NaiveTopDownParser``.
     """
 
-    def __init__(self, grammar):
-        self.grammar = grammar
-        self.input = None
+    def __init__(self, grammar, tracer=None, transform=False, prune=True, stats=None):
+        _init(self, grammar, tracer, transform, prune, stats)
 
     def parse(self, input, search):
         self.input = input
-        start_config = TopDownConfig(0, ('S',), None)
+        start_config = TopDownConfig(0, PredictionStack.of(('S',), self.min_yields), None)
         return search(self, start_config)
 
     def successors(self, config):
@@ -143,17 +273,20 @@ class TopDownParser(Graph):
         return self._match(config)
 
     def is_goal(self, config):
-        return not config.prediction and len(self.input) == config.ind
+        return not config.stack and len(self.input) == config.ind
+
+    def heuristic(self, config):
+        return _heuristic(self, config)
 
-    @log
     def _match(self, config):
         if config.ind < len(self.input) and config.prediction == self.input[config.ind]:
-            return {TopDownConfig(config.ind + 1, config.predictions[1:], None)}
+            return {TopDownConfig(config.ind + 1, config.stack.tail, None)}
         return set()
 
-    @log
     def _predict(self, config):
         configs = []
         for rule in self.grammar[config.prediction]:
-            configs.append(TopDownConfig(config.ind, concat_tuples(rule.rhs, config.predictions[1:]), rule))
+            successor = TopDownConfig(config.ind, config.stack.tail.push(rule.rhs, self.min_yields), rule)
+            if _fits(self, successor):
+                configs.append(successor)
         return set(configs)
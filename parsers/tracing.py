@@ -0,0 +1,86 @@
+"""
+Opt-in tracing of parser operations.
+
+Parsers take a ``tracer`` (any callable receiving an event dict) and, only
+if one is given, replace their operations with traced wrappers when they
+are constructed. Without a tracer nothing is formatted or called, so
+tracing costs nothing when it is off.
+
+Events have the keys ``op``, ``item`` (the string form of the item or
+configuration) and ``position``; operations that return successors also
+have ``result``.
+"""
+import json
+import logging
+from functools import wraps
+
+from .shared import INDENT
+
+
+def trace(method, op, tracer, position, result=False):
+    """Wraps a single-argument method so every call is reported to ``tracer``."""
+    if result:
+        @wraps(method)
+        def wrapper(arg):
+            event = {'op': op, 'item': str(arg), 'position': position(arg)}
+            rval = method(arg)
+            event['result'] = [str(successor) for successor in rval]
+            tracer(event)
+            return rval
+    else:
+        @wraps(method)
+        def wrapper(arg):
+            tracer({'op': op, 'item': str(arg), 'position': position(arg)})
+            return method(arg)
+    return wrapper
+
+
+class MemorySink:
+    """Collects events in a list."""
+
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, event):
+        self.events.append(event)
+
+
+class JsonlSink:
+    """Writes one JSON object per event to a file."""
+
+    def __init__(self, path):
+        self.file = open(path, 'w')
+
+    def __call__(self, event):
+        self.file.write(json.dumps(event))
+        self.file.write('\n')
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LoggingSink:
+    """Logs events as text, e.g. 'predict(S -> . NP VP [0, 0])'."""
+
+    def __init__(self, logger=None, indented=('enqueue',)):
+        self.logger = logger or logging.getLogger()
+        self.indented = indented
+
+    def __call__(self, event):
+        indent = INDENT if event['op'] in self.indented else ''
+        self.logger.info('{}{}({})'.format(indent, event['op'], event['item']))
+        if 'result' in event:
+            self.logger.info(INDENT + 'rval: {{{}}}'.format(', '.join(event['result'])))
+
+
+def logging_tracer():
+    """A ``LoggingSink`` if INFO messages are logged at all, otherwise ``None``."""
+    if logging.getLogger().isEnabledFor(logging.INFO):
+        return LoggingSink()
+    return None
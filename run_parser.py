@@ -1,8 +1,14 @@
 import argparse
+import contextlib
+import functools
 import logging
-from parsers.earley import recognize as earley
+import sys
+from parsers.batch import BatchParser, is_parsed
+from parsers.earley.earley_recognizer import recognize as earley
 from parsers.top_down import parse as top_down
 from parsers.graph_search import *
+from parsers.memoized_top_down import memo_search_first, memo_search_all
+from parsers.stats import ParseStats, profiled, traced_memory
 
 PARSER = {
     'earley': earley,
@@ -13,7 +19,13 @@ SEARCH = {
     'dfs_first': dfs_search_first,
     'dfs_all': dfs_search_all,
     'bfs_first': bfs_search_first,
-    'bfs_all': bfs_search_all
+    'bfs_all': bfs_search_all,
+    'best_first': best_first_search_first,
+    'best_all': best_first_search_all,
+    'iddfs_first': iddfs_search_first,
+    'iddfs_all': iddfs_search_all,
+    'memo_first': memo_search_first,
+    'memo_all': memo_search_all
 }
 
 
@@ -22,22 +34,82 @@ def run_parser(args):
         raise NotImplementedError('{} parser is not available!'.format(args.parser))
     if args.search and args.search not in SEARCH:
         raise NotImplementedError('{} search is not available!'.format(args.search))
+    if args.batch:
+        if args.stats:
+            raise NotImplementedError('statistics are not available in batch mode!')
+        run_batch(args)
+        return
+    stats = ParseStats() if args.stats else None
     tokens = args.sentence.split()
     if args.search:
-        PARSER[args.parser](tokens, args.grammar, SEARCH[args.search])
+        search = SEARCH[args.search]
+        limits = Limits(args.max_nodes, args.max_frontier, args.timeout)
+        if any(limit is not None for limit in vars(limits).values()):
+            if args.search.startswith('memo'):
+                raise NotImplementedError('search limits are not available for {}!'.format(args.search))
+            search = functools.partial(search, limits=limits)
+        PARSER[args.parser](tokens, args.grammar, search, stats=stats)
     elif args.lexicon:
-        PARSER[args.parser](tokens, args.grammar, args.lexicon)
+        PARSER[args.parser](tokens, args.grammar, args.lexicon, stats=stats)
+    if stats is not None:
+        logging.info('\nStatistics:\n' + stats.report())
+
+
+def run_batch(args):
+    if args.parser != 'earley':
+        raise NotImplementedError('batch mode is only available for the earley parser!')
+    batch_parser = BatchParser.from_files(args.grammar, args.lexicon, cache=args.cache, processes=args.processes,
+                                          chunksize=args.chunksize, postprocess=is_parsed)
+    fin = sys.stdin if args.batch == '-' else open(args.batch, 'r')
+    try:
+        sentences = (line.split() for line in fin)
+        for result in batch_parser.map(sentences):
+            print(result)
+    finally:
+        if fin is not sys.stdin:
+            fin.close()
 
 
 def main():
     logging.basicConfig(format='%(message)s', level=logging.INFO)
     arg_parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     arg_parser.add_argument('parser', help='parser that should be run (earley)')
-    arg_parser.add_argument('sentence', help='string of tokens separated by whitespace, e.g. "Peter likes hot coffee"')
+    arg_parser.add_argument('sentence', nargs='?',
+                            help='string of tokens separated by whitespace, e.g. "Peter likes hot coffee"')
     arg_parser.add_argument('--lexicon', help='path to lexicon file')
     arg_parser.add_argument('--grammar', help='path to grammar file')
     arg_parser.add_argument('--search', help='search for config parsers')
-    run_parser(arg_parser.parse_args())
+    arg_parser.add_argument('--max-nodes', type=int, help='stop the search after expanding this many configurations')
+    arg_parser.add_argument('--max-frontier', type=int,
+                            help='stop the search when more configurations than this wait to be expanded')
+    arg_parser.add_argument('--timeout', type=float, help='stop the search after this many seconds')
+    arg_parser.add_argument('--batch', help='file with one sentence per line ("-" for stdin), '
+                                            'prints one line per sentence')
+    arg_parser.add_argument('--processes', type=int, help='worker processes for batch mode (0 runs in-process)')
+    arg_parser.add_argument('--cache', nargs='?', const=True, default=False, metavar='DIR',
+                            help='reuse the compiled grammar from a cache file next to the grammar '
+                                 '(or in DIR) in batch mode without lexicon')
+    arg_parser.add_argument('--chunksize', type=int, default=64, help='sentences per batch job')
+    arg_parser.add_argument('--stats', action='store_true',
+                            help='report operation counts, items per Earley set and rule, and timings')
+    arg_parser.add_argument('--profile', nargs='?', const=True, default=False, metavar='FILE',
+                            help='run under cProfile, print the most expensive functions to stderr '
+                                 '(or write the profile to FILE)')
+    arg_parser.add_argument('--tracemalloc', action='store_true',
+                            help='print peak memory and the top allocating lines to stderr')
+    args = arg_parser.parse_args()
+    if args.sentence is None and args.batch is None:
+        arg_parser.error('a sentence or --batch is required')
+    if args.sentence is not None and args.batch is not None:
+        arg_parser.error('a sentence and --batch cannot be given together')
+    if args.batch:
+        logging.getLogger().setLevel(logging.WARNING)
+    with contextlib.ExitStack() as capture:
+        if args.profile:
+            capture.enter_context(profiled(None if args.profile is True else args.profile))
+        if args.tracemalloc:
+            capture.enter_context(traced_memory())
+        run_parser(args)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,25 @@
+"""
+Fixtures shared by the test modules.
+"""
+from parsers.shared import Rule
+
+
+def grammar_of(*lines):
+    """A grammar dict with one rule per line, e.g. ``grammar_of('S -> a S', 'S ->')``."""
+    grammar = {}
+    for line in lines:
+        rule = Rule.from_str(line)
+        grammar.setdefault(rule.lhs, []).append(rule)
+    return grammar
+
+
+def forest(root):
+    """Maps every node below ``root`` to the set of its families."""
+    nodes, agenda = {}, [root] if root is not None else []
+    while agenda:
+        node = agenda.pop()
+        if node in nodes:
+            continue
+        nodes[node] = {(family.left, family.right) for family in node.families}
+        agenda.extend(child for family in node.families for child in family if child is not None)
+    return nodes
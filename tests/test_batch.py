@@ -0,0 +1,42 @@
+import unittest
+
+from parsers.batch import BatchParser, batch_recognize, is_parsed
+
+
+class TestBatch(unittest.TestCase):
+    """
+    Tests for batch parsing over many sentences.
+    """
+    SENTENCES = [['Peter', 'likes', 'hot', 'coffee'], ['Peter', 'coffee'],
+                 ['Peter', 'drinks', 'coffee'], ['likes']] * 5
+    EXPECTED = [True, False, True, False] * 5
+
+    def test_in_process(self):
+        results = batch_recognize(self.SENTENCES, 'data/grammar.txt', 'data/lexicon.txt', processes=0)
+
+        self.assertEqual(self.EXPECTED, list(results))
+
+    def test_process_pool(self):
+        results = batch_recognize(iter(self.SENTENCES), 'data/grammar.txt', 'data/lexicon.txt',
+                                  processes=2, chunksize=3)
+
+        self.assertEqual(self.EXPECTED, list(results))
+
+    def test_unordered(self):
+        batch_parser = BatchParser.from_files('data/grammar.txt', 'data/lexicon.txt', processes=2, chunksize=2)
+
+        results = dict(batch_parser.imap_unordered(self.SENTENCES))
+
+        self.assertEqual(self.EXPECTED, [results[i] for i in range(len(self.SENTENCES))])
+
+    def test_parser(self):
+        batch_parser = BatchParser.from_files('data/grune_jacobs_2008.txt', processes=2,
+                                              chunksize=1, postprocess=is_parsed)
+
+        results = list(batch_parser.map([['a', 'b', 'c'], ['a', 'b'], ['a', 'a', 'b', 'c']]))
+
+        self.assertEqual([True, False, True], results)
+
+
+if __name__ == '__main__':
+    unittest.main()
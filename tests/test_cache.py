@@ -0,0 +1,138 @@
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import unittest
+
+from parsers.batch import BatchParser, is_parsed
+from parsers.earley import cache
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.scott_2008 import parse
+from parsers.earley.utils import collect_derivations
+from parsers.shared import read_grammar
+
+
+class TestGrammarCache(unittest.TestCase):
+    """
+    Tests for the on-disk cache of compiled grammars.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.grammar_path = os.path.join(self.directory, 'grammar.txt')
+        shutil.copy('data/grune_jacobs_2008.txt', self.grammar_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_loaded_grammar_equals_compiled(self):
+        compiled = CompiledGrammar(read_grammar(self.grammar_path))
+
+        cache.load(self.grammar_path)
+        loaded = cache.load(self.grammar_path)
+
+        self.assertIsInstance(loaded, cache.MappedGrammar)
+        self.assertEqual(compiled.symbols, loaded.symbols)
+        self.assertEqual(compiled.item_next, list(loaded.item_next))
+        self.assertEqual(compiled.item_label, list(loaded.item_label))
+        self.assertEqual(compiled.predictions, loaded.predictions)
+        self.assertEqual(compiled.lookahead_predictions, loaded.lookahead_predictions)
+        self.assertEqual(compiled.nullable, loaded.nullable)
+        self.assertEqual(list(compiled.labels), [loaded.labels[i] for i in range(len(loaded.labels))])
+
+    def test_parse_with_loaded_grammar(self):
+        tokens = 'a a b c'.split()
+        expected = collect_derivations(parse(read_grammar(self.grammar_path), tokens))
+
+        trees = collect_derivations(parse(cache.load(self.grammar_path), tokens, lookahead=True))
+
+        self.assertEqual(expected, trees)
+
+    def test_invalidation(self):
+        old_path = cache.cache_path(self.grammar_path)
+        cache.load(self.grammar_path)
+
+        with open(self.grammar_path, 'a') as fout:
+            fout.write('\nS -> d')
+        loaded = cache.load(self.grammar_path)
+
+        self.assertNotEqual(old_path, loaded.path)
+        self.assertFalse(os.path.exists(old_path))
+        self.assertIsNotNone(parse(loaded, ['d']))
+
+    def test_other_configurations_are_kept(self):
+        lexicon_path = os.path.join(self.directory, 'lexicon.txt')
+        with open(lexicon_path, 'w') as fout:
+            fout.write('a -> x\n')
+        with_lexicon = cache.load(self.grammar_path, lexicon_path)
+        other_start = cache.load(self.grammar_path, start='A')
+
+        with open(self.grammar_path, 'a') as fout:
+            fout.write('\nS -> d')
+        loaded = cache.load(self.grammar_path)
+
+        self.assertTrue(os.path.exists(with_lexicon.path))
+        self.assertTrue(os.path.exists(other_start.path))
+        self.assertEqual(3, len({with_lexicon.path, other_start.path, loaded.path}))
+
+    def test_unpickled_after_removal(self):
+        loaded = cache.load(self.grammar_path)
+        data = pickle.dumps(loaded)
+        os.remove(loaded.path)
+
+        copy = pickle.loads(data)
+
+        self.assertEqual(loaded.path, copy.path)
+        self.assertIsNotNone(parse(copy, 'a b c'.split()))
+
+    def test_corrupt_file_is_rebuilt(self):
+        with open(cache.cache_path(self.grammar_path), 'wb') as fout:
+            fout.write(b'garbage')
+
+        loaded = cache.load(self.grammar_path)
+
+        self.assertIsNotNone(parse(loaded, 'a b c'.split()))
+
+    def test_incomplete_header_is_rebuilt(self):
+        path = cache.cache_path(self.grammar_path)
+        header = json.dumps({'byteorder': sys.byteorder, 'itemsize': 4}).encode()
+        with open(path, 'wb') as fout:
+            fout.write(cache._HEADER.pack(cache.MAGIC, len(header)) + header)
+
+        with self.assertRaises(ValueError):
+            cache.read(path)
+        loaded = cache.load(self.grammar_path)
+
+        self.assertIsNotNone(parse(loaded, 'a b c'.split()))
+
+    def test_truncated_arrays_are_rebuilt(self):
+        path = cache.load(self.grammar_path).path
+        with open(path, 'rb') as fin:
+            contents = fin.read()
+        with open(path, 'wb') as fout:
+            fout.write(contents[:-8])
+
+        with self.assertRaises(ValueError):
+            cache.read(path)
+        loaded = cache.load(self.grammar_path)
+
+        self.assertIsNotNone(parse(loaded, 'a b c'.split()))
+        self.assertEqual(len(contents), os.path.getsize(path))
+
+    def test_pickled_as_path(self):
+        loaded = cache.load(self.grammar_path, cache_dir=os.path.join(self.directory, 'cache'))
+
+        copy = pickle.loads(pickle.dumps(loaded))
+
+        self.assertEqual(loaded.path, copy.path)
+        self.assertLess(len(pickle.dumps(loaded)), 500)
+
+    def test_batch_parser(self):
+        batch_parser = BatchParser.from_files(self.grammar_path, cache=True, processes=2, chunksize=1,
+                                              postprocess=is_parsed)
+
+        results = list(batch_parser.map([['a', 'b', 'c'], ['a', 'b'], ['a', 'a', 'b', 'c']]))
+
+        self.assertEqual([True, False, True], results)
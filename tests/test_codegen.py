@@ -0,0 +1,94 @@
+import importlib
+import itertools
+import os
+import sys
+import tempfile
+import unittest
+
+from parsers.earley import codegen
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley.scott_2008 import build_chart
+from parsers.lexicon import Lexicon
+from parsers.shared import read_grammar, read_lexicon
+from tests.helpers import grammar_of
+
+
+class TestCodegen(unittest.TestCase):
+    """
+    Tests for the generated, grammar-specialized recognizers.
+    """
+
+    def test_agrees_with_earley_recognizer(self):
+        for grammar_path, lexicon_path in [('data/grammar.txt', 'data/lexicon.txt'),
+                                           ('data/grammar-espresso.txt', 'data/lexicon-espresso.txt')]:
+            grammar, lexicon = read_grammar(grammar_path), read_lexicon(lexicon_path)
+            module = codegen.specialize(grammar, lexicon)
+            recognizer = EarleyRecognizer(grammar, lexicon)
+            words = [word for entries in lexicon.values() for word in entries]
+
+            for n in range(5):
+                for tokens in itertools.product(words, repeat=n):
+                    self.assertEqual(recognizer.recognize(list(tokens)), module.recognize(list(tokens)), tokens)
+
+    def test_empty_rules(self):
+        grammar = grammar_of('S -> A S b', 'S -> a', 'A -> ', 'A -> B', 'B -> A')
+        lexicon = {'a': ['a'], 'b': ['b']}
+        module = codegen.specialize(grammar, lexicon)
+
+        for n in range(6):
+            for tokens in itertools.product('ab', repeat=n):
+                chart = build_chart(grammar, list(tokens))
+                self.assertEqual(n > 0 and chart.find_root() is not None, module.recognize(list(tokens)), tokens)
+
+    def test_multi_token_entries(self):
+        lexicon = Lexicon({'N': ['coffee', ('New', 'York')], 'V': ['likes']})
+        module = codegen.specialize(grammar_of('S -> N V N'), lexicon)
+
+        self.assertTrue(module.recognize(['New', 'York', 'likes', 'coffee']))
+        self.assertFalse(module.recognize(['New', 'likes', 'coffee']))
+        self.assertEqual({module.SYMBOLS.index('N'): [2]}, module.matches(['New', 'York'], 0))
+
+    def test_normalized_lexicon(self):
+        with self.assertRaises(ValueError):
+            codegen.generate(grammar_of('S -> N'), Lexicon({'N': ['a']}, normalize=str.casefold))
+
+    def test_key(self):
+        grammar, lexicon = grammar_of('S -> N V'), {'N': ['Peter'], 'V': ['runs']}
+
+        key = codegen.grammar_key(grammar, lexicon)
+
+        self.assertEqual(key, codegen.grammar_key(grammar_of('S -> N V'), {'N': ['Peter'], 'V': ['runs']}))
+        self.assertNotEqual(key, codegen.grammar_key(grammar, {'N': ['Paul'], 'V': ['runs']}))
+        self.assertNotEqual(key, codegen.grammar_key(grammar, lexicon, start='NP'))
+        self.assertIs(codegen.specialize(grammar, lexicon), codegen.specialize(grammar_of('S -> N V'), lexicon))
+
+    def test_cached_module(self):
+        grammar, lexicon = grammar_of('S -> N V', 'S -> N V N'), {'N': ['Mary', 'tea'], 'V': ['drinks']}
+        name = codegen.module_name(codegen.grammar_key(grammar, lexicon))
+        sys.modules.pop(name, None)
+        with tempfile.TemporaryDirectory() as directory:
+            module = codegen.specialize(grammar, lexicon, cache_dir=directory)
+            path = os.path.join(directory, name + '.py')
+            self.assertEqual(path, module.__file__)
+            os.utime(path, (0, 0))
+            del sys.modules[name]
+
+            again = codegen.specialize(grammar, lexicon, cache_dir=directory)
+
+            self.assertEqual(0, os.stat(path).st_mtime)
+            self.assertIsNot(module, again)
+            self.assertTrue(again.recognize(['Mary', 'drinks', 'tea']))
+            sys.path.insert(0, directory)
+            try:
+                del sys.modules[name]
+                imported = importlib.import_module(name)
+            finally:
+                sys.path.remove(directory)
+            self.assertFalse(imported.recognize(['drinks', 'tea']))
+
+    def test_specialized_recognizer(self):
+        recognizer = codegen.SpecializedRecognizer(read_grammar('data/grammar.txt'), read_lexicon('data/lexicon.txt'))
+
+        self.assertTrue(recognizer.recognize(['Peter', 'likes', 'hot', 'coffee']))
+        self.assertEqual(5, len(recognizer.chart))
+        self.assertFalse(recognizer.recognize(['likes', 'Peter']))
@@ -0,0 +1,66 @@
+import unittest
+
+from parsers.earley.compiled import CompiledGrammar, Rule, COMPLETE
+from parsers.earley.scott_2008 import parse
+from parsers.earley.utils import collect_derivations, to_dot_language
+
+
+class TestCompiledGrammar(unittest.TestCase):
+    """
+    Tests for the compiled grammar representation.
+    """
+    GRAMMAR = {'S': [Rule('S', ('S', 'T')), Rule('S', ('a',))], 'B': [
+        Rule('B', ())], 'T': [Rule('T', ('a', 'B')), Rule('T', ('a',))]}
+
+    def test_items_are_numbered_per_rule(self):
+        grammar = CompiledGrammar(self.GRAMMAR)
+        s, t = grammar.symbol_id('S'), grammar.symbol_id('T')
+
+        first = grammar.rule_first_item[1]  # S -> S T
+
+        self.assertEqual([s, t, COMPLETE], grammar.item_next[first:first + 3])
+        self.assertEqual([0, 1, 2], grammar.item_dot[first:first + 3])
+        self.assertEqual('S -> S . T', grammar.item_repr(first + 1))
+
+    def test_predictions(self):
+        grammar = CompiledGrammar(self.GRAMMAR)
+
+        predicted = grammar.predictions[grammar.symbol_id('T')]
+
+        self.assertEqual(['T -> . a B', 'T -> . a'],
+                         [grammar.item_repr(item) for item in predicted])
+        self.assertEqual((), grammar.predictions[grammar.symbol_id('a')])
+
+    def test_nullable(self):
+        grammar = CompiledGrammar({'S': [Rule('S', ('A', 'B'))], 'A': [Rule('A', ('B', 'B'))],
+                                   'B': [Rule('B', ()), Rule('B', ('b',))]})
+
+        nullable = {grammar.symbols[symbol] for symbol in grammar.nullable}
+
+        self.assertEqual({'START', 'S', 'A', 'B'}, nullable)
+
+    def test_lookahead_tables_are_built_on_first_use(self):
+        grammar = CompiledGrammar(self.GRAMMAR)
+        parse(grammar, ['a', 'a'])
+        self.assertNotIn('lookahead_predictions', vars(grammar))
+
+        parse(grammar, ['a', 'a'], lookahead=True)
+
+        t, a = grammar.symbol_id('T'), grammar.symbol_id('a')
+        self.assertEqual(grammar.predictions[t], grammar.lookahead_predictions[t][a])
+        self.assertEqual((), grammar.nullable_predictions[t])
+
+    def test_parse_with_compiled_grammar(self):
+        grammar = CompiledGrammar(self.GRAMMAR)
+
+        first = collect_derivations(parse(grammar, ['a', 'a']))
+        second = collect_derivations(parse(grammar, ['a', 'a']))
+
+        self.assertEqual(sorted(to_dot_language(tree, 't') for tree in first),
+                         sorted(to_dot_language(tree, 't') for tree in second))
+        self.assertEqual(2, len(first))
+        self.assertIsNone(parse(grammar, ['b']))
+
+
+if __name__ == '__main__':
+    unittest.main()
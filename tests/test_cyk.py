@@ -0,0 +1,62 @@
+import unittest
+
+from parsers import cyk
+from parsers.earley import scott_2008
+from parsers.earley.utils import count_derivations
+from parsers.grammar_transform import to_cnf
+from parsers.graph_search import dfs_search_first
+from parsers.shared import Rule, read_grammar
+from parsers.top_down import NaiveTopDownParser
+from tests.helpers import forest, grammar_of
+
+
+class TestCYK(unittest.TestCase):
+    """
+    Tests for the CNF conversion and the vectorized CYK parser.
+    """
+
+    def test_same_forest_as_scott_2008(self):
+        cases = [(grammar_of('S -> S S', 'S -> a'), ['a'] * 6),
+                 (grammar_of('S -> S T', 'S -> a', 'B ->', 'T -> a B', 'T -> a'), ['a', 'a']),
+                 (grammar_of('S -> A B C d', 'A -> a', 'A ->', 'B -> A', 'B -> b B', 'C -> c', 'C -> S'),
+                  ['a', 'b', 'c', 'd']),
+                 (read_grammar('data/grune_jacobs_2008.txt'), ['a', 'a', 'b', 'c'])]
+
+        for grammar, tokens in cases:
+            root = cyk.parse(grammar, tokens)
+
+            expected = scott_2008.parse(grammar, tokens)
+            self.assertEqual(count_derivations(expected), count_derivations(root))
+            self.assertEqual(forest(expected), forest(root))
+
+    def test_recognize(self):
+        grammar = cyk.CYKGrammar(read_grammar('data/grune_jacobs_2008.txt'))
+
+        self.assertTrue(cyk.recognize(grammar, ['a', 'b', 'c']))
+        self.assertFalse(cyk.recognize(grammar, ['a', 'b', 'b']))
+        self.assertFalse(cyk.recognize(grammar, ['a', 'x', 'c']))
+        self.assertIsNone(cyk.parse(grammar, []))
+
+    def test_to_cnf(self):
+        grammar = grammar_of('S -> A B c', 'S -> B', 'A -> a A', 'A ->', 'B -> b')
+
+        cnf = to_cnf(grammar)
+
+        for rules in cnf.values():
+            for rule in rules:
+                self.assertTrue(len(rule.rhs) == 2 and all(symbol in cnf for symbol in rule.rhs)
+                                or len(rule.rhs) == 1 and rule.rhs[0] not in cnf, rule)
+        self.assertEqual(count_derivations(scott_2008.parse(grammar, ['a', 'a', 'b', 'c'])),
+                         count_derivations(cyk.parse(cnf, ['a', 'a', 'b', 'c'])))
+
+    def test_cnf_derivations_map_back(self):
+        grammar = grammar_of('S -> A B c', 'A -> a A', 'A ->', 'B -> b')
+
+        config = NaiveTopDownParser(to_cnf(grammar)).parse(['a', 'b', 'c'], dfs_search_first)
+
+        expected = ['S -> A B c', 'A -> a A', 'A ->', 'B -> b']
+        self.assertListEqual([Rule.from_str(s) for s in expected], config.derivation)
+
+
+if __name__ == '__main__':
+    unittest.main()
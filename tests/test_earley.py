@@ -41,6 +41,59 @@ class TestEarleyParser(unittest.TestCase):
 
         self.assertTrue(part_of_lang)
 
+    def test_leo(self):
+        lexicon = read_lexicon('data/simple_lexicon.txt')
+        grammar = read_grammar('data/right-recursive_grammar.txt')
+        tokens = ['a'] * 20
+        plain = EarleyRecognizer(grammar, lexicon)
+        leo = EarleyRecognizer(grammar, lexicon, leo=True)
+
+        self.assertTrue(plain.recognize(tokens))
+        self.assertTrue(leo.recognize(tokens))
+        self.assertLess(len(leo.states), len(plain.states) / 2)
+        self.assertFalse(leo.recognize(tokens + ['b']))
+
+    def test_chart_index(self):
+        lexicon = read_lexicon('data/lexicon.txt')
+        grammar = read_grammar('data/grammar.txt')
+        parser = EarleyRecognizer(grammar, lexicon)
+
+        parser.recognize(['Peter', 'likes', 'hot', 'coffee'])
+
+        self.assertEqual({'S', 'NP'}, parser.predicted[0])
+        self.assertEqual(['S -> NP . VP [0, 1]'],
+                         [str(state) for state in parser.waiting[1]['VP']])
+        for i, state_set in enumerate(parser.chart):
+            waiting = [state for states in parser.waiting[i].values() for state in states]
+            self.assertCountEqual([state for state in state_set if not state.is_complete], waiting)
+
+    def test_session(self):
+        lexicon = read_lexicon('data/lexicon.txt')
+        grammar = read_grammar('data/grammar.txt')
+        session = RecognizerSession(grammar, lexicon)
+
+        self.assertEqual({'N', 'A'}, session.expected())
+        self.assertTrue(session.feed('Peter'))
+        self.assertEqual({'V'}, session.expected())
+        self.assertFalse(session.accepts())
+        self.assertTrue(session.feed('likes'))
+        self.assertTrue(session.accepts())
+        self.assertFalse(session.feed('likes'))
+        self.assertEqual(set(), session.expected())
+        self.assertFalse(session.feed('coffee'))
+        self.assertEqual(3, session.position)
+
+    def test_session_without_chart(self):
+        lexicon = read_lexicon('data/simple_lexicon.txt')
+        grammar = read_grammar('data/left-recursive_grammar.txt')
+        session = RecognizerSession(grammar, lexicon, keep_chart=False)
+
+        self.assertTrue(session.feed_all(['a'] * 10))
+
+        self.assertTrue(session.accepts())
+        self.assertEqual([], session.chart[5])
+        self.assertEqual(len(session.chart[-1]), len(session.recognizer.states))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from parsers.earley import forest_io
+from parsers.earley.scott_2008 import parse
+from parsers.earley.utils import collect_derivations, count_derivations
+from parsers.earley.viterbi import rule_probabilities, viterbi
+from parsers.shared import Rule, read_grammar
+
+
+class TestForestIO(unittest.TestCase):
+    """
+    Tests for writing SPPFs to disk and reading them back.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def round_trip(self, root, format):
+        path = os.path.join(self.directory, 'forest.' + format)
+        forest_io.dump(root, path, format=format)
+        return forest_io.load(path)
+
+    def test_round_trip(self):
+        grammar = read_grammar('data/pcfg.txt')
+        root = parse(grammar, 'n v n p n p n'.split())
+        expected = [str(sorted(map(str, tree))) for tree in collect_derivations(root)]
+
+        for format in ('binary', 'jsonl'):
+            forest = self.round_trip(root, format)
+
+            trees = [str(sorted(map(str, tree))) for tree in collect_derivations(forest.root)]
+            self.assertEqual(expected, trees)
+            self.assertEqual(count_derivations(root), count_derivations(forest.root))
+            probs = rule_probabilities(grammar)
+            self.assertAlmostEqual(viterbi(root, probs)[0], viterbi(forest.root, probs)[0])
+
+    def test_forest_is_shared(self):
+        root = parse({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}, ['a'] * 12)
+
+        forest = self.round_trip(root, 'binary')
+
+        self.assertEqual(58786, count_derivations(forest.root))
+        self.assertLess(len(forest), 400)
+        self.assertIs(forest.root.families[0].right, forest.node(forest.root.families[0].right.id))
+
+    def test_empty_forest(self):
+        for format in ('binary', 'jsonl'):
+            forest = self.round_trip(None, format)
+
+            self.assertIsNone(forest.root)
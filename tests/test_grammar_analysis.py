@@ -0,0 +1,78 @@
+import math
+import unittest
+
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.earley.scott_2008 import parse
+from parsers.earley.utils import collect_derivations, to_dot_language
+from parsers.grammar_analysis import *
+from parsers.shared import read_grammar, read_lexicon, Rule
+from tests.helpers import grammar_of
+
+
+class TestGrammarAnalysis(unittest.TestCase):
+    """
+    Tests for nullable, FIRST and FOLLOW sets, useless-rule removal and
+    lookahead-filtered prediction.
+    """
+    GRAMMAR = grammar_of('S -> A B c', 'A -> a', 'A ->', 'B -> b B', 'B ->', 'C -> c')
+
+    def test_nullable(self):
+        self.assertEqual({'A', 'B'}, nullable_symbols(self.GRAMMAR))
+
+    def test_min_yields(self):
+        grammar = grammar_of('S -> A B c', 'A -> a', 'A ->', 'B -> b B', 'D -> D d')
+
+        self.assertEqual({'S': math.inf, 'A': 0, 'B': math.inf, 'D': math.inf}, min_yields(grammar))
+        self.assertEqual({'S': 1, 'A': 0, 'B': 0, 'C': 1}, min_yields(self.GRAMMAR))
+
+    def test_first_and_follow(self):
+        first = first_sets(self.GRAMMAR)
+        follow = follow_sets(self.GRAMMAR)
+
+        self.assertEqual({'a', 'b', 'c'}, first['S'])
+        self.assertEqual({'b'}, first['B'])
+        self.assertEqual({END}, follow['S'])
+        self.assertEqual({'b', 'c'}, follow['A'])
+        self.assertEqual({'c'}, follow['B'])
+
+    def test_remove_useless(self):
+        grammar = grammar_of('S -> A', 'S -> U', 'A -> a', 'U -> U u', 'R -> a')
+
+        useful = remove_useless(grammar)
+
+        self.assertEqual({'S': [Rule.from_str('S -> A')], 'A': [Rule.from_str('A -> a')]}, useful)
+
+    def test_prediction_table(self):
+        table = PredictionTable(self.GRAMMAR)
+
+        self.assertEqual([Rule.from_str('B ->')], table.predict('B', {'c'}))
+        self.assertEqual(self.GRAMMAR['B'], table.predict('B', {'b'}))
+        self.assertEqual(self.GRAMMAR['A'], table.predict('A', {'a', 'c'}))
+
+    def test_recognizer_lookahead(self):
+        lexicon = read_lexicon('data/lexicon-espresso.txt')
+        grammar = read_grammar('data/grammar-espresso.txt')
+        tokens = ['Yesterday', 'Chris', 'drank', 'an', 'espresso']
+        plain = EarleyRecognizer(grammar, lexicon)
+        filtered = EarleyRecognizer(grammar, lexicon, lookahead=True)
+
+        self.assertTrue(plain.recognize(tokens))
+        self.assertTrue(filtered.recognize(tokens))
+        self.assertLess(len(filtered.states), len(plain.states))
+        self.assertFalse(filtered.recognize(tokens[1:3] + ['an']))
+
+    def test_parser_lookahead(self):
+        grammar = grammar_of('S -> NP VP', 'S -> S PP', 'NP -> n', 'NP -> NP PP', 'NP ->',
+                                      'PP -> p NP', 'VP -> v NP', 'VP -> v')
+        for tokens in [['n', 'v', 'n', 'p', 'n'], ['v', 'p', 'p'], ['v', 'n', 'n']]:
+            expected = parse(grammar, tokens)
+            actual = parse(grammar, tokens, lookahead=True)
+            if expected is None:
+                self.assertIsNone(actual)
+                continue
+            self.assertCountEqual([to_dot_language(tree, 't') for tree in collect_derivations(expected)],
+                                  [to_dot_language(tree, 't') for tree in collect_derivations(actual)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import random
+import unittest
+
+from parsers.earley import scott_2008
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.incremental import ParseSession
+from tests.helpers import forest, grammar_of
+
+
+class TestIncremental(unittest.TestCase):
+    """
+    Tests for incremental re-parsing after token edits.
+    """
+
+    GRAMMAR = CompiledGrammar(grammar_of('S -> S + S', 'S -> a', 'S -> ( S )', 'S -> S T', 'T -> b', 'T ->',
+                                         'S -> a b'))
+
+    def test_edits_give_the_forest_of_a_fresh_parse(self):
+        rnd = random.Random(1)
+        alphabet = ['a', '+', '(', ')', 'b']
+        for leo, lookahead in ((False, False), (True, False), (False, True), (True, True)):
+            for _ in range(30):
+                tokens = [rnd.choice(alphabet) for _ in range(rnd.randint(0, 7))]
+                session = ParseSession(self.GRAMMAR, tokens, leo=leo, lookahead=lookahead)
+                for _ in range(4):
+                    start = rnd.randint(0, len(tokens))
+                    end = rnd.randint(start, len(tokens))
+                    replacement = [rnd.choice(alphabet) for _ in range(rnd.randint(0, 3))]
+                    tokens = tokens[:start] + replacement + tokens[end:]
+
+                    root = session.replace(start, end, replacement)
+
+                    expected = scott_2008.parse(self.GRAMMAR, tokens, leo=leo, lookahead=lookahead)
+                    self.assertEqual(tokens, session.tokens)
+                    self.assertEqual(forest(expected), forest(root), (leo, lookahead, tokens))
+
+    def test_prefix_is_kept(self):
+        session = ParseSession(self.GRAMMAR, ['a', '+', 'a', '+', 'a'])
+        kept = list(session.chart.chart[:4])
+        nodes = [node for node in session.chart.nodes if node.end <= 3]
+
+        root = session.replace(4, 5, ['(', 'a', ')'])
+
+        self.assertEqual(kept, session.chart.chart[:4])
+        self.assertEqual(nodes, session.chart.nodes[:len(nodes)])
+        self.assertTrue(all(node.end > 3 for node in session.chart.nodes[len(nodes):]))
+        self.assertEqual(0, root.start)
+        self.assertEqual(7, root.end)
+
+    def test_insert_and_delete(self):
+        session = ParseSession(self.GRAMMAR, ['a'])
+
+        self.assertIsNotNone(session.insert(1, ['+', 'a']))
+        self.assertIsNone(session.delete(2, 3))
+        self.assertIsNone(session.delete(0, 2))
+        self.assertIsNotNone(session.insert(0, ['(', 'a', ')']))
+        self.assertEqual(['(', 'a', ')'], session.tokens)
+
+
+if __name__ == '__main__':
+    unittest.main()
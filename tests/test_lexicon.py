@@ -0,0 +1,66 @@
+import unittest
+
+from parsers.earley.earley_recognizer import EarleyRecognizer, RecognizerSession
+from parsers.lexicon import Lexicon
+from parsers.shared import read_grammar, read_lexicon
+
+
+class TestLexicon(unittest.TestCase):
+    """
+    Tests for the word-indexed lexicon.
+    """
+
+    def test_reverse_index(self):
+        lexicon = Lexicon({'N': ['coffee', 'run'], 'V': ['run', 'drinks']})
+
+        categories = lexicon.categories('run')
+
+        self.assertEqual({'N', 'V'}, categories)
+        self.assertEqual(set(), lexicon.categories('tea'))
+        self.assertEqual(['coffee', 'run'], lexicon['N'])
+        self.assertIn('V', lexicon)
+
+    def test_multi_token_matches(self):
+        lexicon = Lexicon({'N': ['New', ('New', 'York')], 'A': ['new'], 'NP': [('New', 'York', 'City')]},
+                          normalize=str.casefold)
+
+        matches = lexicon.matches(['new', 'york', 'city'], 0)
+
+        self.assertEqual({'N': [1, 2], 'A': [1], 'NP': [3]}, matches)
+        self.assertEqual({'N': [1, 2], 'A': [1]}, lexicon.matches(['NEW', 'York'], 0))
+        self.assertEqual({'NP'}, lexicon.continuations(['new', 'York'], 0))
+
+    def test_from_file(self):
+        lexicon = Lexicon.from_file('data/lexicon.txt', normalize=str.lower)
+
+        self.assertEqual({'N'}, lexicon.categories('PETER'))
+        self.assertEqual(read_lexicon('data/lexicon.txt'), dict(lexicon.words))
+
+
+class TestLexiconRecognizer(unittest.TestCase):
+    """
+    Tests for Earley recognition with multi-token and normalised entries.
+    """
+    GRAMMAR = read_grammar('data/grammar.txt')
+
+    def lexicon(self):
+        lexicon = Lexicon(read_lexicon('data/lexicon.txt'), normalize=str.casefold)
+        lexicon.add('N', ('Peter', 'Pan'))
+        lexicon.add('N', ('iced', 'coffee'))
+        return lexicon
+
+    def test_multi_token_entries(self):
+        parser = EarleyRecognizer(self.GRAMMAR, self.lexicon(), lookahead=True)
+
+        self.assertTrue(parser.recognize('Peter Pan likes iced coffee'.split()))
+        self.assertTrue(parser.recognize('peter LIKES hot Coffee'.split()))
+        self.assertFalse(parser.recognize('Peter Pan likes iced'.split()))
+
+    def test_session(self):
+        session = RecognizerSession(self.GRAMMAR, self.lexicon(), keep_chart=False)
+
+        self.assertTrue(session.feed_all('Peter Pan likes iced'.split()))
+        self.assertFalse(session.accepts())
+        self.assertTrue(session.feed('coffee'))
+        self.assertTrue(session.accepts())
+        self.assertFalse(session.feed('Pan'))
@@ -0,0 +1,60 @@
+import unittest
+
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.parallel import ParallelRecognizer
+from parsers.earley.scott_2008 import build_chart
+from parsers.shared import Rule, read_grammar
+
+CASES = [
+    (read_grammar('data/grune_jacobs_2008.txt'), 'a a b b c c'.split()),
+    (read_grammar('data/pcfg.txt'), 'n v n p n p n'.split()),
+    ({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',)), Rule('S', ())]}, ['a'] * 8),
+    ({'S': [Rule('S', ('A', 'T')), Rule('S', ('a', 'T'))], 'A': [Rule('A', ('a',)), Rule('A', ('B', 'A'))],
+      'B': [Rule('B', ())], 'T': [Rule('T', ('b', 'b', 'b'))]}, ['a', 'b', 'b', 'b']),
+]
+
+
+def unscanned(sets, grammar, tokens):
+    """The Earley sets without the items about to scan their token, which the Scott 2008 chart does not keep."""
+    token_ids = [grammar.symbol_ids.get(token) for token in tokens] + [None]
+    return [{(item, start) for item, start in items if grammar.item_next[item] != token_ids[i]}
+            for i, items in enumerate(sets)]
+
+
+class TestParallel(unittest.TestCase):
+    """
+    Tests for Earley recognition with the chart sharded over processes.
+    """
+
+    def test_same_sets_as_scott_2008(self):
+        for grammar, tokens in CASES:
+            compiled = CompiledGrammar(grammar)
+            chart = build_chart(compiled, tokens)
+            expected = [{(item, start) for item, start, _ in items} for items in chart.chart]
+            with ParallelRecognizer(compiled, processes=3) as recognizer:
+                sets = recognizer.build_chart(tokens)
+
+                self.assertEqual(expected, unscanned(sets, compiled, tokens))
+                self.assertTrue(recognizer.recognize(tokens))
+
+    def test_independent_of_shards(self):
+        grammar = CompiledGrammar({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]})
+        tokens = ['a'] * 10
+        with ParallelRecognizer(grammar, processes=0) as sequential:
+            expected = sequential.build_chart(tokens)
+
+        for processes in (1, 2, 4):
+            with ParallelRecognizer(grammar, processes=processes) as recognizer:
+                self.assertEqual(expected, recognizer.build_chart(tokens))
+                self.assertEqual(expected, recognizer.build_chart(tokens))
+
+    def test_rejects(self):
+        with ParallelRecognizer(read_grammar('data/grune_jacobs_2008.txt'), processes=2) as recognizer:
+            self.assertFalse(recognizer.recognize('a a b c c'.split()))
+            self.assertFalse(recognizer.recognize('a x'.split()))
+            self.assertFalse(recognizer.recognize([]))
+            self.assertTrue(recognizer.recognize('a b c'.split()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from benchmarks.practical import sentence, wide_grammar
+from parsers.earley import practical, scott_2008
+from parsers.earley.compiled import CompiledGrammar
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.shared import read_grammar, read_lexicon
+from tests.helpers import forest, grammar_of
+
+
+class TestPractical(unittest.TestCase):
+    """
+    Tests for Earley parsing over an LR(0) automaton (Aycock and Horspool 2002).
+    """
+
+    def test_same_forest_as_scott_2008(self):
+        rnd = random.Random(3)
+        cases = [(grammar_of('S -> S + S', 'S -> a', 'S -> ( S )', 'S -> S T', 'T -> b', 'T ->', 'S -> a b'),
+                  ['a', '+', '(', ')', 'b']),
+                 (grammar_of('S -> A B C d', 'A -> a', 'A ->', 'B -> A', 'B -> b B', 'C -> c', 'C -> S', 'C -> A A'),
+                  ['a', 'b', 'c', 'd']),
+                 (grammar_of('S -> A S b', 'S -> a', 'A ->', 'A -> A A', 'A -> b'), ['a', 'b'])]
+        for grammar, alphabet in cases:
+            automaton, compiled = practical.LR0Automaton(grammar), CompiledGrammar(grammar)
+            for _ in range(100):
+                tokens = [rnd.choice(alphabet) for _ in range(rnd.randint(0, 7))]
+
+                root = practical.parse(automaton, tokens)
+
+                self.assertEqual(forest(scott_2008.parse(compiled, tokens)), forest(root), tokens)
+
+    def test_recognizer_with_lexicon(self):
+        grammar = read_grammar('data/grammar.txt')
+        lexicon = read_lexicon('data/lexicon.txt')
+        recognizer = practical.PracticalEarleyRecognizer(grammar, lexicon)
+
+        for tokens in (['Peter', 'likes', 'hot', 'coffee'], ['Peter', 'likes'], ['likes', 'Peter'],
+                       ['Peter', 'hot']):
+            self.assertEqual(EarleyRecognizer(grammar, lexicon).recognize(tokens), recognizer.recognize(tokens))
+
+    def test_fewer_items(self):
+        tokens = sentence(51)
+
+        chart = practical.build_chart(wide_grammar(), tokens)
+
+        dotted = sum(len(starts) for i in range(len(tokens) + 1) for starts in chart.dotted(i).values())
+        self.assertTrue(chart.recognize())
+        self.assertLess(3 * sum(len(items) for items in chart.chart), dotted)
+
+
+if __name__ == '__main__':
+    unittest.main()
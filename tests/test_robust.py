@@ -0,0 +1,72 @@
+import unittest
+
+from parsers.earley import robust, scott_2008
+from parsers.earley.robust import Edit
+from parsers.earley.utils import collect_derivations
+from tests.helpers import grammar_of
+
+
+class TestRobust(unittest.TestCase):
+    """
+    Tests for error-correcting Earley parsing and partial parses.
+    """
+
+    GRAMMAR = grammar_of('S -> NP VP', 'NP -> d n', 'NP -> n', 'VP -> v NP', 'VP -> v')
+
+    def edits(self, root):
+        return sorted(tuple(robust.edits(tree)) for tree in collect_derivations(root))
+
+    def test_grammatical_input_costs_nothing(self):
+        root, cost = robust.parse(self.GRAMMAR, ['d', 'n', 'v', 'n'])
+
+        self.assertEqual(0, cost)
+        self.assertEqual(len(collect_derivations(scott_2008.parse(self.GRAMMAR, ['d', 'n', 'v', 'n']))),
+                         len(collect_derivations(root)))
+        self.assertEqual([()], self.edits(root))
+
+    def test_insertion_deletion_substitution(self):
+        _, inserted = robust.parse(self.GRAMMAR, ['d', 'v'])
+        root, deleted = robust.parse(self.GRAMMAR, ['n', 'v', 'v'], substitution=5)
+        substituted, cost = robust.parse(self.GRAMMAR, ['d', 'x', 'v'], insertion=5, deletion=5)
+
+        self.assertEqual(1, inserted)
+        self.assertEqual(1, deleted)
+        self.assertIn((Edit('del', None, 'v'),), self.edits(root))
+        self.assertEqual(1, cost)
+        self.assertEqual([(Edit('sub', 'n', 'x'),)], self.edits(substituted))
+
+    def test_only_least_cost_repairs(self):
+        root, cost = robust.parse(self.GRAMMAR, ['d', 'd', 'n', 'v'])
+
+        self.assertEqual(1, cost)
+        self.assertTrue(all(len(edits) == 1 for edits in self.edits(root)))
+
+    def test_cost_bound(self):
+        self.assertEqual((None, None), robust.parse(self.GRAMMAR, ['x', 'x', 'x'], max_cost=2))
+        self.assertEqual(3, robust.parse(self.GRAMMAR, ['x', 'x', 'x'], max_cost=None)[1])
+
+    def test_empty_rules(self):
+        grammar = grammar_of('S -> A b', 'A ->', 'A -> a')
+
+        root, cost = robust.parse(grammar, ['c', 'b'])
+
+        self.assertEqual(1, cost)
+        self.assertIn((Edit('del', None, 'c'),), self.edits(root))
+        self.assertIn((Edit('sub', 'a', 'c'),), self.edits(root))
+
+    def test_partial_parses(self):
+        chart = scott_2008.build_chart(self.GRAMMAR, ['d', 'n', 'v', 'x', 'n', 'v'])
+
+        parses = robust.partial_parses(chart)
+
+        self.assertEqual([('S', 0, 3)],
+                         [(node.item, node.start, node.end) for node in parses])
+
+    def test_maximal_cover(self):
+        spans = [(0, 1, 'a'), (0, 2, 'ab'), (1, 3, 'bc'), (2, 3, 'c'), (3, 4, 'd')]
+
+        self.assertEqual(['ab', 'c', 'd'], robust.maximal_cover(spans, 5))
+
+
+if __name__ == '__main__':
+    unittest.main()
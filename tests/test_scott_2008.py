@@ -1,9 +1,10 @@
+import math
 import os
 import re
 import unittest
 
 from parsers.earley.scott_2008 import *
-from parsers.earley.utils import collect_derivations, to_dot_language
+from parsers.earley.utils import collect_derivations, count_derivations, iter_derivations, to_dot_language
 
 
 class TestEarleyParser(unittest.TestCase):
@@ -81,6 +82,52 @@ class TestEarleyParser(unittest.TestCase):
         self.assert_string_equals(
             'hidden_left_recursion_and_cycle/tree3.gv', actual_string)
 
+    def test_lazy_derivations(self):
+        grammar = {'S': [Rule('S', ('S', 'S')), Rule('S', ('b',))]}
+        forest = parse(grammar, ['b'] * 8)
+
+        first = list(iter_derivations(forest, limit=3))
+        count = count_derivations(forest)
+
+        self.assertEqual(3, len(first))
+        self.assertEqual(429, count)
+        trees = {to_dot_language(tree, 't') for tree in iter_derivations(forest)}
+        self.assertEqual(429, len(trees))
+        self.assertEqual(first[0], next(iter_derivations(forest)))
+
+    def test_count_cyclic_forest(self):
+        grammar = {'S': [Rule('S', ('A', 'T')), Rule('S', ('a', 'T'))], 'A': [Rule('A', ('a',)), Rule(
+            'A', ('B', 'A'))], 'B': [Rule('B', ())], 'T': [Rule('T', ('b', 'b', 'b'))]}
+
+        forest = parse(grammar, ['a', 'b', 'b', 'b'])
+
+        self.assertEqual(3, count_derivations(forest))
+        self.assertEqual(3, len(list(iter_derivations(forest))))
+        self.assertEqual(math.inf, count_derivations(forest, infinite=True))
+
+    def test_long_right_recursion(self):
+        grammar = {'S': [Rule('S', ('a', 'S')), Rule('S', ('a',))]}
+        tokens = ['a'] * 50
+
+        forest = parse(grammar, tokens)
+        trees = collect_derivations(forest)
+
+        self.assertEqual(1, len(trees))
+        self.assertEqual(99, len(trees[0]))
+        self.assertEqual((0, 50), (forest.start, forest.end))
+
+    def test_leo(self):
+        grammars = [
+            ({'S': [Rule('S', ('a', 'S')), Rule('S', ('a',))]}, ['a'] * 8),
+            ({'S': [Rule('S', ('S', 'S')), Rule('S', ('b',))]}, ['b'] * 5),
+            ({'S': [Rule('S', ('a', 'S')), Rule('S', ('a', 'S', 'b')), Rule('S', ())]}, list('aaab')),
+            ({'S': [Rule('S', ('NP', 'VP'))], 'NP': [Rule('NP', ('n',)), Rule('NP', ('NP', 'and', 'NP'))],
+              'VP': [Rule('VP', ('v',)), Rule('VP', ('v', 'NP'))]}, 'n v n and n and n'.split())]
+        for grammar, tokens in grammars:
+            expected = [to_dot_language(tree, 't') for tree in collect_derivations(parse(grammar, tokens))]
+            actual = [to_dot_language(tree, 't') for tree in collect_derivations(parse(grammar, tokens, leo=True))]
+            self.assertCountEqual(expected, actual)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,126 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import unittest
+
+from parsers.client import ParseClient, ParseError
+from parsers.server import ParseServer
+
+
+class TestServer(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests for the asyncio parse service and its client.
+    """
+
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        ambiguous = os.path.join(self.directory.name, 'ambiguous.txt')
+        with open(ambiguous, 'w') as f:
+            f.write('S -> S S\nS -> a\n')
+        cyclic = os.path.join(self.directory.name, 'cyclic.txt')
+        with open(cyclic, 'w') as f:
+            f.write('S -> S\nS -> a\n')
+        self.server = ParseServer({'english': ('data/grammar.txt', 'data/lexicon.txt'),
+                                   'ambiguous': (ambiguous, None), 'cyclic': (cyclic, None)},
+                                  workers=2, queue_size=4, cache_dir=self.directory.name)
+        self.address = await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.directory.cleanup()
+
+    async def test_parse_and_recognize(self):
+        async with await ParseClient.connect(*self.address) as client:
+            parsed = await client.parse('ambiguous', ['a'] * 4)
+            recognized = await client.recognize('english', ['Peter', 'likes', 'hot', 'coffee'])
+            rejected = await client.recognize('english', ['likes', 'Peter'])
+
+        self.assertEqual({'accepted': True, 'derivations': 5}, parsed)
+        self.assertEqual({'accepted': True}, recognized)
+        self.assertEqual({'accepted': False}, rejected)
+
+    async def test_infinitely_many_derivations(self):
+        async with await ParseClient.connect(*self.address) as client:
+            parsed = await client.parse('cyclic', ['a'])
+
+        self.assertEqual({'accepted': True, 'derivations': None}, parsed)
+
+    async def test_bad_deadline(self):
+        reader, writer = await asyncio.open_connection(*self.address)
+        try:
+            for deadline in ['soon', -1, True]:
+                writer.write(json.dumps({'id': 1, 'op': 'parse', 'grammar': 'ambiguous', 'tokens': ['a'],
+                                         'deadline': deadline}).encode() + b'\n')
+                rejected = json.loads(await reader.readline())
+                self.assertEqual({'id': 1, 'ok': False, 'error': 'bad request'}, rejected)
+            writer.write(json.dumps({'id': 2, 'op': 'parse', 'grammar': 'ambiguous', 'tokens': ['a'],
+                                     'deadline': 5}).encode() + b'\n')
+            accepted = json.loads(await reader.readline())
+        finally:
+            writer.close()
+
+        self.assertEqual({'id': 2, 'ok': True, 'result': {'accepted': True, 'derivations': 1}}, accepted)
+
+    async def test_many_small_requests(self):
+        async with await ParseClient.connect(*self.address) as client:
+            results = await asyncio.gather(*[client.parse('ambiguous', ['a'] * (1 + k % 5)) for k in range(50)])
+
+        self.assertEqual([[1, 1, 2, 5, 14][k % 5] for k in range(50)], [result['derivations'] for result in results])
+
+    async def test_deadline_kills_the_worker(self):
+        async with await ParseClient.connect(*self.address) as client:
+            start = time.monotonic()
+            with self.assertRaises(ParseError) as context:
+                await client.parse('ambiguous', ['a'] * 400, deadline=0.2)
+            elapsed = time.monotonic() - start
+            results = await asyncio.gather(*[client.parse('ambiguous', ['a', 'a']) for _ in range(4)])
+
+        self.assertEqual('deadline exceeded', str(context.exception))
+        self.assertLess(elapsed, 5)
+        self.assertTrue(all(result['accepted'] for result in results))
+
+    async def test_slow_parse_does_not_block_others(self):
+        async with await ParseClient.connect(*self.address) as slow_client, \
+                await ParseClient.connect(*self.address) as client:
+            slow = asyncio.ensure_future(slow_client.parse('ambiguous', ['a'] * 400, deadline=2))
+            await asyncio.sleep(0.2)
+            start = time.monotonic()
+            result = await client.parse('ambiguous', ['a', 'a'])
+            elapsed = time.monotonic() - start
+            with self.assertRaises(ParseError):
+                await slow
+
+        self.assertTrue(result['accepted'])
+        self.assertLess(elapsed, 1)
+
+    async def test_cancellation(self):
+        async with await ParseClient.connect(*self.address) as client:
+            slow = asyncio.ensure_future(client.parse('ambiguous', ['a'] * 400))
+            await asyncio.sleep(0.2)
+            slow.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await slow
+            result = await client.parse('ambiguous', ['a'])
+
+        self.assertTrue(result['accepted'])
+
+    async def test_bad_request_and_unix_socket(self):
+        path = os.path.join(self.directory.name, 'socket')
+        server = ParseServer({'ambiguous': (os.path.join(self.directory.name, 'ambiguous.txt'), None)},
+                             workers=1, cache_dir=self.directory.name)
+        await server.start(path=path)
+        try:
+            async with await ParseClient.connect(path=path) as client:
+                result = await client.parse('ambiguous', ['a', 'a'])
+                with self.assertRaises(ParseError):
+                    await client.parse('missing', ['a'])
+        finally:
+            await server.close()
+
+        self.assertEqual({'accepted': True, 'derivations': 1}, result)
+
+
+if __name__ == '__main__':
+    unittest.main()
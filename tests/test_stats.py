@@ -0,0 +1,116 @@
+import io
+import os
+import pstats
+import tempfile
+import unittest
+
+from parsers.earley import scott_2008
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.graph_search import bfs_search_all, iddfs_search_first
+from parsers.shared import Rule, read_grammar, read_lexicon
+from parsers.stats import ParseStats, profiled, traced_memory
+from parsers.top_down import NaiveTopDownParser
+
+
+class TestStats(unittest.TestCase):
+    """
+    Tests for parse statistics and profiling.
+    """
+
+    def test_earley_recognizer(self):
+        stats = ParseStats()
+        parser = EarleyRecognizer(read_grammar('data/grammar.txt'), read_lexicon('data/lexicon.txt'), stats=stats)
+
+        self.assertTrue(parser.recognize(['Peter', 'likes', 'hot', 'coffee']))
+
+        self.assertEqual([len(column) for column in parser.chart], stats.columns)
+        self.assertEqual(len(parser.states), stats.counts['enqueue'])
+        self.assertEqual(sum(stats.rules.values()), stats.counts['enqueue'])
+        self.assertEqual(1, stats.counts['recognize'])
+        self.assertTrue(stats.counts['predict'] and stats.counts['scan'] and stats.counts['complete'])
+        self.assertLessEqual(stats.timings['predict'], stats.timings['recognize'])
+
+    def test_no_stats(self):
+        parser = EarleyRecognizer(read_grammar('data/grammar.txt'), read_lexicon('data/lexicon.txt'))
+
+        self.assertNotIn('enqueue', vars(parser))
+        self.assertIsInstance(scott_2008.build_chart({'S': [Rule('S', ('a',))]}, ['a']), scott_2008.Chart)
+
+    def test_scott_2008(self):
+        grammar = {'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}
+        tokens = ['a'] * 5
+        stats = ParseStats()
+
+        root = scott_2008.parse(grammar, tokens, stats=stats)
+
+        chart = scott_2008.build_chart(grammar, tokens)
+        self.assertEqual(len(tokens) + 1, len(stats.columns))
+        self.assertEqual(stats.counts['enqueue'], sum(stats.columns))
+        self.assertGreater(stats.counts['duplicate'], 0)
+        self.assertEqual(len(chart.nodes), stats.nodes)
+        self.assertEqual(sum(len(node.families) for node in chart.nodes), stats.families)
+        self.assertEqual(len(tokens) - 1, len(root.families))
+        self.assertEqual(Rule('S', ('S', 'S')), stats.top_rules(1)[0][0])
+        self.assertEqual({'compile', 'chart', 'forest'}, set(stats.timings))
+
+    def test_scott_2008_results_unchanged(self):
+        grammar = {'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}
+        tokens = ['a'] * 4
+
+        chart = scott_2008.build_chart(grammar, tokens, stats=ParseStats())
+
+        plain = scott_2008.build_chart(grammar, tokens)
+        self.assertEqual(plain.chart, chart.chart)
+
+    def test_top_down(self):
+        stats = ParseStats()
+        parser = NaiveTopDownParser(read_grammar('data/greibach_normal_form_grammar.txt'), stats=stats)
+
+        configs = parser.parse(['a', 'a', 'b', 'b'], bfs_search_all)
+
+        self.assertEqual(1, len(configs))
+        self.assertEqual(stats.counts['predict'] + stats.counts['match'], stats.counts['expand'])
+        self.assertGreater(stats.peak_frontier, 0)
+        self.assertGreater(stats.rules[Rule.from_str('B -> b')], 0)
+        self.assertIn('search', stats.timings)
+
+    def test_iterative_deepening(self):
+        stats = ParseStats()
+        parser = NaiveTopDownParser(read_grammar('data/greibach_normal_form_grammar.txt'), stats=stats)
+
+        parser.parse(['a', 'b'], iddfs_search_first)
+
+        self.assertGreater(stats.counts['expand'], 0)
+        self.assertIn('search', stats.timings)
+
+    def test_report(self):
+        stats = ParseStats()
+        scott_2008.parse({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}, ['a'] * 3, stats=stats)
+
+        report = stats.report()
+
+        self.assertIn('items per column: ', report)
+        self.assertIn('S -> S S', report)
+        self.assertEqual(stats.nodes, stats.as_dict()['nodes'])
+
+    def test_profiled(self):
+        text = io.StringIO()
+        with profiled(stream=text):
+            scott_2008.parse({'S': [Rule('S', ('a',))]}, ['a'])
+        self.assertIn('build_chart', text.getvalue())
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'parse.prof')
+            with profiled(path):
+                scott_2008.parse({'S': [Rule('S', ('a',))]}, ['a'])
+            self.assertGreater(pstats.Stats(path).total_calls, 0)
+
+    def test_traced_memory(self):
+        text = io.StringIO()
+
+        with traced_memory(limit=3, stream=text):
+            scott_2008.parse({'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}, ['a'] * 5)
+
+        lines = text.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith('memory: '))
+        self.assertLessEqual(len(lines), 4)
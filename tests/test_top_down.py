@@ -1,8 +1,13 @@
 import unittest
 
-from parsers.top_down import NaiveTopDownParser
+from parsers.top_down import NaiveTopDownParser, TopDownParser, PredictionStack
 from parsers.shared import read_grammar, Rule
-from parsers.graph_search import bfs_search_first, dfs_search_first
+from parsers.graph_search import (Limits, SearchLimitReached, bfs_search_all, bfs_search_first, best_first_search_first,
+                                  dfs_search_all, dfs_search_first, iddfs_search_all,
+                                  iddfs_search_first)
+from parsers.memoized_top_down import memo_search_first, memo_search_all
+from parsers.tracing import MemorySink
+from tests.helpers import grammar_of
 
 
 class TestTopDown(unittest.TestCase):
@@ -32,6 +37,152 @@ class TestTopDown(unittest.TestCase):
         expectedRules = [Rule.from_str(s) for s in expected]
         self.assertListEqual(expectedRules, config.derivation)
 
+    def test_memoized(self):
+        grammar = read_grammar('data/greibach_normal_form_grammar.txt')
+        parser = NaiveTopDownParser(grammar)
+        tokens = ['a', 'a', 'b', 'b']
+
+        config = parser.parse(tokens, memo_search_first)
+
+        expected = ['S -> a B', 'B -> a B B', 'B -> b', 'B -> b']
+        expectedRules = [Rule.from_str(s) for s in expected]
+        self.assertListEqual(expectedRules, config.derivation)
+        self.assertTrue(parser.is_goal(config))
+        self.assertIsNone(parser.parse(['a', 'a', 'b'], memo_search_first))
+
+    def test_memoized_left_recursion(self):
+        grammar = read_grammar('data/left-recursive_grammar.txt')
+        parser = NaiveTopDownParser(grammar)
+
+        configs = parser.parse(['A', 'A', 'A'], memo_search_all)
+
+        expected = ['S -> S A', 'S -> S A', 'S -> A']
+        self.assertEqual(1, len(configs))
+        self.assertListEqual([Rule.from_str(s) for s in expected], configs[0].derivation)
+
+    def test_memoized_long_right_recursion(self):
+        parser = NaiveTopDownParser({'S': [Rule('S', ('a', 'S')), Rule('S', ('a',))]})
+        tokens = ['a'] * 400
+
+        config = parser.parse(tokens, memo_search_first)
+
+        self.assertEqual(400, len(config.derivation))
+        self.assertEqual(Rule('S', ('a',)), config.derivation[-1])
+
+    def test_memoized_long_left_recursion(self):
+        parser = NaiveTopDownParser({'S': [Rule('S', ('S', 'a')), Rule('S', ('a',))]})
+        tokens = ['a'] * 400
+
+        configs = parser.parse(tokens, memo_search_all)
+
+        self.assertEqual(1, len(configs))
+        self.assertEqual(400, len(configs[0].derivation))
+
+    def test_memoized_hidden_left_recursion_and_cycle(self):
+        grammar = grammar_of('S -> A T', 'S -> a T', 'A -> a', 'A -> B A', 'B ->', 'T -> b b b')
+        parser = NaiveTopDownParser(grammar)
+
+        configs = parser.parse(['a', 'b', 'b', 'b'], memo_search_all)
+
+        derivations = [[str(rule) for rule in config.derivation] for config in configs]
+        self.assertCountEqual([['S -> A T', 'A -> a', 'T -> b b b'], ['S -> a T', 'T -> b b b']], derivations)
+
+    def test_best_first_and_iterative_deepening(self):
+        grammar = read_grammar('data/greibach_normal_form_grammar.txt')
+        parser = NaiveTopDownParser(grammar)
+        tokens = ['a', 'a', 'b', 'b']
+        expected = [Rule.from_str(s) for s in ['S -> a B', 'B -> a B B', 'B -> b', 'B -> b']]
+
+        for search in (best_first_search_first, iddfs_search_first):
+            config = parser.parse(tokens, search)
+
+            self.assertListEqual(expected, config.derivation)
+        self.assertIsNone(parser.parse(['a', 'a', 'b'], iddfs_search_first))
+
+    def test_iterative_deepening_all(self):
+        grammar = read_grammar('data/grune_jacobs_2008.txt')
+        parser = TopDownParser(grammar)
+        tokens = ['a', 'a', 'b', 'c']
+
+        configs = parser.parse(tokens, iddfs_search_all)
+
+        self.assertTrue(configs)
+        self.assertEqual(set(parser.parse(tokens, bfs_search_all)), set(configs))
+
+    def test_limits(self):
+        grammar = {'S': [Rule('S', ('S', 'S')), Rule('S', ('a',))]}
+        parser = NaiveTopDownParser(grammar, prune=False)
+        tokens = ['a', 'a', 'b']
+
+        for limits, reason in ((Limits(max_nodes=1000), 'node budget'),
+                               (Limits(max_frontier=50, max_nodes=10 ** 5), 'frontier'),
+                               (Limits(timeout=0.05, max_nodes=10 ** 7), 'timeout')):
+            with self.assertRaises(SearchLimitReached) as context:
+                parser.parse(tokens, lambda graph, start: bfs_search_all(graph, start, limits))
+
+            self.assertTrue(context.exception.reason.startswith(reason))
+
+    def test_prediction_stacks_are_shared(self):
+        stack = PredictionStack.of(('B', 'C'))
+
+        pushed = stack.tail.push(('a', 'B'))
+
+        self.assertEqual(('a', 'B', 'C'), tuple(pushed))
+        self.assertIs(stack.tail, pushed.tail.tail)
+        self.assertEqual(PredictionStack.of(('a', 'B', 'C')), pushed)
+        self.assertEqual(hash(PredictionStack.of(('a', 'B', 'C'))), hash(pushed))
+
+    def test_transformed_left_recursion(self):
+        grammar = read_grammar('data/left-recursive_grammar.txt')
+        parser = NaiveTopDownParser(grammar, transform=True)
+
+        config = parser.parse(['A', 'A', 'A'], dfs_search_first)
+
+        expected = ['S -> S A', 'S -> S A', 'S -> A']
+        self.assertListEqual([Rule.from_str(s) for s in expected], config.derivation)
+        self.assertIsNone(parser.parse(['A', 'A', 'b'], dfs_search_first))
+
+    def test_transformed_hidden_left_recursion_and_cycle(self):
+        grammar = grammar_of('S -> A T', 'S -> a T', 'A -> a', 'A -> B A', 'B ->', 'T -> b b b', 'T -> T', 'T -> U',
+                             'U -> T')
+        parser = NaiveTopDownParser(grammar, transform=True)
+
+        configs = parser.parse(['a', 'b', 'b', 'b'], dfs_search_all)
+
+        derivations = [[str(rule) for rule in config.derivation] for config in configs]
+        self.assertCountEqual([['S -> A T', 'A -> a', 'T -> b b b'], ['S -> a T', 'T -> b b b']], derivations)
+
+    def test_transformed_derivations_match_memoized(self):
+        grammar = grammar_of('S -> S S', 'S -> a', 'S -> B S b', 'B ->', 'B -> b')
+        tokens = ['a', 'b', 'a', 'b', 'a']
+
+        configs = NaiveTopDownParser(grammar, transform=True).parse(tokens, bfs_search_all)
+
+        memoized = NaiveTopDownParser(grammar).parse(tokens, memo_search_all)
+        self.assertCountEqual([list(map(str, config.derivation)) for config in memoized],
+                              [list(map(str, config.derivation)) for config in configs])
+
+    def test_transformed_keeps_all_empty_derivations(self):
+        grammar = grammar_of('S -> S b', 'S ->', 'S -> A', 'A ->', 'A -> B B', 'B ->')
+
+        configs = NaiveTopDownParser(grammar, transform=True).parse(['b'], bfs_search_all)
+
+        memoized = NaiveTopDownParser(grammar).parse(['b'], memo_search_all)
+        self.assertEqual(3, len(configs))
+        self.assertCountEqual([list(map(str, config.derivation)) for config in memoized],
+                              [list(map(str, config.derivation)) for config in configs])
+
+    def test_pruning(self):
+        grammar = {'S': [Rule('S', ('a', 'S', 'b')), Rule('S', ('a', 'b'))]}
+        tokens = ['a'] * 6 + ['b'] * 6
+        pruned, unpruned = MemorySink(), MemorySink()
+
+        configs = NaiveTopDownParser(grammar, tracer=pruned).parse(tokens, bfs_search_all)
+        NaiveTopDownParser(grammar, tracer=unpruned, prune=False).parse(tokens, bfs_search_all)
+
+        self.assertEqual(1, len(configs))
+        self.assertLess(len(pruned.events), len(unpruned.events))
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,56 @@
+import json
+import os
+import tempfile
+import unittest
+
+from parsers.earley.earley_recognizer import EarleyRecognizer
+from parsers.graph_search import dfs_search_first
+from parsers.shared import read_grammar, read_lexicon
+from parsers.top_down import NaiveTopDownParser
+from parsers.tracing import JsonlSink, MemorySink
+
+
+class TestTracing(unittest.TestCase):
+    """
+    Tests for tracing parser operations.
+    """
+
+    def setUp(self):
+        self.lexicon = read_lexicon('data/lexicon.txt')
+        self.grammar = read_grammar('data/grammar.txt')
+        self.tokens = ['Peter', 'likes', 'hot', 'coffee']
+
+    def test_no_tracer(self):
+        parser = EarleyRecognizer(self.grammar, self.lexicon)
+
+        self.assertNotIn('enqueue', vars(parser))
+        self.assertTrue(parser.recognize(self.tokens))
+
+    def test_memory_sink(self):
+        sink = MemorySink()
+        parser = EarleyRecognizer(self.grammar, self.lexicon, tracer=sink)
+
+        parser.recognize(self.tokens)
+
+        self.assertEqual({'op': 'enqueue', 'item': 'START -> . S [0, 0]', 'position': 0}, sink.events[0])
+        self.assertEqual({'op': 'predict', 'item': 'START -> . S [0, 0]', 'position': 0}, sink.events[1])
+        self.assertEqual({'enqueue', 'predict', 'scan', 'complete'}, {event['op'] for event in sink.events})
+        self.assertEqual(len(parser.states), len({event['item'] for event in sink.events
+                                                  if event['op'] == 'enqueue'}))
+
+    def test_jsonl_sink(self):
+        grammar = read_grammar('data/greibach_normal_form_grammar.txt')
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'trace.jsonl')
+            with JsonlSink(path) as sink:
+                NaiveTopDownParser(grammar, tracer=sink).parse(['a', 'b'], dfs_search_first)
+            with open(path) as fin:
+                events = [json.loads(line) for line in fin]
+
+        self.assertEqual({'op': 'predict', 'item': '0: S', 'position': 0,
+                          'result': ['0: a B', '0: b A']}, dict(events[0], result=sorted(events[0]['result'])))
+        self.assertTrue(all(event['op'] in ('match', 'predict') for event in events))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import math
+import unittest
+
+from parsers.earley.scott_2008 import parse
+from parsers.earley.utils import collect_derivations, to_dot_language
+from parsers.earley.viterbi import inside, k_best, rule_probabilities, viterbi
+from parsers.shared import read_grammar, Rule
+
+
+class TestViterbi(unittest.TestCase):
+    """
+    Tests for best-parse extraction from weighted forests.
+    """
+
+    def setUp(self):
+        self.grammar = read_grammar('data/pcfg.txt')
+        self.probabilities = rule_probabilities(self.grammar)
+        self.forest = parse(self.grammar, ['n', 'v', 'n', 'p', 'n'])
+
+    def test_read_probabilities(self):
+        self.assertEqual(0.4, self.probabilities[('VP', ('VP', 'PP'))])
+        self.assertEqual(1.0, Rule.from_str('S -> a').prob)
+        self.assertEqual(Rule.from_str('S -> a'), Rule.from_str('S -> a [0.5]'))
+        self.assertEqual(('[', 'Y', ']'), Rule.from_str('X -> [ Y ]').rhs)
+        self.assertEqual(('[Y]',), Rule.from_str('X -> [Y]').rhs)
+
+    def test_viterbi(self):
+        log_prob, tree = viterbi(self.forest, self.probabilities)
+
+        self.assertAlmostEqual(0.8 * 0.4 * 0.6 * 0.8 * 0.8, math.exp(log_prob))
+        self.assertIn('"VP [1,5]" -> "VP [1,3]"', to_dot_language(tree, 'best'))
+
+    def test_k_best(self):
+        derivations = list(k_best(self.forest, self.probabilities))
+
+        self.assertEqual([0.12288, 0.06144], [round(math.exp(log_prob), 5) for log_prob, _ in derivations])
+        self.assertCountEqual([to_dot_language(tree, 't') for tree in collect_derivations(self.forest)],
+                              [to_dot_language(tree, 't') for _, tree in derivations])
+        self.assertEqual(1, len(list(k_best(self.forest, self.probabilities, k=1))))
+
+    def test_inside(self):
+        scores = inside(self.forest, self.probabilities)
+
+        self.assertAlmostEqual(0.12288 + 0.06144, scores[self.forest])
+
+
+if __name__ == '__main__':
+    unittest.main()